@@ -102,7 +102,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             elif user_type == 'registrar':
                 cursor.execute(
-                    "SELECT id, login, full_name, phone, clinic FROM registrars WHERE login = %s AND password = %s AND is_blocked = false",
+                    "SELECT id, login, full_name, phone, clinic, clinic_id FROM registrars WHERE login = %s AND password = %s AND is_blocked = false",
                     (login, password)
                 )
                 user = cursor.fetchone()
@@ -1,15 +1,95 @@
+import csv
+import io
 import json
 import os
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_CLINIC = 'Центральная городская поликлиника'
+BULK_IMPORT_MAX_ROWS = 1000
+BULK_IMPORT_FIELDS = ('full_name', 'phone', 'position', 'specialization', 'login', 'password',
+                      'photo_url', 'clinic', 'education', 'work_experience', 'office_number')
+
+DOCTOR_COLUMNS = 'id, full_name, phone, position, specialization, login, photo_url, is_active, clinic_id, clinic, education, work_experience, office_number, created_at'
+DOCTOR_SELECT = """SELECT d.id, d.full_name, d.phone, d.position, d.specialization, d.login, d.photo_url, d.is_active,
+                          d.clinic_id, COALESCE(c.name, d.clinic) AS clinic, d.education, d.work_experience, d.office_number, d.created_at
+                   FROM doctors d
+                   LEFT JOIN clinics c ON c.id = d.clinic_id"""
+
+def resolve_clinic_ids(conn, names: List[str]) -> Dict[str, int]:
+    """Получение id поликлиник по названиям для массового импорта, недостающие поликлиники создаются"""
+    names = sorted(set(names))
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO clinics (name) SELECT unnest(%s::varchar[]) ON CONFLICT (name) DO NOTHING", (names,))
+    cursor.execute("SELECT name, id FROM clinics WHERE name = ANY(%s)", (names,))
+    clinic_ids = dict(cursor.fetchall())
+    cursor.close()
+    return clinic_ids
+
+def get_clinic_id(conn, name: Any) -> Optional[int]:
+    """Id поликлиники из справочника по названию или None; вне импорта новые поликлиники не создаются"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM clinics WHERE name = %s", (name,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+def get_clinic_name(conn, clinic_id: Any) -> Optional[str]:
+    """Название поликлиники по id или None, если такой нет"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM clinics WHERE id = %s", (clinic_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+def parse_doctors_csv(text: str) -> List[Dict[str, Any]]:
+    """Разбор CSV с заголовком (разделитель , или ;) в список словарей врачей"""
+    sample = text[:2048]
+    delimiter = ';' if sample.count(';') > sample.count(',') else ','
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')), delimiter=delimiter)
+    rows = []
+    for row in reader:
+        rows.append({(key or '').strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items()})
+    return rows
+
+def validate_doctor_row(row: Any) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Проверка одной строки импорта, возвращает нормализованную запись и список ошибок"""
+    if not isinstance(row, dict):
+        return None, ['Строка должна быть объектом']
+    
+    doctor = {}
+    for field in BULK_IMPORT_FIELDS:
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        doctor[field] = None if value == '' else value
+    
+    errors = []
+    for field in ('full_name', 'position', 'login'):
+        if not doctor[field]:
+            errors.append(f'Не заполнено поле {field}')
+    
+    if doctor['work_experience'] is not None:
+        try:
+            doctor['work_experience'] = int(doctor['work_experience'])
+        except (TypeError, ValueError):
+            errors.append('work_experience должно быть целым числом')
+    
+    doctor['password'] = doctor['password'] or 'doctor123'
+    doctor['clinic'] = doctor['clinic'] or DEFAULT_CLINIC
+    return doctor, errors
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Управление врачами: создание, чтение, обновление, удаление
     GET / - получить всех врачей
     GET /?id=X - получить врача по ID
-    POST / - создать врача
+    GET /?clinic_id=X - получить врачей поликлиники
+    GET /?action=clinics - список поликлиник с количеством врачей
+    GET /?action=utilization&start_date=...&end_date=...[&clinic_id=X&doctor_id=Y&group_by=day] - загрузка врачей
+    POST / - создать врача (clinic_id или clinic - название поликлиники)
+    POST {action: "bulk_import", doctors: [...] | csv: "...", all_or_nothing} - массовый импорт/обновление по login
     PUT / - обновить врача
     DELETE /?id=X - удалить врача
     """
@@ -45,11 +125,81 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if method == 'GET':
             query_params = event.get('queryStringParameters') or {}
             doctor_id = query_params.get('id')
+            clinic_id = query_params.get('clinic_id')
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
+            if query_params.get('action') == 'clinics':
+                cursor.execute(
+                    """SELECT c.id, c.name, c.is_active,
+                              COUNT(d.id) AS doctors_count,
+                              COUNT(d.id) FILTER (WHERE d.is_active) AS active_doctors_count
+                       FROM clinics c
+                       LEFT JOIN doctors d ON d.clinic_id = c.id
+                       GROUP BY c.id
+                       ORDER BY c.name"""
+                )
+                clinics = cursor.fetchall()
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'clinics': clinics}, default=str),
+                    'isBase64Encoded': False
+                }
+            
+            if query_params.get('action') == 'utilization':
+                start_date = query_params.get('start_date')
+                end_date = query_params.get('end_date')
+                
+                if not start_date or not end_date:
+                    cursor.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'start_date and end_date required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                conditions = ['s.stat_date >= %s', 's.stat_date <= %s']
+                params = [start_date, end_date]
+                if clinic_id:
+                    conditions.append('d.clinic_id = %s')
+                    params.append(clinic_id)
+                if doctor_id:
+                    conditions.append('s.doctor_id = %s')
+                    params.append(doctor_id)
+                
+                # Читается готовая сводка doctor_daily_stats (V0037), которую поддерживают триггеры
+                group_by_day = query_params.get('group_by') == 'day'
+                cursor.execute(
+                    f"""SELECT s.doctor_id, d.full_name, d.clinic_id,
+                               {'s.stat_date,' if group_by_day else ''}
+                               SUM(s.booked_count) AS booked,
+                               SUM(s.completed_count) AS completed,
+                               SUM(s.cancelled_count) AS cancelled,
+                               SUM(s.available_slots) AS available_slots,
+                               ROUND(SUM(s.booked_count)::numeric / NULLIF(SUM(s.available_slots), 0), 4) AS utilization
+                        FROM doctor_daily_stats s
+                        JOIN doctors d ON d.id = s.doctor_id
+                        WHERE {' AND '.join(conditions)}
+                        GROUP BY s.doctor_id, d.full_name, d.clinic_id{', s.stat_date' if group_by_day else ''}
+                        ORDER BY d.full_name{', s.stat_date' if group_by_day else ''}""",
+                    params
+                )
+                utilization = cursor.fetchall()
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'utilization': utilization}, default=str),
+                    'isBase64Encoded': False
+                }
+            
             if doctor_id:
-                cursor.execute("SELECT id, full_name, phone, position, specialization, login, photo_url, is_active, clinic, education, work_experience, office_number, created_at FROM doctors WHERE id = %s", (doctor_id,))
+                cursor.execute(f"{DOCTOR_SELECT} WHERE d.id = %s", (doctor_id,))
                 doctor = cursor.fetchone()
                 cursor.close()
                 
@@ -68,7 +218,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             else:
-                cursor.execute("SELECT id, full_name, phone, position, specialization, login, photo_url, is_active, clinic, education, work_experience, office_number, created_at FROM doctors ORDER BY clinic, full_name")
+                if clinic_id:
+                    cursor.execute(f"{DOCTOR_SELECT} WHERE d.clinic_id = %s ORDER BY d.full_name", (clinic_id,))
+                else:
+                    cursor.execute(f"{DOCTOR_SELECT} ORDER BY clinic, d.full_name")
                 doctors = cursor.fetchall()
                 cursor.close()
                 
@@ -81,6 +234,113 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         elif method == 'POST':
             body = json.loads(event.get('body', '{}'))
+            
+            if body.get('action') == 'bulk_import':
+                all_or_nothing = bool(body.get('all_or_nothing', False))
+                
+                try:
+                    raw_rows = parse_doctors_csv(body['csv']) if body.get('csv') else body.get('doctors')
+                except csv.Error as e:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Invalid CSV: {e}'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if not isinstance(raw_rows, list) or not raw_rows:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'doctors array or csv is required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if len(raw_rows) > BULK_IMPORT_MAX_ROWS:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Too many rows, maximum is {BULK_IMPORT_MAX_ROWS}'}),
+                        'isBase64Encoded': False
+                    }
+                
+                valid_rows = []
+                errors = []
+                seen_logins = {}
+                for index, raw_row in enumerate(raw_rows, start=1):
+                    doctor, row_errors = validate_doctor_row(raw_row)
+                    if doctor and doctor['login']:
+                        if doctor['login'] in seen_logins:
+                            row_errors.append(f"Логин {doctor['login']} уже встречается в строке {seen_logins[doctor['login']]}")
+                        else:
+                            seen_logins[doctor['login']] = index
+                    if row_errors:
+                        errors.append({'row': index, 'login': doctor['login'] if doctor else None, 'errors': row_errors})
+                    else:
+                        valid_rows.append(doctor)
+                
+                if errors and (all_or_nothing or not valid_rows):
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'success': False, 'created': 0, 'updated': 0, 'errors': errors}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Один INSERT ... ON CONFLICT на все строки; пароль существующих врачей не меняется
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                try:
+                    clinic_ids = resolve_clinic_ids(conn, [d['clinic'] for d in valid_rows])
+                    imported = execute_values(
+                        cursor,
+                        """INSERT INTO doctors (full_name, phone, position, specialization, login, password_hash, photo_url, clinic_id, clinic, education, work_experience, office_number)
+                           VALUES %s
+                           ON CONFLICT (login) DO UPDATE SET
+                             full_name = EXCLUDED.full_name,
+                             position = EXCLUDED.position,
+                             clinic_id = EXCLUDED.clinic_id,
+                             clinic = EXCLUDED.clinic,
+                             phone = COALESCE(EXCLUDED.phone, doctors.phone),
+                             specialization = COALESCE(EXCLUDED.specialization, doctors.specialization),
+                             photo_url = COALESCE(EXCLUDED.photo_url, doctors.photo_url),
+                             education = COALESCE(EXCLUDED.education, doctors.education),
+                             work_experience = COALESCE(EXCLUDED.work_experience, doctors.work_experience),
+                             office_number = COALESCE(EXCLUDED.office_number, doctors.office_number)
+                           RETURNING """ + DOCTOR_COLUMNS + """, (xmax = 0) AS inserted""",
+                        [(d['full_name'], d['phone'], d['position'], d['specialization'], d['login'], d['password'],
+                          d['photo_url'], clinic_ids[d['clinic']], d['clinic'], d['education'], d['work_experience'], d['office_number']) for d in valid_rows],
+                        page_size=len(valid_rows),
+                        fetch=True
+                    )
+                    conn.commit()
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'success': False, 'created': 0, 'updated': 0, 'error': str(e).strip(), 'errors': errors}),
+                        'isBase64Encoded': False
+                    }
+                finally:
+                    cursor.close()
+                
+                created = sum(1 for doctor in imported if doctor['inserted'])
+                for doctor in imported:
+                    doctor.pop('inserted')
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'success': True,
+                        'created': created,
+                        'updated': len(imported) - created,
+                        'doctors': imported,
+                        'errors': errors
+                    }, default=str),
+                    'isBase64Encoded': False
+                }
+            
             full_name = body.get('full_name')
             phone = body.get('phone')
             position = body.get('position')
@@ -88,7 +348,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             login = body.get('login')
             password = body.get('password', 'doctor123')
             photo_url = body.get('photo_url')
-            clinic = body.get('clinic', 'Центральная городская поликлиника')
+            clinic_id = body.get('clinic_id')
+            clinic = body.get('clinic', DEFAULT_CLINIC)
             education = body.get('education')
             work_experience = body.get('work_experience')
             office_number = body.get('office_number')
@@ -103,10 +364,22 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
+            if clinic_id:
+                clinic = get_clinic_name(conn, clinic_id)
+            else:
+                clinic_id = get_clinic_id(conn, clinic)
+            if not clinic_id or not clinic:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Clinic not found: clinic_id of an existing clinic is required'}),
+                    'isBase64Encoded': False
+                }
+            
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute(
-                "INSERT INTO doctors (full_name, phone, position, specialization, login, password_hash, photo_url, clinic, education, work_experience, office_number) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id, full_name, phone, position, specialization, login, photo_url, is_active, clinic, education, work_experience, office_number, created_at",
-                (full_name, phone, position, specialization, login, password, photo_url, clinic, education, work_experience, office_number)
+                f"INSERT INTO doctors (full_name, phone, position, specialization, login, password_hash, photo_url, clinic_id, clinic, education, work_experience, office_number) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING {DOCTOR_COLUMNS}",
+                (full_name, phone, position, specialization, login, password, photo_url, clinic_id, clinic, education, work_experience, office_number)
             )
             doctor = cursor.fetchone()
             conn.commit()
@@ -152,9 +425,24 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             if 'is_active' in body:
                 update_fields.append('is_active = %s')
                 update_values.append(body['is_active'])
-            if 'clinic' in body:
+            if body.get('clinic_id') or body.get('clinic'):
+                clinic_id = body.get('clinic_id')
+                if clinic_id:
+                    clinic = get_clinic_name(conn, clinic_id)
+                else:
+                    clinic = body['clinic']
+                    clinic_id = get_clinic_id(conn, clinic)
+                if not clinic_id or not clinic:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Clinic not found: clinic_id of an existing clinic is required'}),
+                        'isBase64Encoded': False
+                    }
+                update_fields.append('clinic_id = %s')
+                update_values.append(clinic_id)
                 update_fields.append('clinic = %s')
-                update_values.append(body['clinic'])
+                update_values.append(clinic)
             if 'education' in body:
                 update_fields.append('education = %s')
                 update_values.append(body['education'])
@@ -177,7 +465,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             update_values.append(doctor_id)
-            query = f"UPDATE doctors SET {', '.join(update_fields)} WHERE id = %s RETURNING id, full_name, phone, position, specialization, login, photo_url, is_active, clinic, education, work_experience, office_number, created_at"
+            query = f"UPDATE doctors SET {', '.join(update_fields)} WHERE id = %s RETURNING {DOCTOR_COLUMNS}"
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute(query, update_values)
@@ -1,8 +1,206 @@
+import base64
+import gzip
+import heapq
 import json
+import math
 import os
+import re
+import threading
+import time
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional
+
+FAQ_VERSION_CHECK_SECONDS = 5
+FAQ_CACHE_MAX_AGE_SECONDS = 60
+FAQ_GZIP_MIN_BYTES = 1024
+FAQ_SEARCH_LIMIT = 20
+FAQ_SUGGEST_LIMIT = 8
+FAQ_QUERY_MAX_WORDS = 8
+FAQ_MATCH_LIMIT = 5
+FAQ_MATCH_MIN_SCORE = 0.15
+FAQ_STEM_LENGTH = 5
+USER_QUESTION_MAX_LENGTH = 200
+# search_vector нужен только поиску и в ответы API не попадает
+FAQ_COLUMNS = 'id, question, answer, image_url, display_order, is_active, created_at, updated_at'
+
+FAQ_WORD_RE = re.compile(r'[0-9a-zа-яё]+')
+FAQ_STOP_WORDS = frozenset({
+    'и', 'в', 'во', 'на', 'с', 'со', 'к', 'ко', 'по', 'за', 'из', 'от', 'до', 'у', 'о', 'об',
+    'а', 'но', 'или', 'ли', 'не', 'ни', 'же', 'бы', 'то', 'что', 'как', 'где', 'когда',
+    'это', 'этот', 'эта', 'мне', 'меня', 'мой', 'моя', 'я', 'вы', 'вас', 'вам', 'мы',
+    'можно', 'нужно', 'для', 'при', 'есть', 'если', 'какой', 'какие', 'ещё', 'еще'
+})
+
+# Готовый ответ со списком активных FAQ живёт в памяти тёплого экземпляра; версия из
+# faq_version перепроверяется не чаще раза в FAQ_VERSION_CHECK_SECONDS
+faq_cache: Dict[str, Any] = {'version': None, 'checked_at': 0.0, 'etag': None, 'body': None, 'gzip_body': None, 'faqs': None}
+faq_cache_lock = threading.Lock()
+
+# TF-IDF индекс для подбора ответов на вопросы пациентов, пересобирается при смене версии FAQ
+faq_index_state: Dict[str, Any] = {'version': None, 'index': None}
+faq_index_lock = threading.Lock()
+
+def get_cached_faq_payload() -> Optional[Dict[str, Any]]:
+    """Закешированный ответ, если версия проверялась недавно"""
+    with faq_cache_lock:
+        if faq_cache['body'] is not None and time.monotonic() - faq_cache['checked_at'] < FAQ_VERSION_CHECK_SECONDS:
+            return dict(faq_cache)
+    return None
+
+def load_faq_payload(conn) -> Dict[str, Any]:
+    """Сверка версии FAQ и пересборка готового ответа только при её изменении"""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("SELECT version FROM faq_version WHERE id = 1")
+    row = cursor.fetchone()
+    version = row['version'] if row else 0
+    
+    with faq_cache_lock:
+        if faq_cache['body'] is not None and faq_cache['version'] == version:
+            faq_cache['checked_at'] = time.monotonic()
+            cursor.close()
+            return dict(faq_cache)
+    
+    cursor.execute(f"SELECT {FAQ_COLUMNS} FROM faq WHERE is_active = true ORDER BY display_order, created_at DESC")
+    faqs = cursor.fetchall()
+    cursor.close()
+    
+    body = json.dumps({'faqs': faqs}, default=str)
+    raw = body.encode('utf-8')
+    gzip_body = base64.b64encode(gzip.compress(raw)).decode('ascii') if len(raw) >= FAQ_GZIP_MIN_BYTES else None
+    
+    with faq_cache_lock:
+        faq_cache.update({
+            'version': version,
+            'checked_at': time.monotonic(),
+            'etag': f'W/"faq-{version}"',
+            'body': body,
+            'gzip_body': gzip_body,
+            'faqs': faqs
+        })
+        return dict(faq_cache)
+
+def invalidate_faq_cache() -> None:
+    """Принудительная сверка версии при следующем чтении после записи в этом экземпляре"""
+    with faq_cache_lock:
+        faq_cache['checked_at'] = 0.0
+
+def faq_list_response(payload: Dict[str, Any], request_headers: Dict[str, Any]) -> Dict[str, Any]:
+    """Ответ из кеша: 304 по If-None-Match, gzip при поддержке клиентом"""
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'ETag',
+        'Cache-Control': f'public, max-age={FAQ_CACHE_MAX_AGE_SECONDS}',
+        'ETag': payload['etag'],
+        'Vary': 'Accept-Encoding'
+    }
+    lowered = {str(key).lower(): value for key, value in request_headers.items()}
+    # Слабое сравнение: W/ могут снять прокси, а ETag общий для gzip и обычного ответа
+    client_tags = {tag.strip().removeprefix('W/') for tag in (lowered.get('if-none-match') or '').split(',')}
+    if payload['etag'].removeprefix('W/') in client_tags or '*' in client_tags:
+        return {'statusCode': 304, 'headers': headers, 'body': '', 'isBase64Encoded': False}
+    
+    if payload['gzip_body'] and 'gzip' in (lowered.get('accept-encoding') or ''):
+        headers['Content-Encoding'] = 'gzip'
+        return {'statusCode': 200, 'headers': headers, 'body': payload['gzip_body'], 'isBase64Encoded': True}
+    
+    return {'statusCode': 200, 'headers': headers, 'body': payload['body'], 'isBase64Encoded': False}
+
+def build_prefix_tsquery(text: str) -> Optional[str]:
+    """tsquery для автодополнения: все слова целиком, последнее - как префикс"""
+    words = FAQ_WORD_RE.findall(text.lower())[:FAQ_QUERY_MAX_WORDS]
+    if not words:
+        return None
+    return ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+
+def search_faq(conn, text: str, limit: int) -> list:
+    """Ранжированный поиск по активным FAQ; snippet - экранированный HTML, в котором разметка только <mark>"""
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        SELECT f.id, f.question, f.image_url, f.answer,
+               ts_rank_cd(f.search_vector, q.query) AS rank,
+               ts_headline('russian', html_escape(f.answer), q.query,
+                           'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2') AS snippet
+        FROM faq f, websearch_to_tsquery('russian', %s) AS q(query)
+        WHERE f.is_active = true AND f.search_vector @@ q.query
+        ORDER BY rank DESC, f.display_order, f.id
+        LIMIT %s
+    """, (text, limit))
+    results = cursor.fetchall()
+    cursor.close()
+    return results
+
+def suggest_faq(conn, text: str, limit: int) -> list:
+    """Подсказки вопросов по мере набора: префиксный запрос по индексу idx_faq_search"""
+    tsquery = build_prefix_tsquery(text)
+    if not tsquery:
+        return []
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        SELECT f.id, f.question
+        FROM faq f, to_tsquery('russian', %s) AS q(query)
+        WHERE f.is_active = true AND f.search_vector @@ q.query
+        ORDER BY ts_rank(f.search_vector, q.query) DESC, f.display_order, f.id
+        LIMIT %s
+    """, (tsquery, limit))
+    suggestions = cursor.fetchall()
+    cursor.close()
+    return suggestions
+
+def faq_terms(text: str) -> List[str]:
+    """Основы слов (первые FAQ_STEM_LENGTH букв) без служебных слов"""
+    return [word[:FAQ_STEM_LENGTH] for word in FAQ_WORD_RE.findall(text.lower()) if len(word) > 1 and word not in FAQ_STOP_WORDS]
+
+def build_faq_index(faqs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Инвертированный индекс нормированных TF-IDF векторов; вопрос весит вдвое больше ответа"""
+    documents = [Counter(faq_terms(faq['question']) * 2 + faq_terms(faq['answer'])) for faq in faqs]
+    document_frequency = Counter(term for counts in documents for term in counts)
+    total = len(documents)
+    idf = {term: math.log((1 + total) / (1 + df)) + 1 for term, df in document_frequency.items()}
+    
+    postings: Dict[str, List[tuple]] = defaultdict(list)
+    for position, counts in enumerate(documents):
+        weights = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        for term, weight in weights.items():
+            postings[term].append((position, weight / norm))
+    
+    return {
+        'faqs': [{'id': faq['id'], 'question': faq['question'], 'answer': faq['answer']} for faq in faqs],
+        'idf': idf,
+        'default_idf': math.log(1 + total) + 1,
+        'postings': dict(postings)
+    }
+
+def get_faq_index(conn) -> Dict[str, Any]:
+    """Индекс для текущей версии FAQ, пересборка только после изменения версии"""
+    payload = get_cached_faq_payload() or load_faq_payload(conn)
+    with faq_index_lock:
+        if faq_index_state['version'] != payload['version']:
+            faq_index_state['index'] = build_faq_index(payload['faqs'])
+            faq_index_state['version'] = payload['version']
+        return faq_index_state['index']
+
+def match_faq(index: Dict[str, Any], text: str, limit: int) -> List[Dict[str, Any]]:
+    """Косинусная близость черновика вопроса к FAQ: разреженное скалярное произведение по спискам термов"""
+    counts = Counter(faq_terms(text))
+    if not counts:
+        return []
+    weights = {term: (1 + math.log(count)) * index['idf'].get(term, index['default_idf']) for term, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    
+    scores: Dict[int, float] = defaultdict(float)
+    for term, weight in weights.items():
+        for position, document_weight in index['postings'].get(term, ()):
+            scores[position] += weight / norm * document_weight
+    
+    best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return [
+        {**index['faqs'][position], 'score': round(score, 3)}
+        for position, score in best if score >= FAQ_MATCH_MIN_SCORE
+    ]
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -10,7 +208,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     GET / - получить все активные FAQ
     GET /?all=true - получить все FAQ (включая неактивные, для админа)
     GET /?id=X - получить FAQ по ID
+    GET /?action=search&q=...&limit=N - ранжированный поиск по вопросам и ответам (snippet - экранированный HTML с <mark>)
+    GET /?action=suggest&q=... - подсказки вопросов по мере набора
     POST / - создать FAQ
+    POST / {action: "match", question} - подходящие ответы из FAQ на черновик вопроса
+    POST / {action: "ask", name, question, force} - принять вопрос в user_questions, если похожих ответов нет или force
     PUT / - обновить FAQ
     DELETE /?id=X - удалить FAQ
     """
@@ -22,7 +224,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -38,18 +240,66 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     
+    query_params = event.get('queryStringParameters') or {}
+    action = query_params.get('action')
+    is_public_list = method == 'GET' and not action and not query_params.get('id') and query_params.get('all') != 'true'
+    
+    # Неизвестное действие не должно проваливаться в админский список с неактивными FAQ
+    if method == 'GET' and action and action not in ('search', 'suggest'):
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Unknown action'}),
+            'isBase64Encoded': False
+        }
+    
+    # Публичный список отдаётся из памяти без подключения к БД, пока версия свежая
+    if is_public_list:
+        payload = get_cached_faq_payload()
+        if payload:
+            return faq_list_response(payload, event.get('headers') or {})
+    
     conn = psycopg2.connect(database_url)
     
     try:
+        if is_public_list:
+            return faq_list_response(load_faq_payload(conn), event.get('headers') or {})
+        
+        if method == 'GET' and action in ('search', 'suggest'):
+            text = (query_params.get('q') or '').strip()
+            if not text:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Query parameter q is required'}),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'suggest':
+                results = suggest_faq(conn, text, FAQ_SUGGEST_LIMIT)
+                key = 'suggestions'
+            else:
+                try:
+                    limit = max(1, min(int(query_params.get('limit', FAQ_SEARCH_LIMIT)), FAQ_SEARCH_LIMIT))
+                except ValueError:
+                    limit = FAQ_SEARCH_LIMIT
+                results = search_faq(conn, text, limit)
+                key = 'results'
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({key: results}, default=str),
+                'isBase64Encoded': False
+            }
+        
         if method == 'GET':
-            query_params = event.get('queryStringParameters') or {}
             faq_id = query_params.get('id')
-            show_all = query_params.get('all') == 'true'
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             if faq_id:
-                cursor.execute("SELECT * FROM faq WHERE id = %s", (faq_id,))
+                cursor.execute(f"SELECT {FAQ_COLUMNS} FROM faq WHERE id = %s", (faq_id,))
                 faq_item = cursor.fetchone()
                 cursor.close()
                 
@@ -68,11 +318,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             else:
-                if show_all:
-                    cursor.execute("SELECT * FROM faq ORDER BY display_order, created_at DESC")
-                else:
-                    cursor.execute("SELECT * FROM faq WHERE is_active = true ORDER BY display_order, created_at DESC")
-                
+                cursor.execute(f"SELECT {FAQ_COLUMNS} FROM faq ORDER BY display_order, created_at DESC")
                 faqs = cursor.fetchall()
                 cursor.close()
                 
@@ -85,6 +331,52 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         elif method == 'POST':
             body = json.loads(event.get('body', '{}'))
+            
+            if body.get('action') in ('match', 'ask'):
+                question = (body.get('question') or '').strip()
+                if not question or len(question) > USER_QUESTION_MAX_LENGTH:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Вопрос обязателен и не длиннее {USER_QUESTION_MAX_LENGTH} символов'}),
+                        'isBase64Encoded': False
+                    }
+                
+                matches = match_faq(get_faq_index(conn), question, FAQ_MATCH_LIMIT)
+                
+                if body.get('action') == 'match' or (matches and not body.get('force')):
+                    return {
+                        'statusCode': 200,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'submitted': False, 'matches': matches}),
+                        'isBase64Encoded': False
+                    }
+                
+                name = (body.get('name') or '').strip()
+                if not name:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Укажите имя'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(
+                    "INSERT INTO user_questions (name, question) VALUES (%s, %s) RETURNING id, status, created_at",
+                    (name[:255], question)
+                )
+                user_question = cursor.fetchone()
+                conn.commit()
+                cursor.close()
+                
+                return {
+                    'statusCode': 201,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'submitted': True, 'question': user_question}, default=str),
+                    'isBase64Encoded': False
+                }
+            
             question = body.get('question')
             answer = body.get('answer')
             image_url = body.get('image_url')
@@ -100,12 +392,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute(
-                "INSERT INTO faq (question, answer, image_url, display_order) VALUES (%s, %s, %s, %s) RETURNING *",
+                f"INSERT INTO faq (question, answer, image_url, display_order) VALUES (%s, %s, %s, %s) RETURNING {FAQ_COLUMNS}",
                 (question, answer, image_url, display_order)
             )
             faq_item = cursor.fetchone()
             conn.commit()
             cursor.close()
+            invalidate_faq_cache()
             
             return {
                 'statusCode': 201,
@@ -155,13 +448,14 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             update_fields.append('updated_at = CURRENT_TIMESTAMP')
             update_values.append(faq_id)
-            query = f"UPDATE faq SET {', '.join(update_fields)} WHERE id = %s RETURNING *"
+            query = f"UPDATE faq SET {', '.join(update_fields)} WHERE id = %s RETURNING {FAQ_COLUMNS}"
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             cursor.execute(query, update_values)
             faq_item = cursor.fetchone()
             conn.commit()
             cursor.close()
+            invalidate_faq_cache()
             
             if not faq_item:
                 return {
@@ -194,6 +488,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             cursor.execute("DELETE FROM faq WHERE id = %s", (faq_id,))
             conn.commit()
             cursor.close()
+            invalidate_faq_cache()
             
             return {
                 'statusCode': 200,
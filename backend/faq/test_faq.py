@@ -0,0 +1,58 @@
+import importlib.util
+import os
+import unittest
+
+import psycopg2
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), 'index.py')
+spec = importlib.util.spec_from_file_location('faq_index', INDEX_PATH)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+handler = index.handler
+search_faq = index.search_faq
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL не задан')
+class SearchSnippetTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg2.connect(TEST_DATABASE_URL)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT INTO faq (question, answer) VALUES (%s, %s) RETURNING id",
+            ('Как записаться к кардиологу?',
+             '<script>alert("кардиолог")</script> Кардиолог принимает по вторникам & четвергам')
+        )
+        self.faq_id = cursor.fetchone()[0]
+        cursor.close()
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.rollback()
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM faq WHERE id = %s", (self.faq_id,))
+        cursor.close()
+        self.conn.commit()
+        self.conn.close()
+
+    def test_snippet_escapes_answer_html(self):
+        hits = [hit for hit in search_faq(self.conn, 'кардиолог', 10) if hit['id'] == self.faq_id]
+        self.assertEqual(len(hits), 1)
+        snippet = hits[0]['snippet']
+        self.assertNotIn('<script>', snippet)
+        self.assertIn('&lt;/script&gt;', snippet)
+        self.assertIn('&amp;', snippet)
+        self.assertIn('<mark>', snippet)
+        self.assertEqual(snippet.replace('<mark>', '').replace('</mark>', '').count('<'), 0)
+
+
+class UnknownActionTest(unittest.TestCase):
+    def test_unknown_get_action_is_rejected(self):
+        os.environ.setdefault('DATABASE_URL', TEST_DATABASE_URL or 'postgresql://unused')
+        response = handler({'httpMethod': 'GET', 'queryStringParameters': {'action': 'export'}}, None)
+        self.assertEqual(response['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,56 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 import hashlib
 import secrets
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+TOKEN_CACHE_TTL_SECONDS = 5
+TOKEN_CACHE_MAX_SIZE = 1000
+
+# Кеш токен -> пользователь живёт между вызовами тёплого экземпляра функции. Блокировка
+# из forum_moderation идёт мимо этого экземпляра, поэтому заблокированный пользователь
+# может пройти проверку сессии ещё не дольше TOKEN_CACHE_TTL_SECONDS; записи на форум
+# (forum_posts, forum_topics) проверяют токен в БД без кеша
+token_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+token_cache_lock = threading.Lock()
+
+def hash_token(token: str) -> str:
+    """SHA-256 токена сессии, в БД хранится только он"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def invalidate_user_tokens(user_id: int) -> None:
+    """Сброс закешированных токенов пользователя после выдачи нового"""
+    with token_cache_lock:
+        for key in [key for key, entry in token_cache.items() if entry[1] and entry[1]['id'] == user_id]:
+            del token_cache[key]
+
+def get_user_from_token(conn, token: str):
+    """Пользователь по токену с кешем на время жизни тёплого экземпляра функции"""
+    token_hash = hash_token(token)
+    now = time.monotonic()
+    with token_cache_lock:
+        cached = token_cache.get(token_hash)
+        if cached and cached[0] > now:
+            return cached[1]
+    
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(
+        "SELECT id, username, email, is_blocked FROM forum_users WHERE auth_token_hash = %s AND is_verified = TRUE",
+        (token_hash,)
+    )
+    user = cursor.fetchone()
+    cursor.close()
+    
+    result = dict(user) if user and not user['is_blocked'] else None
+    with token_cache_lock:
+        if len(token_cache) >= TOKEN_CACHE_MAX_SIZE:
+            for key in [key for key, entry in token_cache.items() if entry[0] <= now]:
+                del token_cache[key]
+            if len(token_cache) >= TOKEN_CACHE_MAX_SIZE:
+                token_cache.clear()
+        token_cache[token_hash] = (now + TOKEN_CACHE_TTL_SECONDS, result)
+    return result
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -111,8 +160,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 user_token = secrets.token_urlsafe(32)
                 
                 cursor.execute(
-                    "INSERT INTO forum_users (email, username, password_hash, auth_token, is_verified, is_blocked, created_at, last_login) VALUES (%s, %s, %s, %s, TRUE, FALSE, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) RETURNING id",
-                    (email_value, username, password_hash, user_token)
+                    "INSERT INTO forum_users (email, username, password_hash, auth_token_hash, is_verified, is_blocked, created_at, last_login) VALUES (%s, %s, %s, %s, TRUE, FALSE, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) RETURNING id",
+                    (email_value, username, password_hash, hash_token(user_token))
                 )
                 user_data = cursor.fetchone()
                 user_id = user_data['id']
@@ -163,11 +212,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 user_token = secrets.token_urlsafe(32)
                 
                 cursor.execute(
-                    "UPDATE forum_users SET is_verified = TRUE, auth_token = %s, last_login = CURRENT_TIMESTAMP WHERE id = %s",
-                    (user_token, user_id)
+                    "UPDATE forum_users SET is_verified = TRUE, auth_token = NULL, auth_token_hash = %s, last_login = CURRENT_TIMESTAMP WHERE id = %s",
+                    (hash_token(user_token), user_id)
                 )
                 conn.commit()
                 cursor.close()
+                invalidate_user_tokens(user['id'])
                 
                 return {
                     'statusCode': 200,
@@ -232,11 +282,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 
                 user_token = secrets.token_urlsafe(32)
                 cursor.execute(
-                    "UPDATE forum_users SET auth_token = %s, last_login = CURRENT_TIMESTAMP WHERE id = %s",
-                    (user_token, user['id'])
+                    "UPDATE forum_users SET auth_token = NULL, auth_token_hash = %s, last_login = CURRENT_TIMESTAMP WHERE id = %s",
+                    (hash_token(user_token), user['id'])
                 )
                 conn.commit()
                 cursor.close()
+                invalidate_user_tokens(user['id'])
                 
                 return {
                     'statusCode': 200,
@@ -264,12 +315,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'isBase64Encoded': False
                     }
                 
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-                cursor.execute("SELECT id, username, email, is_blocked FROM forum_users WHERE auth_token = %s AND is_verified = TRUE", (token,))
-                user = cursor.fetchone()
-                cursor.close()
+                user = get_user_from_token(conn, token)
                 
-                if not user or user['is_blocked']:
+                if not user:
                     return {
                         'statusCode': 401,
                         'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
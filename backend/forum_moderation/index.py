@@ -1,27 +1,202 @@
+import base64
 import json
+import math
 import os
+import re
+import time
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from bisect import bisect_right
+from typing import Dict, Any, List, Optional
+
+BULK_MAX_IDS = 1000
+USERS_PAGE_SIZE = 50
+USERS_MAX_PAGE_SIZE = 200
+SPAM_HIDE_THRESHOLD = 0.9
+SPAM_WEIGHTS_TTL_SECONDS = 300
+SPAM_STEM_LENGTH = 5
+SPAM_STEM_MIN_LENGTH = 3
+SPAM_SCAN_LIMIT = 200
+SPAM_SCAN_MAX_LIMIT = 5000
+SPAM_BENCHMARK_MAX_ROUNDS = 50
+
+SPAM_TOKEN_RE = re.compile(r'[a-zа-яё0-9]+')
+SPAM_LINK_RE = re.compile(r'https?://|www\.|\b[a-z0-9-]+\.(?:ru|com|net|org|info|biz|xyz|top|online|site|shop|io|me)\b')
+SPAM_PHONE_RE = re.compile(r'(?:\+7|\b8)[\s\-()]*\d{3}[\s\-()]*\d{3}[\s\-]*\d{2}[\s\-]*\d{2}')
+SPAM_REPEAT_RE = re.compile(r'(.)\1{4,}')
+SPAM_STEM_TRAILING = frozenset('аеёиоуыэюяьй')
+# Разделитель текстов в пачке: NUL не бывает в text Postgres, и ни одно из выражений через него не проходит
+SPAM_BATCH_SEPARATOR = '\n\x00\n'
+
+# search_vector нужен только полнотекстовому поиску: в выборки для ответов API он не попадает
+# posts_count в списке тем модератора считается подзапросом по всем сообщениям, включая скрытые
+TOPIC_COLUMNS = ('id', 'title', 'description', 'author_id', 'is_locked', 'is_pinned', 'is_hidden', 'hidden_reason',
+                 'views_count', 'last_post_at', 'hot_score', 'created_at', 'updated_at')
+TOPIC_SELECT_T = ', '.join(f't.{column}' for column in TOPIC_COLUMNS)
+POST_COLUMNS = ('id', 'topic_id', 'author_id', 'content', 'images', 'is_hidden', 'hidden_reason', 'created_at', 'updated_at')
+POST_SELECT_P = ', '.join(f'p.{column}' for column in POST_COLUMNS)
+
+# Веса из forum_spam_terms живут в памяти тёплого экземпляра и перечитываются раз в TTL
+spam_weights_state: Dict[str, Any] = {'weights': None, 'loaded_at': 0.0}
 
 def check_admin(token: str) -> bool:
     """Проверка админского токена из админ-панели"""
     stored_token = os.environ.get('ADMIN_TOKEN', 'admin123')
     return token == stored_token
 
+def encode_users_cursor(user_id: int) -> str:
+    """Непрозрачный курсор страницы пользователей по id последней записи"""
+    return base64.urlsafe_b64encode(json.dumps([user_id]).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_users_cursor(cursor_value: str) -> Optional[int]:
+    """Разбор курсора страницы пользователей, None если курсор повреждён"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor_value + '=' * (-len(cursor_value) % 4))
+        (user_id,) = json.loads(raw)
+        return int(user_id)
+    except (ValueError, TypeError):
+        return None
+
+def parse_id_list(value: Any) -> Optional[List[int]]:
+    """Список уникальных ID из тела запроса, None если формат неверный"""
+    if not isinstance(value, list) or not value or len(value) > BULK_MAX_IDS:
+        return None
+    try:
+        return sorted({int(item) for item in value})
+    except (TypeError, ValueError):
+        return None
+
+def refresh_topic_counters(cursor, topic_ids: list):
+    """Пересчёт posts_count и last_post_at для тем по видимым сообщениям"""
+    cursor.execute("""
+        UPDATE forum_topics t
+        SET posts_count = COALESCE(s.posts_count, 0), last_post_at = s.last_post_at
+        FROM (SELECT unnest(%s::integer[]) AS topic_id) ids
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS posts_count, MAX(created_at) AS last_post_at
+            FROM forum_posts
+            WHERE topic_id = ids.topic_id AND is_hidden = FALSE
+        ) s ON TRUE
+        WHERE t.id = ids.topic_id
+    """, (topic_ids,))
+
+def spam_stem(token: str) -> str:
+    """Основа слова: первые SPAM_STEM_LENGTH букв без хвостовых гласных, ь и й (займы/займ, врача/врач)"""
+    stem = token[:SPAM_STEM_LENGTH]
+    while len(stem) > SPAM_STEM_MIN_LENGTH and stem[-1] in SPAM_STEM_TRAILING:
+        stem = stem[:-1]
+    return stem
+
+def normalize_spam_term(term: str) -> str:
+    """Термин из forum_spam_terms к виду признаков текста; служебные __...__ не меняются"""
+    if term.startswith('__'):
+        return term
+    return ' '.join(spam_stem(token) for token in SPAM_TOKEN_RE.findall(term.lower()))
+
+def spam_features(text: str) -> set:
+    """Признаки текста: основы слов и пары соседних основ"""
+    stems = [spam_stem(token) for token in SPAM_TOKEN_RE.findall(text.lower())]
+    features = set(stems)
+    features.update(f'{a} {b}' for a, b in zip(stems, stems[1:]))
+    return features
+
+def load_spam_weights(conn) -> Dict[str, float]:
+    """Веса модели спама из forum_spam_terms (термины приводятся к основам, как слова текста) с кешем на SPAM_WEIGHTS_TTL_SECONDS"""
+    now = time.monotonic()
+    if spam_weights_state['weights'] is None or now - spam_weights_state['loaded_at'] >= SPAM_WEIGHTS_TTL_SECONDS:
+        cursor = conn.cursor()
+        cursor.execute("SELECT term, weight FROM forum_spam_terms ORDER BY term")
+        weights: Dict[str, float] = {}
+        for term, weight in cursor.fetchall():
+            weights.setdefault(normalize_spam_term(term), float(weight))
+        spam_weights_state['weights'] = weights
+        spam_weights_state['loaded_at'] = now
+        cursor.close()
+    return spam_weights_state['weights']
+
+def spam_score(text: str, weights: Dict[str, float]) -> float:
+    """Оценка 0..1: сигмоида суммы весов основ слов, пар основ и служебных признаков"""
+    lowered = text.lower()
+    total = weights.get('__bias__', 0.0)
+    total += sum(weights.get(feature, 0.0) for feature in spam_features(text))
+    total += weights.get('__link__', 0.0) * min(len(SPAM_LINK_RE.findall(lowered)), 3)
+    if SPAM_PHONE_RE.search(text):
+        total += weights.get('__phone__', 0.0)
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) >= 20 and sum(char.isupper() for char in letters) > len(letters) * 0.6:
+        total += weights.get('__caps__', 0.0)
+    if SPAM_REPEAT_RE.search(lowered):
+        total += weights.get('__repeat__', 0.0)
+    return 1.0 / (1.0 + math.exp(-max(min(total, 50.0), -50.0)))
+
+def spam_batch_starts(texts: List[str]) -> List[int]:
+    """Смещения начала каждого текста в склейке через SPAM_BATCH_SEPARATOR"""
+    starts, position = [], 0
+    for text in texts:
+        starts.append(position)
+        position += len(text) + len(SPAM_BATCH_SEPARATOR)
+    return starts
+
+def spam_score_batch(texts: List[str], weights: Dict[str, float]) -> List[float]:
+    """Оценка пачки текстов, совпадающая с spam_score: каждое выражение один раз проходит по склейке
+    всех текстов, основа каждого различного слова считается один раз на пачку"""
+    if not texts:
+        return []
+    # lower() может менять длину строки, поэтому смещения для склейки исходных текстов (телефоны) свои
+    lowered_texts = [text.lower() for text in texts]
+    lowered = SPAM_BATCH_SEPARATOR.join(lowered_texts)
+    lowered_starts = spam_batch_starts(lowered_texts)
+    original_starts = spam_batch_starts(texts)
+    
+    stems: List[List[str]] = [[] for _ in texts]
+    stem_cache: Dict[str, str] = {}
+    for match in SPAM_TOKEN_RE.finditer(lowered):
+        token = match.group()
+        stem = stem_cache.get(token)
+        if stem is None:
+            stem = stem_cache[token] = spam_stem(token)
+        stems[bisect_right(lowered_starts, match.start()) - 1].append(stem)
+    
+    links = [0] * len(texts)
+    for match in SPAM_LINK_RE.finditer(lowered):
+        links[bisect_right(lowered_starts, match.start()) - 1] += 1
+    with_phone = {bisect_right(original_starts, match.start()) - 1
+                  for match in SPAM_PHONE_RE.finditer(SPAM_BATCH_SEPARATOR.join(texts))}
+    with_repeat = {bisect_right(lowered_starts, match.start()) - 1 for match in SPAM_REPEAT_RE.finditer(lowered)}
+    
+    scores = []
+    for index, text in enumerate(texts):
+        text_stems = stems[index]
+        features = set(text_stems)
+        features.update(f'{a} {b}' for a, b in zip(text_stems, text_stems[1:]))
+        total = weights.get('__bias__', 0.0)
+        total += sum(weights.get(feature, 0.0) for feature in features)
+        total += weights.get('__link__', 0.0) * min(links[index], 3)
+        if index in with_phone:
+            total += weights.get('__phone__', 0.0)
+        letters = [char for char in text if char.isalpha()]
+        if len(letters) >= 20 and sum(char.isupper() for char in letters) > len(letters) * 0.6:
+            total += weights.get('__caps__', 0.0)
+        if index in with_repeat:
+            total += weights.get('__repeat__', 0.0)
+        scores.append(1.0 / (1.0 + math.exp(-max(min(total, 50.0), -50.0))))
+    return scores
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Админ-модерация форума
     
     Пользователи:
-    GET /users - список всех пользователей
+    GET /users?limit=N&cursor=C&q=...&status=blocked|unverified - страница пользователей со счётчиками
     PUT /users/block - заблокировать пользователя
     PUT /users/unblock - разблокировать пользователя
+    PUT /users/purge - заблокировать пользователя и скрыть все его темы и сообщения
     
     Темы:
     GET /topics - все темы (включая скрытые)
     PUT /topics/hide - скрыть тему
     PUT /topics/show - показать тему
+    PUT /topics/bulk-hide - скрыть темы по списку topic_ids
     PUT /topics/pin - закрепить тему
     PUT /topics/unpin - открепить тему
     PUT /topics/lock - заблокировать тему
@@ -30,6 +205,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Сообщения:
     PUT /posts/hide - скрыть сообщение
     PUT /posts/show - показать сообщение
+    PUT /posts/bulk-hide - скрыть сообщения по списку post_ids
+    PUT /posts/bulk-show - показать сообщения по списку post_ids
+    
+    Обслуживание:
+    GET ?action=checkCounters[&fix=1] - сверить (и исправить) posts_count/last_post_at тем
+    GET ?action=spamScan[&limit=N&apply=1] - оценить последние N сообщений и тем на спам (и скрыть подозрительные)
+    GET ?action=spamBenchmark[&limit=N&rounds=R] - скорость оценки, сообщений в секунду
     """
     method = event.get('httpMethod', 'GET')
     
@@ -75,30 +257,228 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if method == 'GET':
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            if '/users' in path or action == 'getUsers':
+            if action == 'checkCounters':
                 cursor.execute("""
-                    SELECT 
-                        id, email, username, is_verified, is_blocked, blocked_reason, 
-                        blocked_at, created_at, last_login,
-                        (SELECT COUNT(*) FROM forum_topics WHERE author_id = forum_users.id) as topics_count,
-                        (SELECT COUNT(*) FROM forum_posts WHERE author_id = forum_users.id) as posts_count
-                    FROM forum_users
-                    ORDER BY created_at DESC
+                    SELECT t.id, t.posts_count, t.last_post_at,
+                           COALESCE(s.posts_count, 0) AS actual_posts_count, s.last_post_at AS actual_last_post_at
+                    FROM forum_topics t
+                    LEFT JOIN (
+                        SELECT topic_id, COUNT(*) AS posts_count, MAX(created_at) AS last_post_at
+                        FROM forum_posts
+                        WHERE is_hidden = FALSE
+                        GROUP BY topic_id
+                    ) s ON s.topic_id = t.id
+                    WHERE t.posts_count <> COALESCE(s.posts_count, 0)
+                       OR t.last_post_at IS DISTINCT FROM s.last_post_at
+                    ORDER BY t.id
                 """)
+                mismatches = cursor.fetchall()
+                
+                fixed = False
+                if mismatches and query_params.get('fix') in ('1', 'true'):
+                    refresh_topic_counters(cursor, [row['id'] for row in mismatches])
+                    conn.commit()
+                    fixed = True
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'mismatches': mismatches, 'fixed': fixed}, default=str),
+                    'isBase64Encoded': False
+                }
+            
+            if action in ('spamScan', 'spamBenchmark'):
+                try:
+                    limit = max(1, min(int(query_params.get('limit', SPAM_SCAN_LIMIT)), SPAM_SCAN_MAX_LIMIT))
+                    rounds = max(1, min(int(query_params.get('rounds', 5)), SPAM_BENCHMARK_MAX_ROUNDS))
+                except ValueError:
+                    cursor.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'limit и rounds должны быть числами'}),
+                        'isBase64Encoded': False
+                    }
+                
+                weights = load_spam_weights(conn)
+                cursor.execute("""
+                    SELECT id, topic_id, content FROM forum_posts
+                    WHERE is_hidden = FALSE
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, (limit,))
+                posts = cursor.fetchall()
+                
+                if action == 'spamBenchmark':
+                    cursor.close()
+                    texts = [post['content'] for post in posts]
+                    started = time.perf_counter()
+                    for _ in range(rounds):
+                        spam_score_batch(texts, weights)
+                    elapsed = time.perf_counter() - started
+                    scored = len(texts) * rounds
+                    
+                    return {
+                        'statusCode': 200,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({
+                            'posts_scored': scored,
+                            'seconds': round(elapsed, 6),
+                            'posts_per_second': round(scored / elapsed) if elapsed > 0 else None,
+                            'avg_microseconds': round(elapsed / scored * 1e6, 2) if scored else None
+                        }),
+                        'isBase64Encoded': False
+                    }
+                
+                cursor.execute("""
+                    SELECT id, title, description FROM forum_topics
+                    WHERE is_hidden = FALSE
+                    ORDER BY id DESC
+                    LIMIT %s
+                """, (limit,))
+                topics = cursor.fetchall()
+                
+                post_scores = spam_score_batch([post['content'] for post in posts], weights)
+                topic_scores = spam_score_batch([f"{topic['title']}\n{topic['description'] or ''}" for topic in topics], weights)
+                flagged_posts = [
+                    {'id': post['id'], 'topic_id': post['topic_id'], 'score': round(score, 3), 'excerpt': post['content'][:200]}
+                    for post, score in zip(posts, post_scores) if score >= SPAM_HIDE_THRESHOLD
+                ]
+                flagged_topics = [
+                    {'id': topic['id'], 'score': round(score, 3), 'title': topic['title']}
+                    for topic, score in zip(topics, topic_scores) if score >= SPAM_HIDE_THRESHOLD
+                ]
+                
+                applied = query_params.get('apply') in ('1', 'true')
+                hidden_posts = hidden_topics = 0
+                if applied and flagged_posts:
+                    cursor.execute("""
+                        UPDATE forum_posts p
+                        SET is_hidden = TRUE, hidden_reason = v.reason
+                        FROM unnest(%s::integer[], %s::text[]) AS v(id, reason)
+                        WHERE p.id = v.id AND p.is_hidden = FALSE
+                        RETURNING p.topic_id
+                    """, (
+                        [item['id'] for item in flagged_posts],
+                        [f"Автоматически скрыто: подозрение на спам ({item['score']:.2f})" for item in flagged_posts]
+                    ))
+                    topic_ids = [row['topic_id'] for row in cursor.fetchall()]
+                    hidden_posts = len(topic_ids)
+                    refresh_topic_counters(cursor, sorted(set(topic_ids)))
+                if applied and flagged_topics:
+                    cursor.execute("""
+                        UPDATE forum_topics t
+                        SET is_hidden = TRUE, hidden_reason = v.reason
+                        FROM unnest(%s::integer[], %s::text[]) AS v(id, reason)
+                        WHERE t.id = v.id AND t.is_hidden = FALSE
+                    """, (
+                        [item['id'] for item in flagged_topics],
+                        [f"Автоматически скрыто: подозрение на спам ({item['score']:.2f})" for item in flagged_topics]
+                    ))
+                    hidden_topics = cursor.rowcount
+                if applied:
+                    conn.commit()
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'scanned_posts': len(posts),
+                        'scanned_topics': len(topics),
+                        'threshold': SPAM_HIDE_THRESHOLD,
+                        'flagged_posts': flagged_posts,
+                        'flagged_topics': flagged_topics,
+                        'applied': applied,
+                        'hidden_posts': hidden_posts,
+                        'hidden_topics': hidden_topics
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            if '/users' in path or action == 'getUsers':
+                try:
+                    limit = max(1, min(int(query_params.get('limit', USERS_PAGE_SIZE)), USERS_MAX_PAGE_SIZE))
+                except ValueError:
+                    limit = USERS_PAGE_SIZE
+                
+                conditions = []
+                params: List[Any] = []
+                if query_params.get('cursor'):
+                    before_id = decode_users_cursor(query_params['cursor'])
+                    if before_id is None:
+                        cursor.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                            'body': json.dumps({'error': 'Некорректный курсор'}),
+                            'isBase64Encoded': False
+                        }
+                    conditions.append('id < %s')
+                    params.append(before_id)
+                
+                search = (query_params.get('q') or '').strip().lower()
+                if search:
+                    # Поиск по началу имени или email попадает в индексы text_pattern_ops
+                    pattern = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                    conditions.append('(lower(username) LIKE %s OR lower(email) LIKE %s)')
+                    params.extend([pattern, pattern])
+                
+                status = query_params.get('status')
+                if status == 'blocked':
+                    conditions.append('is_blocked = TRUE')
+                elif status == 'unverified':
+                    conditions.append('is_verified = FALSE')
+                
+                # Счётчики считаются одним группированным запросом только для пользователей страницы
+                cursor.execute(f"""
+                    WITH page AS (
+                        SELECT id, email, username, is_verified, is_blocked, blocked_reason,
+                               blocked_at, created_at, last_login
+                        FROM forum_users
+                        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+                        ORDER BY id DESC
+                        LIMIT %s
+                    )
+                    SELECT 
+                        page.*,
+                        COALESCE(t.topics_count, 0) AS topics_count,
+                        COALESCE(p.posts_count, 0) AS posts_count
+                    FROM page
+                    LEFT JOIN (
+                        SELECT author_id, COUNT(*) AS topics_count
+                        FROM forum_topics
+                        WHERE author_id IN (SELECT id FROM page)
+                        GROUP BY author_id
+                    ) t ON t.author_id = page.id
+                    LEFT JOIN (
+                        SELECT author_id, COUNT(*) AS posts_count
+                        FROM forum_posts
+                        WHERE author_id IN (SELECT id FROM page)
+                        GROUP BY author_id
+                    ) p ON p.author_id = page.id
+                    ORDER BY page.id DESC
+                """, (*params, limit + 1))
                 users = cursor.fetchall()
                 cursor.close()
                 
+                next_cursor = None
+                if len(users) > limit:
+                    users = users[:limit]
+                    next_cursor = encode_users_cursor(users[-1]['id'])
+                
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'users': users}, default=str),
+                    'body': json.dumps({'users': users, 'next_cursor': next_cursor}, default=str),
                     'isBase64Encoded': False
                 }
             
             elif '/topics' in path or action == 'getTopics':
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT 
-                        t.*,
+                        {TOPIC_SELECT_T},
                         u.username as author_username,
                         (SELECT COUNT(*) FROM forum_posts WHERE topic_id = t.id) as posts_count
                     FROM forum_topics t
@@ -120,9 +500,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 topic_id = query_params.get('topic_id')
                 
                 if topic_id:
-                    cursor.execute("""
+                    cursor.execute(f"""
                         SELECT 
-                            p.*,
+                            {POST_SELECT_P},
                             u.username as author_username
                         FROM forum_posts p
                         LEFT JOIN forum_users u ON p.author_id = u.id
@@ -130,9 +510,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         ORDER BY p.created_at ASC
                     """, (topic_id,))
                 else:
-                    cursor.execute("""
+                    cursor.execute(f"""
                         SELECT 
-                            p.*,
+                            {POST_SELECT_P},
                             u.username as author_username,
                             t.title as topic_title
                         FROM forum_posts p
@@ -156,13 +536,124 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             body = json.loads(event.get('body', '{}'))
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            if '/users/block' in path:
+            if '/users/purge' in path:
+                try:
+                    user_id = int(body.get('user_id'))
+                except (TypeError, ValueError):
+                    cursor.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Укажите user_id'}),
+                        'isBase64Encoded': False
+                    }
+                reason = body.get('reason', 'Нарушение правил форума')
+                
+                cursor.execute("""
+                    UPDATE forum_users 
+                    SET is_blocked = TRUE, blocked_reason = %s, blocked_at = CURRENT_TIMESTAMP,
+                        auth_token = NULL, auth_token_hash = NULL
+                    WHERE id = %s
+                    RETURNING id, username
+                """, (reason, user_id))
+                result = cursor.fetchone()
+                
+                if not result:
+                    conn.rollback()
+                    cursor.close()
+                    return {
+                        'statusCode': 404,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Пользователь не найден'}),
+                        'isBase64Encoded': False
+                    }
+                
+                cursor.execute("""
+                    UPDATE forum_posts 
+                    SET is_hidden = TRUE, hidden_reason = %s
+                    WHERE author_id = %s AND is_hidden = FALSE
+                    RETURNING topic_id
+                """, (reason, user_id))
+                topic_ids = [row['topic_id'] for row in cursor.fetchall()]
+                hidden_posts = len(topic_ids)
+                refresh_topic_counters(cursor, sorted(set(topic_ids)))
+                
+                cursor.execute(
+                    "UPDATE forum_topics SET is_hidden = TRUE WHERE author_id = %s AND is_hidden = FALSE",
+                    (user_id,)
+                )
+                hidden_topics = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'success': True,
+                        'message': f'Пользователь {result["username"]} заблокирован, его темы и сообщения скрыты',
+                        'hidden_posts': hidden_posts,
+                        'hidden_topics': hidden_topics
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            elif '/topics/bulk-hide' in path or '/posts/bulk-hide' in path or '/posts/bulk-show' in path:
+                is_topics = '/topics/' in path
+                ids = parse_id_list(body.get('topic_ids') if is_topics else body.get('post_ids'))
+                if ids is None:
+                    cursor.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Укажите непустой список {"topic_ids" if is_topics else "post_ids"} (не более {BULK_MAX_IDS})'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if is_topics:
+                    cursor.execute(
+                        "UPDATE forum_topics SET is_hidden = TRUE WHERE id = ANY(%s) AND is_hidden = FALSE",
+                        (ids,)
+                    )
+                    updated = cursor.rowcount
+                elif '/posts/bulk-hide' in path:
+                    cursor.execute("""
+                        UPDATE forum_posts 
+                        SET is_hidden = TRUE, hidden_reason = %s
+                        WHERE id = ANY(%s) AND is_hidden = FALSE
+                        RETURNING topic_id
+                    """, (body.get('reason', 'Нарушение правил'), ids))
+                    topic_ids = [row['topic_id'] for row in cursor.fetchall()]
+                    updated = len(topic_ids)
+                    refresh_topic_counters(cursor, sorted(set(topic_ids)))
+                else:
+                    cursor.execute("""
+                        UPDATE forum_posts 
+                        SET is_hidden = FALSE, hidden_reason = NULL
+                        WHERE id = ANY(%s) AND is_hidden = TRUE
+                        RETURNING topic_id
+                    """, (ids,))
+                    topic_ids = [row['topic_id'] for row in cursor.fetchall()]
+                    updated = len(topic_ids)
+                    refresh_topic_counters(cursor, sorted(set(topic_ids)))
+                conn.commit()
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'success': True, 'requested': len(ids), 'updated': updated}),
+                    'isBase64Encoded': False
+                }
+            
+            elif '/users/block' in path:
                 user_id = body.get('user_id')
                 reason = body.get('reason', 'Нарушение правил форума')
                 
                 cursor.execute("""
                     UPDATE forum_users 
-                    SET is_blocked = TRUE, blocked_reason = %s, blocked_at = CURRENT_TIMESTAMP
+                    SET is_blocked = TRUE, blocked_reason = %s, blocked_at = CURRENT_TIMESTAMP,
+                        auth_token = NULL, auth_token_hash = NULL
                     WHERE id = %s
                     RETURNING id, username
                 """, (reason, user_id))
@@ -212,7 +703,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             elif '/topics/show' in path:
                 topic_id = body.get('topic_id')
-                cursor.execute("UPDATE forum_topics SET is_hidden = FALSE WHERE id = %s", (topic_id,))
+                cursor.execute("UPDATE forum_topics SET is_hidden = FALSE, hidden_reason = NULL WHERE id = %s", (topic_id,))
                 conn.commit()
                 cursor.close()
                 
@@ -283,7 +774,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     UPDATE forum_posts 
                     SET is_hidden = TRUE, hidden_reason = %s
                     WHERE id = %s
+                    RETURNING topic_id
                 """, (reason, post_id))
+                refresh_topic_counters(cursor, [row['topic_id'] for row in cursor.fetchall()])
                 conn.commit()
                 cursor.close()
                 
@@ -301,7 +794,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     UPDATE forum_posts 
                     SET is_hidden = FALSE, hidden_reason = NULL
                     WHERE id = %s
+                    RETURNING topic_id
                 """, (post_id,))
+                refresh_topic_counters(cursor, [row['topic_id'] for row in cursor.fetchall()])
                 conn.commit()
                 cursor.close()
                 
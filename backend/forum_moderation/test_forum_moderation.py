@@ -0,0 +1,96 @@
+import ast
+import importlib.util
+import inspect
+import os
+import re
+import unittest
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+SEED_MIGRATION = os.path.join(BACKEND_DIR, '..', 'db_migrations', 'V0050__create_forum_spam_terms.sql')
+# Скоринг спама продублирован в каждой функции (функции деплоятся независимо), проверяются все копии
+SPAM_COPIES = ('forum_moderation', 'forum_posts', 'forum_topics')
+SPAM_SHARED = ('spam_stem', 'normalize_spam_term', 'spam_features', 'load_spam_weights', 'spam_score')
+SPAM_CONSTANTS = ('SPAM_HIDE_THRESHOLD', 'SPAM_STEM_LENGTH', 'SPAM_STEM_MIN_LENGTH', 'SPAM_TOKEN_RE',
+                  'SPAM_LINK_RE', 'SPAM_PHONE_RE', 'SPAM_REPEAT_RE', 'SPAM_STEM_TRAILING')
+
+
+def load_index(function: str):
+    spec = importlib.util.spec_from_file_location(f'{function}_index', os.path.join(BACKEND_DIR, function, 'index.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+MODULES = {function: load_index(function) for function in SPAM_COPIES}
+spam_score_batch = MODULES['forum_moderation'].spam_score_batch
+
+
+def seed_terms() -> dict:
+    with open(SEED_MIGRATION, encoding='utf-8') as migration:
+        return {term: float(weight) for term, weight in re.findall(r"\('([^']+)', (-?[\d.]+)\)", migration.read())}
+
+
+class SpamCopiesTest(unittest.TestCase):
+    def test_copies_are_identical(self):
+        reference = MODULES['forum_moderation']
+        for function, module in MODULES.items():
+            for name in SPAM_SHARED:
+                with self.subTest(function=function, name=name):
+                    self.assertEqual(ast.dump(ast.parse(inspect.getsource(getattr(module, name)))),
+                                     ast.dump(ast.parse(inspect.getsource(getattr(reference, name)))))
+            for name in SPAM_CONSTANTS:
+                with self.subTest(function=function, name=name):
+                    self.assertEqual(getattr(module, name), getattr(reference, name))
+
+
+class SpamSeedTermsTest(unittest.TestCase):
+    def test_every_seed_term_matches_itself(self):
+        terms = [term for term in seed_terms() if not term.startswith('__')]
+        self.assertGreater(len(terms), 50)
+        for function, module in MODULES.items():
+            for term in terms:
+                with self.subTest(function=function, term=term):
+                    self.assertIn(module.normalize_spam_term(term), module.spam_features(term))
+
+    def test_short_seed_stems_match_inflected_forms(self):
+        cases = {
+            'займ': ['займы', 'займа', 'займов'],
+            'врач': ['врача', 'врачу', 'врачей'],
+            'боль': ['боли', 'болью'],
+            'урод': ['уроды'],
+            'акция': ['акции', 'акцию'],
+            'прода': ['продам', 'продажа'],
+            'без вложе': ['без вложений'],
+        }
+        for function, module in MODULES.items():
+            for term, forms in cases.items():
+                weights = {module.normalize_spam_term(term): 10.0}
+                for form in forms:
+                    with self.subTest(function=function, term=term, form=form):
+                        self.assertGreater(module.spam_score(f'Текст: {form}', weights), 0.99)
+
+
+class SpamBatchTest(unittest.TestCase):
+    def test_batch_matches_single_scores(self):
+        module = MODULES['forum_moderation']
+        weights = {module.normalize_spam_term(term): weight for term, weight in seed_terms().items()}
+        texts = [
+            '',
+            'Запишусь к кардиологу на следующей неделе',
+            'Быстрые займы без вложений! Пишите +7 (912) 345-67-89',
+            'ЗАРАБОТОК ДОМА БЕЗ ВЛОЖЕНИЙ ПРЯМО СЕЙЧАС ЗВОНИТЕ',
+            'скидки на сайте shop.ru и www.example.com, ещё http://spam.xyz и best.top',
+            'ааааааа ну как так',
+            'телефон в конце +7',
+            '912 345-67-89 в начале следующего текста',
+            'İSTANBUL клиника 8 912 345 67 89',
+            'конец с повтором ааа',
+            'ааа и начало',
+        ]
+        expected = [module.spam_score(text, weights) for text in texts]
+        self.assertEqual(spam_score_batch(texts, weights), expected)
+        self.assertEqual(spam_score_batch([], weights), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,26 +1,219 @@
+import base64
+import hashlib
 import json
+import math
 import os
+import re
+import select
+import time
 import psycopg2
+from datetime import datetime
 from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+POSTS_PAGE_SIZE = 50
+POSTS_MAX_PAGE_SIZE = 200
+EVENTS_MAX_LIMIT = 200
+EVENTS_MAX_WAIT_SECONDS = 25
+EVENTS_RECHECK_SECONDS = 1
+EVENTS_RETENTION_HOURS = 24
+HOT_POST_WEIGHT = 1.0
+SPAM_HIDE_THRESHOLD = 0.9
+SPAM_WEIGHTS_TTL_SECONDS = 300
+SPAM_STEM_LENGTH = 5
+SPAM_STEM_MIN_LENGTH = 3
+
+SPAM_TOKEN_RE = re.compile(r'[a-zа-яё0-9]+')
+SPAM_LINK_RE = re.compile(r'https?://|www\.|\b[a-z0-9-]+\.(?:ru|com|net|org|info|biz|xyz|top|online|site|shop|io|me)\b')
+SPAM_PHONE_RE = re.compile(r'(?:\+7|\b8)[\s\-()]*\d{3}[\s\-()]*\d{3}[\s\-]*\d{2}[\s\-]*\d{2}')
+SPAM_REPEAT_RE = re.compile(r'(.)\1{4,}')
+SPAM_STEM_TRAILING = frozenset('аеёиоуыэюяьй')
+
+# search_vector нужен только полнотекстовому поиску: в выборки для ответов API он не попадает
+POST_COLUMNS = ('id', 'topic_id', 'author_id', 'content', 'images', 'is_hidden', 'hidden_reason', 'created_at', 'updated_at')
+POST_SELECT = ', '.join(POST_COLUMNS)
+POST_SELECT_P = ', '.join(f'p.{column}' for column in POST_COLUMNS)
+
+# Веса из forum_spam_terms живут в памяти тёплого экземпляра и перечитываются раз в TTL
+spam_weights_state: Dict[str, Any] = {'weights': None, 'loaded_at': 0.0}
+
+def encode_posts_cursor(post: Dict[str, Any]) -> str:
+    """Непрозрачный курсор страницы из ключа сортировки (created_at, id) последнего сообщения"""
+    raw = json.dumps([post['created_at'].isoformat(), post['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_posts_cursor(cursor_value: str) -> Optional[Tuple[datetime, int]]:
+    """Разбор курсора страницы, None если курсор повреждён"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor_value + '=' * (-len(cursor_value) % 4))
+        created_at, post_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (ValueError, TypeError):
+        return None
+
+def hash_token(token: str) -> str:
+    """SHA-256 токена сессии, в БД хранится только он"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
 
 def get_user_from_token(conn, token: str):
+    """Пользователь по токену; проверяется в БД при каждой записи, чтобы блокировка и повторный вход действовали сразу"""
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     cursor.execute(
-        "SELECT id, username, is_blocked FROM forum_users WHERE auth_token = %s AND is_verified = TRUE",
-        (token,)
+        "SELECT id, username FROM forum_users WHERE auth_token_hash = %s AND is_verified = TRUE AND is_blocked IS NOT TRUE",
+        (hash_token(token),)
     )
     user = cursor.fetchone()
     cursor.close()
-    
-    if not user or user['is_blocked']:
+    return dict(user) if user else None
+
+def refresh_topic_counters(cursor, topic_ids: list):
+    """Пересчёт posts_count и last_post_at для тем по видимым сообщениям"""
+    cursor.execute("""
+        UPDATE forum_topics t
+        SET posts_count = COALESCE(s.posts_count, 0), last_post_at = s.last_post_at
+        FROM (SELECT unnest(%s::integer[]) AS topic_id) ids
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS posts_count, MAX(created_at) AS last_post_at
+            FROM forum_posts
+            WHERE topic_id = ids.topic_id AND is_hidden = FALSE
+        ) s ON TRUE
+        WHERE t.id = ids.topic_id
+    """, (topic_ids,))
+
+def parse_events_cursor(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Курсор событий "XACT_ID:ID"; пустой или 0 - подписка с текущего момента (None)"""
+    if not value or value == '0':
         return None
-    return user
+    xact_id, event_id = value.split(':')
+    return int(xact_id), int(event_id)
+
+def events_watermark(conn) -> int:
+    """Граница фиксации: все транзакции с xact_id ниже неё уже завершены, их события окончательны"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+    watermark = int(cursor.fetchone()[0])
+    cursor.close()
+    return watermark
+
+def fetch_post_events(conn, topic_id: int, after: Tuple[int, int], limit: int) -> Tuple[list, Tuple[int, int]]:
+    """
+    События сообщений темы после курсора (xact_id, id); для видимых сообщений - актуальное содержимое.
+    Отдаются только события ниже границы фиксации, поздно зафиксированное событие не оказывается за курсором.
+    """
+    watermark = events_watermark(conn)
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        SELECT 
+            e.id, e.xact_id::text AS xact_id, e.operation, e.post_id, e.created_at,
+            CASE WHEN p.is_hidden = FALSE THEN json_build_object(
+                'id', p.id,
+                'topic_id', p.topic_id,
+                'author_id', p.author_id,
+                'author_username', u.username,
+                'content', p.content,
+                'images', p.images,
+                'created_at', p.created_at::text,
+                'updated_at', p.updated_at::text
+            ) END AS post
+        FROM forum_post_events e
+        LEFT JOIN forum_posts p ON p.id = e.post_id
+        LEFT JOIN forum_users u ON u.id = p.author_id
+        WHERE e.topic_id = %s AND (e.xact_id, e.id) > (%s::text::xid8, %s) AND e.xact_id < %s::text::xid8
+        ORDER BY e.xact_id, e.id
+        LIMIT %s
+    """, (topic_id, after[0], after[1], watermark, limit))
+    events = cursor.fetchall()
+    cursor.close()
+    
+    # Неполная страница: всё ниже границы просмотрено, курсор можно поднять до неё
+    if len(events) == limit:
+        next_cursor = (int(events[-1]['xact_id']), events[-1]['id'])
+    else:
+        next_cursor = max(after, (watermark, 0))
+    return events, next_cursor
+
+def prune_post_events(cursor) -> None:
+    """Удаление событий старше EVENTS_RETENTION_HOURS: подписчики читают ленту непрерывно, старые события не нужны"""
+    cursor.execute(
+        "DELETE FROM forum_post_events WHERE created_at < CURRENT_TIMESTAMP - make_interval(hours => %s)",
+        (EVENTS_RETENTION_HOURS,)
+    )
+
+def wait_for_topic_event(conn, topic_id: int, timeout: float) -> bool:
+    """Ожидание NOTIFY forum_post_events по нужной теме; чужие темы в БД не ходят"""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if select.select([conn], [], [], remaining) == ([], [], []):
+            return False
+        conn.poll()
+        matched = False
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                matched = matched or json.loads(notify.payload).get('topic_id') == topic_id
+            except ValueError:
+                matched = True
+        if matched:
+            return True
+
+def spam_stem(token: str) -> str:
+    """Основа слова: первые SPAM_STEM_LENGTH букв без хвостовых гласных, ь и й (займы/займ, врача/врач)"""
+    stem = token[:SPAM_STEM_LENGTH]
+    while len(stem) > SPAM_STEM_MIN_LENGTH and stem[-1] in SPAM_STEM_TRAILING:
+        stem = stem[:-1]
+    return stem
+
+def normalize_spam_term(term: str) -> str:
+    """Термин из forum_spam_terms к виду признаков текста; служебные __...__ не меняются"""
+    if term.startswith('__'):
+        return term
+    return ' '.join(spam_stem(token) for token in SPAM_TOKEN_RE.findall(term.lower()))
+
+def spam_features(text: str) -> set:
+    """Признаки текста: основы слов и пары соседних основ"""
+    stems = [spam_stem(token) for token in SPAM_TOKEN_RE.findall(text.lower())]
+    features = set(stems)
+    features.update(f'{a} {b}' for a, b in zip(stems, stems[1:]))
+    return features
+
+def load_spam_weights(conn) -> Dict[str, float]:
+    """Веса модели спама из forum_spam_terms (термины приводятся к основам, как слова текста) с кешем на SPAM_WEIGHTS_TTL_SECONDS"""
+    now = time.monotonic()
+    if spam_weights_state['weights'] is None or now - spam_weights_state['loaded_at'] >= SPAM_WEIGHTS_TTL_SECONDS:
+        cursor = conn.cursor()
+        cursor.execute("SELECT term, weight FROM forum_spam_terms ORDER BY term")
+        weights: Dict[str, float] = {}
+        for term, weight in cursor.fetchall():
+            weights.setdefault(normalize_spam_term(term), float(weight))
+        spam_weights_state['weights'] = weights
+        spam_weights_state['loaded_at'] = now
+        cursor.close()
+    return spam_weights_state['weights']
+
+def spam_score(text: str, weights: Dict[str, float]) -> float:
+    """Оценка 0..1: сигмоида суммы весов основ слов, пар основ и служебных признаков"""
+    lowered = text.lower()
+    total = weights.get('__bias__', 0.0)
+    total += sum(weights.get(feature, 0.0) for feature in spam_features(text))
+    total += weights.get('__link__', 0.0) * min(len(SPAM_LINK_RE.findall(lowered)), 3)
+    if SPAM_PHONE_RE.search(text):
+        total += weights.get('__phone__', 0.0)
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) >= 20 and sum(char.isupper() for char in letters) > len(letters) * 0.6:
+        total += weights.get('__caps__', 0.0)
+    if SPAM_REPEAT_RE.search(lowered):
+        total += weights.get('__repeat__', 0.0)
+    return 1.0 / (1.0 + math.exp(-max(min(total, 50.0), -50.0)))
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Управление сообщениями форума
-    GET /?topic_id=X - получить сообщения темы
+    GET /?topic_id=X[&limit=N&cursor=C] - страница сообщений темы, next_cursor для следующей, posts_count темы
+    GET /?topic_id=X&since_id=Y - только сообщения новее Y (для опроса открытой темы)
+    GET /?topic_id=X&action=events&last_event_id=CURSOR&wait=S - long-poll событий темы (новые, изменённые, скрытые)
     POST / - создать сообщение (требуется авторизация)
     PUT / - обновить сообщение (автор)
     DELETE /?id=X - удалить сообщение (автор)
@@ -33,7 +226,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Token',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Token, Last-Event-ID',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -64,23 +257,121 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
+            if query_params.get('action') == 'events':
+                headers = event.get('headers') or {}
+                try:
+                    topic_id = int(topic_id)
+                    after = parse_events_cursor(query_params.get('last_event_id') or headers.get('last-event-id') or headers.get('Last-Event-ID'))
+                    wait = max(0, min(int(query_params.get('wait', EVENTS_MAX_WAIT_SECONDS)), EVENTS_MAX_WAIT_SECONDS))
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'topic_id и wait должны быть числами, last_event_id - курсором из прошлого ответа'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if after is None:
+                    # Первый запрос: курсор от текущей границы фиксации, дальше обычный long-poll
+                    after = (events_watermark(conn), 0)
+                
+                events, next_cursor = fetch_post_events(conn, topic_id, after, EVENTS_MAX_LIMIT)
+                
+                if not events and wait:
+                    # LISTEN до повторной проверки, чтобы не потерять уведомление между SELECT и ожиданием
+                    conn.rollback()
+                    conn.autocommit = True
+                    cursor = conn.cursor()
+                    cursor.execute("LISTEN forum_post_events")
+                    cursor.close()
+                    
+                    events, next_cursor = fetch_post_events(conn, topic_id, after, EVENTS_MAX_LIMIT)
+                    deadline = time.monotonic() + wait
+                    # Событие темы может ждать более старую незавершённую транзакцию из другой темы:
+                    # пока оно задержано, лента перечитывается раз в EVENTS_RECHECK_SECONDS
+                    held = False
+                    while not events:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        matched = wait_for_topic_event(conn, topic_id, min(remaining, EVENTS_RECHECK_SECONDS) if held else remaining)
+                        if not matched and not held:
+                            break
+                        events, next_cursor = fetch_post_events(conn, topic_id, after, EVENTS_MAX_LIMIT)
+                        held = held or matched
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'events': events,
+                        'last_event_id': f'{next_cursor[0]}:{next_cursor[1]}'
+                    }, default=str),
+                    'isBase64Encoded': False
+                }
+            
+            try:
+                limit = max(1, min(int(query_params.get('limit', POSTS_PAGE_SIZE)), POSTS_MAX_PAGE_SIZE))
+                since_id = int(query_params['since_id']) if query_params.get('since_id') else None
+            except ValueError:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'limit и since_id должны быть числами'}),
+                    'isBase64Encoded': False
+                }
+            
+            after = None
+            if query_params.get('cursor'):
+                after = decode_posts_cursor(query_params['cursor'])
+                if not after:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Некорректный курсор'}),
+                        'isBase64Encoded': False
+                    }
+            
+            # Обе выборки идут по idx_forum_posts_topic_created в порядке (created_at, id)
+            if after:
+                condition, params = 'AND (p.created_at, p.id) > (%s, %s)', [*after]
+            elif since_id:
+                condition = 'AND (p.created_at, p.id) > (SELECT created_at, id FROM forum_posts WHERE id = %s)'
+                params = [since_id]
+            else:
+                condition, params = '', []
+            
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT 
-                    p.*,
+                    {POST_SELECT_P},
                     u.username as author_username
                 FROM forum_posts p
                 LEFT JOIN forum_users u ON p.author_id = u.id
-                WHERE p.topic_id = %s AND p.is_hidden = FALSE
-                ORDER BY p.created_at ASC
-            """, (topic_id,))
+                WHERE p.topic_id = %s AND p.is_hidden = FALSE {condition}
+                ORDER BY p.created_at ASC, p.id ASC
+                LIMIT %s
+            """, (topic_id, *params, limit + 1))
             posts = cursor.fetchall()
+            
+            # Счётчик темы отдаётся вместе со страницей, чтобы клиент обновлял заголовок без запроса темы
+            cursor.execute("SELECT posts_count FROM forum_topics WHERE id = %s", (topic_id,))
+            topic = cursor.fetchone()
             cursor.close()
             
+            next_cursor = None
+            if len(posts) > limit:
+                posts = posts[:limit]
+                next_cursor = encode_posts_cursor(posts[-1])
+            
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'posts': posts}, default=str),
+                'body': json.dumps({
+                    'posts': posts,
+                    'next_cursor': next_cursor,
+                    'posts_count': topic['posts_count'] if topic else 0
+                }, default=str),
                 'isBase64Encoded': False
             }
         
@@ -120,7 +411,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
-            cursor.execute("SELECT * FROM forum_topics WHERE id = %s", (topic_id,))
+            cursor.execute("SELECT id, is_locked FROM forum_topics WHERE id = %s", (topic_id,))
             topic = cursor.fetchone()
             
             if not topic:
@@ -141,24 +432,36 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
-            cursor.execute("""
-                INSERT INTO forum_posts (topic_id, author_id, content, images, is_hidden, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, FALSE, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                RETURNING *
-            """, (topic_id, user['id'], content, json.dumps(images)))
-            post = cursor.fetchone()
+            # Подозрительное сообщение сохраняется скрытым и ждёт решения модератора
+            score = spam_score(content, load_spam_weights(conn))
+            hidden_reason = f'Автоматически скрыто: подозрение на спам ({score:.2f})' if score >= SPAM_HIDE_THRESHOLD else None
             
-            cursor.execute("""
-                UPDATE forum_topics SET updated_at = CURRENT_TIMESTAMP WHERE id = %s
-            """, (topic_id,))
+            cursor.execute(f"""
+                INSERT INTO forum_posts (topic_id, author_id, content, images, is_hidden, hidden_reason, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                RETURNING {POST_SELECT}
+            """, (topic_id, user['id'], content, json.dumps(images), hidden_reason is not None, hidden_reason))
+            post = cursor.fetchone()
             
+            if not hidden_reason:
+                cursor.execute("""
+                    UPDATE forum_topics
+                    SET updated_at = CURRENT_TIMESTAMP,
+                        posts_count = posts_count + 1,
+                        last_post_at = GREATEST(last_post_at, %s),
+                        hot_score = forum_hot_add(hot_score, %s, %s)
+                    WHERE id = %s
+                """, (post['created_at'], HOT_POST_WEIGHT, post['created_at'], topic_id))
+            
+            # Лента событий растёт вместе с сообщениями, поэтому и чистится здесь же
+            prune_post_events(cursor)
             conn.commit()
             cursor.close()
             
             return {
                 'statusCode': 201,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True, 'post': post}, default=str),
+                'body': json.dumps({'success': True, 'post': post, 'pending_moderation': hidden_reason is not None}, default=str),
                 'isBase64Encoded': False
             }
         
@@ -197,7 +500,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT * FROM forum_posts WHERE id = %s", (post_id,))
+            cursor.execute("SELECT id, topic_id, author_id, is_hidden FROM forum_posts WHERE id = %s", (post_id,))
             post = cursor.fetchone()
             
             if not post:
@@ -218,20 +521,28 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
-            cursor.execute("""
+            # Правка проверяется так же, как новое сообщение; чистая правка скрытое модератором не открывает
+            score = spam_score(content, load_spam_weights(conn))
+            hidden_reason = f'Автоматически скрыто: подозрение на спам ({score:.2f})' if score >= SPAM_HIDE_THRESHOLD else None
+            
+            cursor.execute(f"""
                 UPDATE forum_posts 
-                SET content = %s, images = %s, updated_at = CURRENT_TIMESTAMP
+                SET content = %s, images = %s, updated_at = CURRENT_TIMESTAMP,
+                    is_hidden = is_hidden OR %s,
+                    hidden_reason = COALESCE(%s, hidden_reason)
                 WHERE id = %s
-                RETURNING *
-            """, (content, json.dumps(images), post_id))
+                RETURNING {POST_SELECT}
+            """, (content, json.dumps(images), hidden_reason is not None, hidden_reason, post_id))
             updated_post = cursor.fetchone()
+            if hidden_reason and not post['is_hidden']:
+                refresh_topic_counters(cursor, [post['topic_id']])
             conn.commit()
             cursor.close()
             
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True, 'post': updated_post}, default=str),
+                'body': json.dumps({'success': True, 'post': updated_post, 'pending_moderation': hidden_reason is not None}, default=str),
                 'isBase64Encoded': False
             }
         
@@ -268,7 +579,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT * FROM forum_posts WHERE id = %s", (post_id,))
+            cursor.execute("SELECT id, topic_id, author_id FROM forum_posts WHERE id = %s", (post_id,))
             post = cursor.fetchone()
             
             if not post:
@@ -290,6 +601,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             cursor.execute("UPDATE forum_posts SET is_hidden = TRUE, hidden_reason = %s WHERE id = %s", ('Удалено автором', post_id))
+            refresh_topic_counters(cursor, [post['topic_id']])
             conn.commit()
             cursor.close()
             
@@ -0,0 +1,76 @@
+import importlib.util
+import os
+import unittest
+
+import psycopg2
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), 'index.py')
+spec = importlib.util.spec_from_file_location('forum_posts_index', INDEX_PATH)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+events_watermark = index.events_watermark
+fetch_post_events = index.fetch_post_events
+prune_post_events = index.prune_post_events
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+TEST_TOPIC_ID = 999999
+
+
+def insert_event(conn, post_id: int, created_at: str = 'CURRENT_TIMESTAMP') -> None:
+    cursor = conn.cursor()
+    cursor.execute(
+        f"INSERT INTO forum_post_events (topic_id, post_id, operation, created_at) VALUES (%s, %s, 'created', {created_at})",
+        (TEST_TOPIC_ID, post_id)
+    )
+    cursor.close()
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL не задан')
+class PostEventsFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.poller = psycopg2.connect(TEST_DATABASE_URL)
+        self.poller.autocommit = True
+        self.first = psycopg2.connect(TEST_DATABASE_URL)
+        self.second = psycopg2.connect(TEST_DATABASE_URL)
+
+    def tearDown(self):
+        for conn in (self.first, self.second):
+            conn.rollback()
+            conn.close()
+        cursor = self.poller.cursor()
+        cursor.execute("DELETE FROM forum_post_events WHERE topic_id = %s", (TEST_TOPIC_ID,))
+        cursor.close()
+        self.poller.close()
+
+    def test_out_of_order_commit_is_not_skipped(self):
+        after = (events_watermark(self.poller), 0)
+
+        insert_event(self.first, 1)
+        insert_event(self.second, 2)
+        self.second.commit()
+
+        events, after = fetch_post_events(self.poller, TEST_TOPIC_ID, after, 100)
+        self.assertEqual(events, [])
+
+        self.first.commit()
+        events, after = fetch_post_events(self.poller, TEST_TOPIC_ID, after, 100)
+        self.assertEqual([event['post_id'] for event in events], [1, 2])
+
+        events, _ = fetch_post_events(self.poller, TEST_TOPIC_ID, after, 100)
+        self.assertEqual(events, [])
+
+    def test_prune_removes_only_expired_events(self):
+        insert_event(self.first, 1, "CURRENT_TIMESTAMP - INTERVAL '3 days'")
+        insert_event(self.first, 2)
+        self.first.commit()
+
+        cursor = self.first.cursor()
+        prune_post_events(cursor)
+        self.first.commit()
+        cursor.execute("SELECT post_id FROM forum_post_events WHERE topic_id = %s", (TEST_TOPIC_ID,))
+        self.assertEqual([row[0] for row in cursor.fetchall()], [2])
+        cursor.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
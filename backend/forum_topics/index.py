@@ -1,29 +1,246 @@
+import base64
+import hashlib
 import json
+import math
 import os
+import re
+import threading
+import time
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from datetime import datetime
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Dict, Any, Optional, Tuple
+
+TOPICS_PAGE_SIZE = 30
+TOPICS_MAX_PAGE_SIZE = 100
+VIEWS_FLUSH_INTERVAL_SECONDS = 30
+VIEWS_FLUSH_THRESHOLD = 100
+HOT_VIEW_WEIGHT = 0.1
+SPAM_HIDE_THRESHOLD = 0.9
+SPAM_WEIGHTS_TTL_SECONDS = 300
+SPAM_STEM_LENGTH = 5
+SPAM_STEM_MIN_LENGTH = 3
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_MAX_OFFSET = 1000
+
+SPAM_TOKEN_RE = re.compile(r'[a-zа-яё0-9]+')
+SPAM_LINK_RE = re.compile(r'https?://|www\.|\b[a-z0-9-]+\.(?:ru|com|net|org|info|biz|xyz|top|online|site|shop|io|me)\b')
+SPAM_PHONE_RE = re.compile(r'(?:\+7|\b8)[\s\-()]*\d{3}[\s\-()]*\d{3}[\s\-]*\d{2}[\s\-]*\d{2}')
+SPAM_REPEAT_RE = re.compile(r'(.)\1{4,}')
+SPAM_STEM_TRAILING = frozenset('аеёиоуыэюяьй')
+
+# search_vector нужен только полнотекстовому поиску: в выборки для ответов API он не попадает
+TOPIC_COLUMNS = ('id', 'title', 'description', 'author_id', 'is_locked', 'is_pinned', 'is_hidden', 'hidden_reason',
+                 'views_count', 'posts_count', 'last_post_at', 'hot_score', 'created_at', 'updated_at')
+TOPIC_SELECT = ', '.join(TOPIC_COLUMNS)
+TOPIC_SELECT_T = ', '.join(f't.{column}' for column in TOPIC_COLUMNS)
+
+# Веса из forum_spam_terms живут в памяти тёплого экземпляра и перечитываются раз в TTL
+spam_weights_state: Dict[str, Any] = {'weights': None, 'loaded_at': 0.0}
+
+# Просмотры копятся в памяти тёплого экземпляра функции и сбрасываются в БД пачкой: в конце любого вызова,
+# если буфер большой или прошло VIEWS_FLUSH_INTERVAL_SECONDS, и принудительно по POST {action: "flush_views"}
+# от таймера. Окно потерь остаётся: экземпляр, остановленный платформой до следующего своего вызова, теряет
+# несохранённые просмотры (меньше VIEWS_FLUSH_THRESHOLD или за последние VIEWS_FLUSH_INTERVAL_SECONDS),
+# а таймер сбрасывает буфер только того экземпляра, на который попал вызов
+pending_views: Dict[int, int] = {}
+pending_views_lock = threading.Lock()
+pending_views_state = {'flushed_at': time.monotonic()}
+
+def record_topic_view(topic_id: int) -> int:
+    """Учёт просмотра в буфере, возвращает число ещё не сохранённых просмотров темы"""
+    with pending_views_lock:
+        pending_views[topic_id] = pending_views.get(topic_id, 0) + 1
+        return pending_views[topic_id]
+
+def flush_topic_views(conn, force: bool = False) -> int:
+    """Сброс накопленных просмотров одним UPDATE, если буфер большой или давно не сбрасывался"""
+    with pending_views_lock:
+        total = sum(pending_views.values())
+        due = time.monotonic() - pending_views_state['flushed_at'] >= VIEWS_FLUSH_INTERVAL_SECONDS
+        if not total or not (force or due or total >= VIEWS_FLUSH_THRESHOLD):
+            return 0
+        batch = sorted(pending_views.items())
+        pending_views.clear()
+        pending_views_state['flushed_at'] = time.monotonic()
+    
+    cursor = conn.cursor()
+    try:
+        execute_values(
+            cursor,
+            f"""UPDATE forum_topics AS t
+               SET views_count = t.views_count + v.views,
+                   hot_score = forum_hot_add(t.hot_score, {HOT_VIEW_WEIGHT} * v.views, LOCALTIMESTAMP)
+               FROM (VALUES %s) AS v(id, views)
+               WHERE t.id = v.id""",
+            batch,
+            template='(%s::integer, %s::integer)',
+            page_size=len(batch)
+        )
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+        with pending_views_lock:
+            for topic_id, views in batch:
+                pending_views[topic_id] = pending_views.get(topic_id, 0) + views
+        raise
+    finally:
+        cursor.close()
+    return total
+
+def encode_topics_cursor(topic: Dict[str, Any]) -> str:
+    """Непрозрачный курсор страницы из ключа сортировки (is_pinned, updated_at, id) последней темы"""
+    raw = json.dumps([topic['is_pinned'], topic['updated_at'].isoformat(), topic['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_topics_cursor(cursor_value: str) -> Optional[Tuple[bool, datetime, int]]:
+    """Разбор курсора страницы, None если курсор повреждён"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor_value + '=' * (-len(cursor_value) % 4))
+        is_pinned, updated_at, topic_id = json.loads(raw)
+        return bool(is_pinned), datetime.fromisoformat(updated_at), int(topic_id)
+    except (ValueError, TypeError):
+        return None
+
+def encode_hot_cursor(topic: Dict[str, Any]) -> str:
+    """Непрозрачный курсор страницы режима sort=hot из ключа (hot_score, id) последней темы"""
+    raw = json.dumps(['hot', topic['hot_score'], topic['id']])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_hot_cursor(cursor_value: str) -> Optional[Tuple[float, int]]:
+    """Разбор курсора режима sort=hot, None если курсор повреждён"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor_value + '=' * (-len(cursor_value) % 4))
+        mode, hot_score, topic_id = json.loads(raw)
+        if mode != 'hot':
+            return None
+        return float(hot_score), int(topic_id)
+    except (ValueError, TypeError):
+        return None
+
+def hash_token(token: str) -> str:
+    """SHA-256 токена сессии, в БД хранится только он"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
 
 def get_user_from_token(conn, token: str):
+    """Пользователь по токену; проверяется в БД при каждой записи, чтобы блокировка и повторный вход действовали сразу"""
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     cursor.execute(
-        "SELECT id, username, is_blocked FROM forum_users WHERE auth_token = %s AND is_verified = TRUE",
-        (token,)
+        "SELECT id, username FROM forum_users WHERE auth_token_hash = %s AND is_verified = TRUE AND is_blocked IS NOT TRUE",
+        (hash_token(token),)
     )
     user = cursor.fetchone()
     cursor.close()
-    
-    if not user or user['is_blocked']:
-        return None
-    return user
+    return dict(user) if user else None
+
+def search_forum(conn, text: str, limit: int, offset: int) -> list:
+    """
+    Ранжированный поиск по видимым темам и сообщениям, сниппеты строятся только для страницы.
+    snippet - HTML: текст экранирован html_escape до ts_headline, разметка только <mark>
+    """
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        WITH q AS (
+            SELECT websearch_to_tsquery('russian', %s) AS query
+        ),
+        hits AS (
+            SELECT 'topic' AS kind, t.id AS topic_id, NULL::integer AS post_id,
+                   ts_rank_cd(t.search_vector, q.query) AS rank, t.updated_at AS created_at
+            FROM forum_topics t, q
+            WHERE t.is_hidden = FALSE AND t.search_vector @@ q.query
+            UNION ALL
+            SELECT 'post', p.topic_id, p.id,
+                   ts_rank_cd(p.search_vector, q.query), p.created_at
+            FROM forum_posts p
+            JOIN forum_topics t ON t.id = p.topic_id AND t.is_hidden = FALSE, q
+            WHERE p.is_hidden = FALSE AND p.search_vector @@ q.query
+        ),
+        page AS (
+            SELECT * FROM hits
+            ORDER BY rank DESC, created_at DESC, topic_id DESC, post_id DESC NULLS FIRST
+            LIMIT %s OFFSET %s
+        )
+        SELECT
+            page.kind, page.topic_id, page.post_id, page.rank, page.created_at,
+            t.title AS topic_title,
+            u.username AS author_username,
+            ts_headline(
+                'russian',
+                html_escape(CASE WHEN page.kind = 'topic' THEN concat_ws(' ', t.title, t.description) ELSE p.content END),
+                q.query,
+                'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2'
+            ) AS snippet
+        FROM page
+        CROSS JOIN q
+        JOIN forum_topics t ON t.id = page.topic_id
+        LEFT JOIN forum_posts p ON p.id = page.post_id
+        LEFT JOIN forum_users u ON u.id = COALESCE(p.author_id, t.author_id)
+        ORDER BY page.rank DESC, page.created_at DESC, page.topic_id DESC, page.post_id DESC NULLS FIRST
+    """, (text, limit, offset))
+    hits = cursor.fetchall()
+    cursor.close()
+    return hits
+
+def spam_stem(token: str) -> str:
+    """Основа слова: первые SPAM_STEM_LENGTH букв без хвостовых гласных, ь и й (займы/займ, врача/врач)"""
+    stem = token[:SPAM_STEM_LENGTH]
+    while len(stem) > SPAM_STEM_MIN_LENGTH and stem[-1] in SPAM_STEM_TRAILING:
+        stem = stem[:-1]
+    return stem
+
+def normalize_spam_term(term: str) -> str:
+    """Термин из forum_spam_terms к виду признаков текста; служебные __...__ не меняются"""
+    if term.startswith('__'):
+        return term
+    return ' '.join(spam_stem(token) for token in SPAM_TOKEN_RE.findall(term.lower()))
+
+def spam_features(text: str) -> set:
+    """Признаки текста: основы слов и пары соседних основ"""
+    stems = [spam_stem(token) for token in SPAM_TOKEN_RE.findall(text.lower())]
+    features = set(stems)
+    features.update(f'{a} {b}' for a, b in zip(stems, stems[1:]))
+    return features
+
+def load_spam_weights(conn) -> Dict[str, float]:
+    """Веса модели спама из forum_spam_terms (термины приводятся к основам, как слова текста) с кешем на SPAM_WEIGHTS_TTL_SECONDS"""
+    now = time.monotonic()
+    if spam_weights_state['weights'] is None or now - spam_weights_state['loaded_at'] >= SPAM_WEIGHTS_TTL_SECONDS:
+        cursor = conn.cursor()
+        cursor.execute("SELECT term, weight FROM forum_spam_terms ORDER BY term")
+        weights: Dict[str, float] = {}
+        for term, weight in cursor.fetchall():
+            weights.setdefault(normalize_spam_term(term), float(weight))
+        spam_weights_state['weights'] = weights
+        spam_weights_state['loaded_at'] = now
+        cursor.close()
+    return spam_weights_state['weights']
+
+def spam_score(text: str, weights: Dict[str, float]) -> float:
+    """Оценка 0..1: сигмоида суммы весов основ слов, пар основ и служебных признаков"""
+    lowered = text.lower()
+    total = weights.get('__bias__', 0.0)
+    total += sum(weights.get(feature, 0.0) for feature in spam_features(text))
+    total += weights.get('__link__', 0.0) * min(len(SPAM_LINK_RE.findall(lowered)), 3)
+    if SPAM_PHONE_RE.search(text):
+        total += weights.get('__phone__', 0.0)
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) >= 20 and sum(char.isupper() for char in letters) > len(letters) * 0.6:
+        total += weights.get('__caps__', 0.0)
+    if SPAM_REPEAT_RE.search(lowered):
+        total += weights.get('__repeat__', 0.0)
+    return 1.0 / (1.0 + math.exp(-max(min(total, 50.0), -50.0)))
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Управление темами форума
-    GET / - получить все темы
+    GET /?limit=N&cursor=C - страница тем (закреплённые первыми), next_cursor для следующей страницы
+    GET /?sort=hot&limit=N&cursor=C - страница "горячих" тем по предвычисленному hot_score
     GET /?id=X - получить конкретную тему
+    GET /?action=search&q=...&limit=N&offset=M - полнотекстовый поиск по темам и сообщениям (snippet - экранированный HTML с <mark>)
     POST / - создать новую тему (требуется авторизация)
     PUT / - обновить тему (автор или админ)
+    POST {action: "flush_views"} - принудительный сброс буфера просмотров экземпляра в БД (по таймеру)
     """
     method = event.get('httpMethod', 'GET')
     
@@ -56,19 +273,42 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             query_params = event.get('queryStringParameters') or {}
             topic_id = query_params.get('id')
             
+            if query_params.get('action') == 'search':
+                text = (query_params.get('q') or '').strip()
+                if len(text) < 2:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Запрос должен содержать минимум 2 символа'}),
+                        'isBase64Encoded': False
+                    }
+                
+                try:
+                    limit = max(1, min(int(query_params.get('limit', SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE))
+                    offset = max(0, min(int(query_params.get('offset', 0)), SEARCH_MAX_OFFSET))
+                except ValueError:
+                    limit, offset = SEARCH_PAGE_SIZE, 0
+                
+                hits = search_forum(conn, text, limit + 1, offset)
+                has_more = len(hits) > limit
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'results': hits[:limit],
+                        'next_offset': offset + limit if has_more else None
+                    }, default=str),
+                    'isBase64Encoded': False
+                }
+            
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             
             if topic_id:
-                cursor.execute("""
-                    UPDATE forum_topics SET views_count = views_count + 1 WHERE id = %s
-                """, (topic_id,))
-                conn.commit()
-                
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT 
-                        t.*,
-                        u.username as author_username,
-                        (SELECT COUNT(*) FROM forum_posts WHERE topic_id = t.id AND is_hidden = FALSE) as posts_count
+                        {TOPIC_SELECT_T},
+                        u.username as author_username
                     FROM forum_topics t
                     LEFT JOIN forum_users u ON t.author_id = u.id
                     WHERE t.id = %s AND t.is_hidden = FALSE
@@ -84,6 +324,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'isBase64Encoded': False
                     }
                 
+                # Чтение темы не пишет в БД: просмотр попадает в буфер, сброс - в конце вызова пачкой
+                topic['views_count'] = (topic['views_count'] or 0) + record_topic_view(topic['id'])
+                
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
@@ -91,28 +334,69 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             else:
-                cursor.execute("""
+                try:
+                    limit = max(1, min(int(query_params.get('limit', TOPICS_PAGE_SIZE)), TOPICS_MAX_PAGE_SIZE))
+                except ValueError:
+                    limit = TOPICS_PAGE_SIZE
+                
+                hot = query_params.get('sort') == 'hot'
+                after = None
+                if query_params.get('cursor'):
+                    after = decode_hot_cursor(query_params['cursor']) if hot else decode_topics_cursor(query_params['cursor'])
+                    if not after:
+                        cursor.close()
+                        return {
+                            'statusCode': 400,
+                            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                            'body': json.dumps({'error': 'Некорректный курсор'}),
+                            'isBase64Encoded': False
+                        }
+                
+                # Сортировка и условие совпадают с частичными индексами idx_forum_topics_front_page / idx_forum_topics_hot
+                if hot:
+                    keyset = 'AND (t.hot_score, t.id) < (%s, %s)'
+                    order = 't.hot_score DESC, t.id DESC'
+                else:
+                    keyset = 'AND (t.is_pinned, t.updated_at, t.id) < (%s, %s, %s)'
+                    order = 't.is_pinned DESC, t.updated_at DESC, t.id DESC'
+                cursor.execute(f"""
                     SELECT 
-                        t.*,
-                        u.username as author_username,
-                        (SELECT COUNT(*) FROM forum_posts WHERE topic_id = t.id AND is_hidden = FALSE) as posts_count,
-                        (SELECT MAX(created_at) FROM forum_posts WHERE topic_id = t.id) as last_post_at
+                        {TOPIC_SELECT_T},
+                        u.username as author_username
                     FROM forum_topics t
                     LEFT JOIN forum_users u ON t.author_id = u.id
                     WHERE t.is_hidden = FALSE
-                    ORDER BY t.is_pinned DESC, t.updated_at DESC
-                """)
+                    {keyset if after else ''}
+                    ORDER BY {order}
+                    LIMIT %s
+                """, (*(after or ()), limit + 1))
                 topics = cursor.fetchall()
                 cursor.close()
                 
+                next_cursor = None
+                if len(topics) > limit:
+                    topics = topics[:limit]
+                    next_cursor = encode_hot_cursor(topics[-1]) if hot else encode_topics_cursor(topics[-1])
+                
                 return {
                     'statusCode': 200,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'topics': topics}, default=str),
+                    'body': json.dumps({'topics': topics, 'next_cursor': next_cursor}, default=str),
                     'isBase64Encoded': False
                 }
         
         elif method == 'POST':
+            body = json.loads(event.get('body') or '{}')
+            
+            if body.get('action') == 'flush_views':
+                flushed = flush_topic_views(conn, force=True)
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'success': True, 'flushed_views': flushed}),
+                    'isBase64Encoded': False
+                }
+            
             headers = event.get('headers') or {}
             token = headers.get('x-user-token') or headers.get('X-User-Token')
             
@@ -133,7 +417,6 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
-            body = json.loads(event.get('body', '{}'))
             title = body.get('title', '').strip()
             description = body.get('description', '').strip()
             
@@ -145,12 +428,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     'isBase64Encoded': False
                 }
             
+            # Подозрительная тема сохраняется скрытой и ждёт решения модератора
+            score = spam_score(f'{title}\n{description}', load_spam_weights(conn))
+            hidden_reason = f'Автоматически скрыто: подозрение на спам ({score:.2f})' if score >= SPAM_HIDE_THRESHOLD else None
+            
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("""
-                INSERT INTO forum_topics (title, description, author_id, is_locked, is_pinned, is_hidden, views_count, created_at, updated_at)
-                VALUES (%s, %s, %s, FALSE, FALSE, FALSE, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                RETURNING *
-            """, (title, description, user['id']))
+            cursor.execute(f"""
+                INSERT INTO forum_topics (title, description, author_id, is_locked, is_pinned, is_hidden, hidden_reason, views_count, created_at, updated_at)
+                VALUES (%s, %s, %s, FALSE, FALSE, %s, %s, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                RETURNING {TOPIC_SELECT}
+            """, (title, description, user['id'], hidden_reason is not None, hidden_reason))
             topic = cursor.fetchone()
             conn.commit()
             cursor.close()
@@ -158,7 +445,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 201,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True, 'topic': topic}, default=str),
+                'body': json.dumps({'success': True, 'topic': topic, 'pending_moderation': hidden_reason is not None}, default=str),
                 'isBase64Encoded': False
             }
         
@@ -195,7 +482,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 }
             
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT * FROM forum_topics WHERE id = %s", (topic_id,))
+            cursor.execute(f"SELECT {TOPIC_SELECT} FROM forum_topics WHERE id = %s", (topic_id,))
             topic = cursor.fetchone()
             
             if not topic:
@@ -219,12 +506,18 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             title = body.get('title', topic['title'])
             description = body.get('description', topic['description'])
             
-            cursor.execute("""
+            # Правка проверяется так же, как новая тема; чистая правка скрытое модератором не открывает
+            score = spam_score(f'{title}\n{description}', load_spam_weights(conn))
+            hidden_reason = f'Автоматически скрыто: подозрение на спам ({score:.2f})' if score >= SPAM_HIDE_THRESHOLD else None
+            
+            cursor.execute(f"""
                 UPDATE forum_topics 
-                SET title = %s, description = %s, updated_at = CURRENT_TIMESTAMP
+                SET title = %s, description = %s, updated_at = CURRENT_TIMESTAMP,
+                    is_hidden = is_hidden OR %s,
+                    hidden_reason = COALESCE(%s, hidden_reason)
                 WHERE id = %s
-                RETURNING *
-            """, (title, description, topic_id))
+                RETURNING {TOPIC_SELECT}
+            """, (title, description, hidden_reason is not None, hidden_reason, topic_id))
             updated_topic = cursor.fetchone()
             conn.commit()
             cursor.close()
@@ -232,7 +525,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'success': True, 'topic': updated_topic}, default=str),
+                'body': json.dumps({'success': True, 'topic': updated_topic, 'pending_moderation': hidden_reason is not None}, default=str),
                 'isBase64Encoded': False
             }
         
@@ -251,4 +544,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'isBase64Encoded': False
         }
     finally:
+        # Незафиксированное ответом не должно попасть в БД вместе со сбросом просмотров
+        try:
+            conn.rollback()
+            flush_topic_views(conn)
+        except psycopg2.Error as e:
+            print(f"[VIEWS] flush failed: {e}")
         conn.close()
\ No newline at end of file
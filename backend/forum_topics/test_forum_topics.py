@@ -0,0 +1,103 @@
+import importlib.util
+import json
+import os
+import time
+import unittest
+
+import psycopg2
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), 'index.py')
+spec = importlib.util.spec_from_file_location('forum_topics_index', INDEX_PATH)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+handler = index.handler
+pending_views = index.pending_views
+pending_views_state = index.pending_views_state
+record_topic_view = index.record_topic_view
+search_forum = index.search_forum
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL не задан')
+class SearchSnippetTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg2.connect(TEST_DATABASE_URL)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT INTO forum_topics (title, description) VALUES (%s, %s) RETURNING id",
+            ('Запись к кардиологу', 'Тема для проверки поиска')
+        )
+        self.topic_id = cursor.fetchone()[0]
+        cursor.execute(
+            "INSERT INTO forum_posts (topic_id, content) VALUES (%s, %s)",
+            (self.topic_id, '<script>alert("кардиолог")</script> Кардиолог принимает по вторникам & четвергам')
+        )
+        cursor.close()
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.rollback()
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM forum_posts WHERE topic_id = %s", (self.topic_id,))
+        cursor.execute("DELETE FROM forum_topics WHERE id = %s", (self.topic_id,))
+        cursor.close()
+        self.conn.commit()
+        self.conn.close()
+
+    def test_snippet_escapes_user_html(self):
+        hits = search_forum(self.conn, 'кардиолог', 20, 0)
+        post_hits = [hit for hit in hits if hit['post_id']]
+        self.assertEqual(len(post_hits), 1)
+        snippet = post_hits[0]['snippet']
+        self.assertNotIn('<script>', snippet)
+        self.assertIn('&lt;/script&gt;', snippet)
+        self.assertIn('&amp;', snippet)
+        self.assertIn('<mark>', snippet)
+        self.assertEqual(snippet.replace('<mark>', '').replace('</mark>', '').count('<'), 0)
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL не задан')
+class TopicViewsFlushTest(unittest.TestCase):
+    def setUp(self):
+        os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+        pending_views.clear()
+        self.conn = psycopg2.connect(TEST_DATABASE_URL)
+        self.conn.autocommit = True
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO forum_topics (title, description) VALUES ('Просмотры', '') RETURNING id")
+        self.topic_id = cursor.fetchone()[0]
+        cursor.close()
+
+    def tearDown(self):
+        pending_views.clear()
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM forum_topics WHERE id = %s", (self.topic_id,))
+        cursor.close()
+        self.conn.close()
+
+    def stored_views(self) -> int:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT views_count FROM forum_topics WHERE id = %s", (self.topic_id,))
+        views = cursor.fetchone()[0]
+        cursor.close()
+        return views
+
+    def test_flush_views_action_saves_buffer(self):
+        record_topic_view(self.topic_id)
+        record_topic_view(self.topic_id)
+        response = handler({'httpMethod': 'POST', 'body': json.dumps({'action': 'flush_views'})}, None)
+        self.assertEqual(json.loads(response['body'])['flushed_views'], 2)
+        self.assertEqual(self.stored_views(), 2)
+        self.assertEqual(pending_views, {})
+
+    def test_due_buffer_is_flushed_at_end_of_any_invocation(self):
+        record_topic_view(self.topic_id)
+        pending_views_state['flushed_at'] = time.monotonic() - index.VIEWS_FLUSH_INTERVAL_SECONDS
+        response = handler({'httpMethod': 'GET', 'queryStringParameters': {'action': 'search', 'q': 'x'}}, None)
+        self.assertEqual(response['statusCode'], 400)
+        self.assertEqual(self.stored_views(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,269 @@
+import base64
+import gzip
+import io
 import json
 import os
+import select
+import time
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
+BATCH_UPDATE_MAX_ITEMS = 500
+DAY_SHEET_DEFAULT_LIMIT = 200
+DAY_SHEET_MAX_LIMIT = 500
+# Архив забирает записи старше months >= 1 месяца, так что более ранние даты могут быть уже в appointments_archive
+DAY_SHEET_HOT_DAYS = 28
+PATIENT_LOOKUP_MAX_LIMIT = 200
+EXPORT_FETCH_SIZE = 2000
+EXPORT_MAX_DAYS = 93
+EXPORT_MAX_ROWS = 50000
+EXPORT_ORDER_KEY = '(a.appointment_date, a.doctor_id, a.appointment_time, a.id)'
+EXPORT_QUERY = """
+    SELECT a.id, a.appointment_date, a.appointment_time, a.doctor_id, d.full_name AS doctor_name, d.clinic,
+           a.patient_name, a.patient_phone, a.patient_snils, a.status, a.description, a.created_at, a.completed_at,
+           a.is_archived
+    FROM appointments_all a
+    JOIN doctors d ON d.id = a.doctor_id
+    WHERE a.appointment_date >= %(start_date)s AND a.appointment_date <= %(end_date)s {conditions}
+    ORDER BY a.appointment_date, a.doctor_id, a.appointment_time, a.id
+"""
+ARCHIVE_DEFAULT_MONTHS = 12
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVE_MAX_BATCHES = 20
+CHANGES_RETENTION_DAYS = 7
+CHANGES_MAX_LIMIT = 500
+CHANGES_MAX_WAIT_SECONDS = 25
+CHANGES_RECHECK_SECONDS = 1
+
+def parse_changes_cursor(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Курсор ленты "XACT_ID:SEQ"; пустой или 0 - подписка с текущего момента (None)"""
+    if not value or value == '0':
+        return None
+    xact_id, seq = value.split(':')
+    return int(xact_id), int(seq)
+
+def changes_watermark(conn) -> int:
+    """Граница фиксации: все транзакции с xact_id ниже неё уже завершены, их строки ленты окончательны"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+    watermark = int(cursor.fetchone()[0])
+    cursor.close()
+    return watermark
+
+def fetch_appointment_changes(conn, after: Tuple[int, int], filters: Dict[str, Any], limit: int) -> Tuple[list, Tuple[int, int]]:
+    """
+    Изменения записей после курсора (xact_id, seq) с учётом фильтров врача, даты и поликлиники.
+    Отдаются только строки ниже границы фиксации, поэтому транзакция, зафиксированная позже соседней,
+    не оказывается за курсором. Возвращает изменения и следующий курсор.
+    """
+    watermark = changes_watermark(conn)
+    conditions = ['(c.xact_id, c.seq) > (%s::text::xid8, %s)', 'c.xact_id < %s::text::xid8']
+    params = [after[0], after[1], watermark]
+    if filters.get('doctor_id'):
+        conditions.append('c.doctor_id = %s')
+        params.append(filters['doctor_id'])
+    if filters.get('date'):
+        conditions.append('c.appointment_date = %s')
+        params.append(filters['date'])
+    if filters.get('clinic_id'):
+        conditions.append('c.doctor_id IN (SELECT id FROM doctors WHERE clinic_id = %s)')
+        params.append(filters['clinic_id'])
+    params.append(limit)
+    
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(
+        f"""SELECT c.seq, c.xact_id::text AS xact_id, c.operation, c.appointment_id, c.doctor_id, c.appointment_date,
+                   c.changed_at, a.appointment_date AS current_appointment_date, a.appointment_time, a.status,
+                   a.patient_name, a.patient_phone, a.description
+            FROM appointment_changes c
+            LEFT JOIN appointments_v2 a ON a.id = c.appointment_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY c.xact_id, c.seq
+            LIMIT %s""",
+        params
+    )
+    changes = cursor.fetchall()
+    cursor.close()
+    
+    # Неполная страница: всё ниже границы просмотрено, курсор можно поднять до неё
+    if len(changes) == limit:
+        next_cursor = (int(changes[-1]['xact_id']), changes[-1]['seq'])
+    else:
+        next_cursor = max(after, (watermark, 0))
+    return changes, next_cursor
+
+def archive_appointments_batch(conn, months: int, batch_size: int) -> int:
+    """
+    Перенос одной пачки записей старше months месяцев в appointments_archive в отдельной транзакции.
+    app.archiving отключает триггеры сводок и ленты изменений для этого переноса.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SET LOCAL app.archiving = 'on'")
+    cursor.execute(
+        """WITH moved AS (
+               DELETE FROM appointments_v2
+               WHERE id IN (
+                   SELECT id FROM appointments_v2
+                   WHERE appointment_date < CURRENT_DATE - make_interval(months => %s)
+                   ORDER BY appointment_date
+                   LIMIT %s
+               )
+               RETURNING *
+           )
+           INSERT INTO appointments_archive SELECT * FROM moved""",
+        (months, batch_size)
+    )
+    moved_count = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    return moved_count
+
+def verify_admin_token(token: str, conn) -> bool:
+    """Проверка токена администратора через БД"""
+    if not token:
+        return False
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT id FROM t_p30358746_hospital_website_red.admins WHERE password_hash = %s AND is_active = true",
+            (token,)
+        )
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+def parse_export_cursor(value: str) -> tuple:
+    """Курсор выгрузки "YYYY-MM-DD,doctor_id,HH:MM:SS,id" -> ключ первой строки порции"""
+    cursor_date, cursor_doctor, cursor_time, cursor_id = value.split(',')
+    return (datetime.strptime(cursor_date, '%Y-%m-%d').date(), int(cursor_doctor),
+            datetime.strptime(cursor_time, '%H:%M:%S').time(), int(cursor_id))
+
+def format_export_cursor(key: tuple) -> str:
+    return f"{key[0]:%Y-%m-%d},{key[1]},{key[2]:%H:%M:%S},{key[3]}"
+
+def export_next_key(conn, start_date: str, end_date: str, from_key: Optional[tuple]) -> Optional[tuple]:
+    """Ключ первой строки после EXPORT_MAX_ROWS строк порции; None, если остаток помещается целиком"""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""SELECT a.appointment_date, a.doctor_id, a.appointment_time, a.id
+            FROM appointments_all a
+            WHERE a.appointment_date >= %(start_date)s AND a.appointment_date <= %(end_date)s
+              {f'AND {EXPORT_ORDER_KEY} >= %(from_key)s' if from_key else ''}
+            ORDER BY a.appointment_date, a.doctor_id, a.appointment_time, a.id
+            OFFSET %(max_rows)s
+            LIMIT 1""",
+        {'start_date': start_date, 'end_date': end_date, 'from_key': from_key, 'max_rows': EXPORT_MAX_ROWS}
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return tuple(row) if row else None
+
+def write_appointments_export(conn, out, export_format: str, start_date: str, end_date: str,
+                              from_key: Optional[tuple], to_key: Optional[tuple]) -> None:
+    """
+    Построчная выгрузка порции записей [from_key, to_key) в файловый объект out без накопления строк в памяти:
+    CSV через COPY ... TO STDOUT, NDJSON через серверный именованный курсор
+    """
+    conditions = ''
+    if from_key:
+        conditions += f' AND {EXPORT_ORDER_KEY} >= %(from_key)s'
+    if to_key:
+        conditions += f' AND {EXPORT_ORDER_KEY} < %(to_key)s'
+    query = EXPORT_QUERY.format(conditions=conditions)
+    params = {'start_date': start_date, 'end_date': end_date, 'from_key': from_key, 'to_key': to_key}
+    
+    if export_format == 'csv':
+        cursor = conn.cursor()
+        query = cursor.mogrify(query, params).decode('utf-8')
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER, ENCODING 'UTF8')", out)
+        cursor.close()
+        return
+    
+    cursor = conn.cursor(name='appointments_export', cursor_factory=RealDictCursor)
+    cursor.itersize = EXPORT_FETCH_SIZE
+    cursor.execute(query, params)
+    for row in cursor:
+        out.write((json.dumps(row, default=str, ensure_ascii=False) + '\n').encode('utf-8'))
+    cursor.close()
+
+def normalize_phone(phone: str) -> str:
+    """Телефон только цифрами, 8XXXXXXXXXX приводится к 7XXXXXXXXXX (как patient_phone_digits в БД)"""
+    digits = ''.join(filter(str.isdigit, phone or ''))
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    return digits
+
+def normalize_snils(snils: str) -> str:
+    """СНИЛС только цифрами (как patient_snils_digits в БД)"""
+    return ''.join(filter(str.isdigit, snils or ''))
+
+def group_day_sheet(rows) -> list:
+    """Группировка строк листа записей по врачам с сохранением порядка"""
+    doctors = []
+    for row in rows:
+        if not doctors or doctors[-1]['doctor_id'] != row['doctor_id']:
+            doctors.append({
+                'doctor_id': row['doctor_id'],
+                'full_name': row['doctor_name'],
+                'specialization': row['specialization'],
+                'office_number': row['office_number'],
+                'appointments': []
+            })
+        doctors[-1]['appointments'].append({
+            'id': row['id'],
+            'time': row['appointment_time'].strftime('%H:%M'),
+            'status': row['status'],
+            'patient_name': row['patient_name'],
+            'patient_phone': row['patient_phone'],
+            'snils': row['patient_snils'],
+            'description': row['description']
+        })
+    return doctors
+
+def change_matches_filters(payload: Dict[str, Any], filters: Dict[str, Any], clinic_doctor_ids: Optional[set]) -> bool:
+    """Проверка NOTIFY appointment_changes по фильтрам подписчика без обращения к БД"""
+    if filters.get('doctor_id') and str(payload.get('doctor_id')) != str(filters['doctor_id']):
+        return False
+    if filters.get('date') and str(payload.get('date')) != str(filters['date']):
+        return False
+    if clinic_doctor_ids is not None and payload.get('doctor_id') not in clinic_doctor_ids:
+        return False
+    return True
+
+def wait_for_matching_change(conn, filters: Dict[str, Any], clinic_doctor_ids: Optional[set], timeout: float) -> bool:
+    """Ожидание NOTIFY appointment_changes, подходящего под фильтры; чужие изменения в БД не ходят"""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if select.select([conn], [], [], remaining) == ([], [], []):
+            return False
+        conn.poll()
+        matched = False
+        while conn.notifies:
+            notify = conn.notifies.pop(0)
+            try:
+                matched = matched or change_matches_filters(json.loads(notify.payload), filters, clinic_doctor_ids)
+            except ValueError:
+                matched = True
+        if matched:
+            return True
+
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     API для управления записями на приём к врачам
+    GET ?action=patient_lookup&phone=...|snils=...[&limit=N] - история записей пациента по всем врачам
+    GET ?action=export&start_date=...&end_date=...[&format=csv|ndjson&gzip=1&cursor=...] - выгрузка записей (X-Admin-Token),
+        не больше EXPORT_MAX_DAYS дней и EXPORT_MAX_ROWS строк за ответ, продолжение по X-Next-Cursor
+    GET ?action=changes&since=CURSOR[&doctor_id=X&date=...&clinic_id=Y&wait=25] - long-poll ленты изменений записей
+    GET ?action=day_sheet&date=YYYY-MM-DD&clinic_id=X[&doctor_id=Y&status=a,b&limit=N&cursor=C] - записи на день по врачам
+    POST {action: "archive", months, batch_size, max_batches} - перенос старых записей в архив (X-Admin-Token, по расписанию)
+    PUT {action: "update_patient_info", id, patient_name, patient_phone, snils, oms, description} - данные пациента
+    PUT {action: "batch_update_patient_info", items: [{id, patient_name, ...}]} - пакетное обновление одним запросом
     """
     method = event.get('httpMethod', 'GET')
     
@@ -17,7 +273,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
@@ -28,11 +284,427 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     conn = psycopg2.connect(database_url)
     
     try:
-        if method == 'PUT':
+        if method == 'GET':
+            query_params = event.get('queryStringParameters') or {}
+            action = query_params.get('action')
+            
+            if action == 'changes':
+                filters = {
+                    'doctor_id': query_params.get('doctor_id'),
+                    'date': query_params.get('date'),
+                    'clinic_id': query_params.get('clinic_id')
+                }
+                try:
+                    after = parse_changes_cursor(query_params.get('since'))
+                    limit = max(1, min(int(query_params.get('limit', CHANGES_MAX_LIMIT)), CHANGES_MAX_LIMIT))
+                    wait = max(0, min(int(query_params.get('wait', CHANGES_MAX_WAIT_SECONDS)), CHANGES_MAX_WAIT_SECONDS))
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'since must be a cursor from a previous response, limit and wait integers'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if after is None:
+                    # Первый запрос: курсор от текущей границы фиксации, дальше обычный long-poll;
+                    # данные на момент подписки клиент берёт из day_sheet
+                    after = (changes_watermark(conn), 0)
+                
+                changes, next_cursor = fetch_appointment_changes(conn, after, filters, limit)
+                
+                if not changes and wait:
+                    clinic_doctor_ids = None
+                    if filters.get('clinic_id'):
+                        cursor = conn.cursor()
+                        cursor.execute("SELECT id FROM doctors WHERE clinic_id = %s", (filters['clinic_id'],))
+                        clinic_doctor_ids = {row[0] for row in cursor.fetchall()}
+                        cursor.close()
+                    
+                    # LISTEN до повторной проверки, чтобы не потерять уведомление между SELECT и ожиданием
+                    conn.rollback()
+                    conn.autocommit = True
+                    cursor = conn.cursor()
+                    cursor.execute("LISTEN appointment_changes")
+                    cursor.close()
+                    
+                    changes, next_cursor = fetch_appointment_changes(conn, after, filters, limit)
+                    deadline = time.monotonic() + wait
+                    # Подходящее изменение может ждать более старую незавершённую транзакцию, её NOTIFY под фильтр
+                    # не попадает: пока такое изменение задержано, лента перечитывается раз в CHANGES_RECHECK_SECONDS
+                    held = False
+                    while not changes:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        matched = wait_for_matching_change(
+                            conn, filters, clinic_doctor_ids, min(remaining, CHANGES_RECHECK_SECONDS) if held else remaining
+                        )
+                        if not matched and not held:
+                            break
+                        changes, next_cursor = fetch_appointment_changes(conn, after, filters, limit)
+                        held = held or matched
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'changes': changes,
+                        'cursor': f'{next_cursor[0]}:{next_cursor[1]}'
+                    }, default=str),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'export':
+                headers = event.get('headers') or {}
+                admin_token = headers.get('X-Admin-Token') or headers.get('x-admin-token')
+                if not verify_admin_token(admin_token, conn):
+                    return {
+                        'statusCode': 401,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Unauthorized'}),
+                        'isBase64Encoded': False
+                    }
+                
+                start_date = query_params.get('start_date')
+                end_date = query_params.get('end_date')
+                export_format = query_params.get('format', 'csv')
+                use_gzip = query_params.get('gzip', '1') not in ('0', 'false')
+                
+                try:
+                    export_days = (datetime.strptime(end_date or '', '%Y-%m-%d') - datetime.strptime(start_date or '', '%Y-%m-%d')).days + 1
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'start_date and end_date required (YYYY-MM-DD)'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if export_days < 1 or export_days > EXPORT_MAX_DAYS:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Export range must be 1..{EXPORT_MAX_DAYS} days'}),
+                        'isBase64Encoded': False
+                    }
+                
+                try:
+                    from_key = parse_export_cursor(query_params['cursor']) if query_params.get('cursor') else None
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Invalid cursor'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if export_format not in ('csv', 'ndjson'):
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'format must be csv or ndjson'}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Ответ ограничен EXPORT_MAX_ROWS строками; продолжение запрашивается с курсором из X-Next-Cursor
+                to_key = export_next_key(conn, start_date, end_date, from_key)
+                
+                # Строки пишутся сразу в gzip-поток, в памяти держится только сжатый результат
+                buffer = io.BytesIO()
+                if use_gzip:
+                    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) as out:
+                        write_appointments_export(conn, out, export_format, start_date, end_date, from_key, to_key)
+                else:
+                    write_appointments_export(conn, buffer, export_format, start_date, end_date, from_key, to_key)
+                conn.rollback()
+                
+                response_headers = {
+                    'Content-Type': 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson; charset=utf-8',
+                    'Content-Disposition': f'attachment; filename="appointments_{start_date}_{end_date}.{export_format}"',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Expose-Headers': 'X-Next-Cursor'
+                }
+                if to_key:
+                    response_headers['X-Next-Cursor'] = format_export_cursor(to_key)
+                if use_gzip:
+                    response_headers['Content-Encoding'] = 'gzip'
+                
+                return {
+                    'statusCode': 200,
+                    'headers': response_headers,
+                    'body': base64.b64encode(buffer.getvalue()).decode('ascii'),
+                    'isBase64Encoded': True
+                }
+            
+            if action == 'patient_lookup':
+                phone = normalize_phone(query_params.get('phone'))
+                snils = normalize_snils(query_params.get('snils'))
+                
+                if len(phone) < 10 and len(snils) != 11:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Valid phone (10+ digits) or snils (11 digits) required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                try:
+                    limit = max(1, min(int(query_params.get('limit', 50)), PATIENT_LOOKUP_MAX_LIMIT))
+                except ValueError:
+                    limit = 50
+                
+                # Поиск по равенству на нормализованных колонках использует индексы *_digits горячей и архивной таблиц
+                if len(snils) == 11:
+                    condition, value = 'a.patient_snils_digits = %s', snils
+                else:
+                    condition, value = 'a.patient_phone_digits = %s', phone
+                
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(
+                    f"""SELECT a.id, a.doctor_id, d.full_name AS doctor_name, d.specialization,
+                               a.appointment_date, a.appointment_time, a.status, a.patient_name, a.patient_phone,
+                               a.patient_snils, a.description, a.completed_at, a.is_archived
+                        FROM appointments_all a
+                        JOIN doctors d ON d.id = a.doctor_id
+                        WHERE {condition}
+                        ORDER BY a.appointment_date DESC, a.appointment_time DESC
+                        LIMIT %s""",
+                    (value, limit)
+                )
+                appointments = cursor.fetchall()
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'appointments': appointments}, default=str),
+                    'isBase64Encoded': False
+                }
+            
+            if action == 'day_sheet':
+                appointment_date = query_params.get('date')
+                clinic_id = query_params.get('clinic_id')
+                doctor_id = query_params.get('doctor_id')
+                statuses = [status for status in (query_params.get('status') or '').split(',') if status]
+                page_cursor = query_params.get('cursor')
+                
+                if not appointment_date or not (clinic_id or doctor_id):
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'date and clinic_id or doctor_id required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                try:
+                    sheet_date = datetime.strptime(appointment_date, '%Y-%m-%d').date()
+                    limit = max(1, min(int(query_params.get('limit', DAY_SHEET_DEFAULT_LIMIT)), DAY_SHEET_MAX_LIMIT))
+                    after = None
+                    if page_cursor:
+                        cursor_doctor, cursor_time = page_cursor.split(',', 1)
+                        after = (int(cursor_doctor), datetime.strptime(cursor_time, '%H:%M:%S').time())
+                except ValueError:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Invalid date, limit or cursor'}),
+                        'isBase64Encoded': False
+                    }
+                
+                conditions = ['a.appointment_date = %s']
+                params = [appointment_date]
+                if clinic_id:
+                    conditions.append('d.clinic_id = %s')
+                    params.append(clinic_id)
+                if doctor_id:
+                    conditions.append('a.doctor_id = %s')
+                    params.append(doctor_id)
+                if statuses:
+                    conditions.append('a.status = ANY(%s)')
+                    params.append(statuses)
+                if after:
+                    conditions.append('(a.doctor_id, a.appointment_time) > (%s, %s)')
+                    params.extend(after)
+                params.append(limit + 1)
+                
+                # Порядок совпадает с idx_appointments_v2_day_sheet, поэтому страница читается одним проходом по индексу;
+                # старые даты идут через appointments_all (архив создан LIKE appointments_v2 INCLUDING INDEXES)
+                source = 'appointments_all' if sheet_date < datetime.now().date() - timedelta(days=DAY_SHEET_HOT_DAYS) else 'appointments_v2'
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(
+                    f"""SELECT a.id, a.doctor_id, a.appointment_time, a.status, a.patient_name, a.patient_phone,
+                               a.patient_snils, a.description,
+                               d.full_name AS doctor_name, d.specialization, d.office_number
+                        FROM {source} a
+                        JOIN doctors d ON d.id = a.doctor_id
+                        WHERE {' AND '.join(conditions)}
+                        ORDER BY a.doctor_id, a.appointment_time
+                        LIMIT %s""",
+                    params
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+                
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    last = rows[-1]
+                    next_cursor = f"{last['doctor_id']},{last['appointment_time'].strftime('%H:%M:%S')}"
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'date': appointment_date,
+                        'clinic_id': clinic_id,
+                        'doctors': group_day_sheet(rows),
+                        'next_cursor': next_cursor
+                    }, default=str),
+                    'isBase64Encoded': False
+                }
+        
+        elif method == 'POST':
+            body = json.loads(event.get('body', '{}'))
+            action = body.get('action')
+            
+            if action == 'archive':
+                headers = event.get('headers') or {}
+                admin_token = headers.get('X-Admin-Token') or headers.get('x-admin-token')
+                if not verify_admin_token(admin_token, conn):
+                    return {
+                        'statusCode': 401,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Unauthorized'}),
+                        'isBase64Encoded': False
+                    }
+                
+                try:
+                    months = max(1, int(body.get('months', ARCHIVE_DEFAULT_MONTHS)))
+                    batch_size = max(1, min(int(body.get('batch_size', ARCHIVE_BATCH_SIZE)), ARCHIVE_BATCH_SIZE))
+                    max_batches = max(1, min(int(body.get('max_batches', ARCHIVE_MAX_BATCHES)), ARCHIVE_MAX_BATCHES))
+                except (TypeError, ValueError):
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'months, batch_size and max_batches must be integers'}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Каждая пачка коммитится отдельно: прерванный запуск продолжится со следующего вызова
+                archived_count = 0
+                has_more = False
+                for _ in range(max_batches):
+                    moved_count = archive_appointments_batch(conn, months, batch_size)
+                    archived_count += moved_count
+                    has_more = moved_count == batch_size
+                    if not has_more:
+                        break
+                
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM appointment_changes WHERE changed_at < CURRENT_TIMESTAMP - make_interval(days => %s)",
+                    (CHANGES_RETENTION_DAYS,)
+                )
+                pruned_changes = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'success': True,
+                        'archived_count': archived_count,
+                        'has_more': has_more,
+                        'pruned_changes': pruned_changes
+                    }),
+                    'isBase64Encoded': False
+                }
+        
+        elif method == 'PUT':
             body = json.loads(event.get('body', '{}'))
             action = body.get('action')
             appointment_id = body.get('id')
             
+            if action == 'batch_update_patient_info':
+                items = body.get('items')
+                
+                if not isinstance(items, list) or not items:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'items array required'}),
+                        'isBase64Encoded': False
+                    }
+                
+                if len(items) > BATCH_UPDATE_MAX_ITEMS:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': f'Too many items, maximum is {BATCH_UPDATE_MAX_ITEMS}'}),
+                        'isBase64Encoded': False
+                    }
+                
+                values = []
+                errors = []
+                seen_ids = set()
+                for index, item in enumerate(items):
+                    item = item if isinstance(item, dict) else {}
+                    try:
+                        item_id = int(item.get('id'))
+                    except (TypeError, ValueError):
+                        errors.append({'index': index, 'error': 'Appointment ID required'})
+                        continue
+                    if item_id in seen_ids:
+                        errors.append({'index': index, 'id': item_id, 'error': 'Duplicate appointment ID'})
+                        continue
+                    if not item.get('patient_name') or not item.get('patient_phone'):
+                        errors.append({'index': index, 'id': item_id, 'error': 'Name and phone required'})
+                        continue
+                    seen_ids.add(item_id)
+                    values.append((item_id, item['patient_name'], item['patient_phone'], item.get('snils'),
+                                   item.get('oms'), item.get('description')))
+                
+                if errors:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Invalid items', 'errors': errors}),
+                        'isBase64Encoded': False
+                    }
+                
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                appointments = execute_values(
+                    cursor,
+                    """UPDATE appointments_v2 AS a
+                       SET patient_name = v.patient_name, patient_phone = v.patient_phone, patient_snils = v.snils,
+                           patient_oms = v.oms, description = v.description
+                       FROM (VALUES %s) AS v(id, patient_name, patient_phone, snils, oms, description)
+                       WHERE a.id = v.id
+                       RETURNING a.*""",
+                    values,
+                    template='(%s::integer, %s, %s, %s, %s, %s)',
+                    page_size=len(values),
+                    fetch=True
+                )
+                conn.commit()
+                cursor.close()
+                
+                updated_ids = {appointment['id'] for appointment in appointments}
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'success': True,
+                        'updated_count': len(appointments),
+                        'appointments': [dict(appointment) for appointment in appointments],
+                        'missing_ids': [item[0] for item in values if item[0] not in updated_ids]
+                    }, default=str),
+                    'isBase64Encoded': False
+                }
+            
             if not appointment_id:
                 return {
                     'statusCode': 400,
@@ -0,0 +1,79 @@
+import importlib.util
+import os
+import unittest
+
+import psycopg2
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), 'index.py')
+spec = importlib.util.spec_from_file_location('pp_appointments_index', INDEX_PATH)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+changes_watermark = index.changes_watermark
+fetch_appointment_changes = index.fetch_appointment_changes
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+TEST_DOCTOR_ID = 999999
+
+
+def insert_change(conn, appointment_id: int) -> None:
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO appointment_changes (appointment_id, doctor_id, appointment_date, operation) "
+        "VALUES (%s, %s, CURRENT_DATE, 'UPDATE')",
+        (appointment_id, TEST_DOCTOR_ID)
+    )
+    cursor.close()
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL не задан')
+class ChangesFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.poller = psycopg2.connect(TEST_DATABASE_URL)
+        self.poller.autocommit = True
+        self.first = psycopg2.connect(TEST_DATABASE_URL)
+        self.second = psycopg2.connect(TEST_DATABASE_URL)
+
+    def tearDown(self):
+        for conn in (self.first, self.second):
+            conn.rollback()
+            conn.close()
+        cursor = self.poller.cursor()
+        cursor.execute("DELETE FROM appointment_changes WHERE doctor_id = %s", (TEST_DOCTOR_ID,))
+        cursor.close()
+        self.poller.close()
+
+    def test_out_of_order_commit_is_not_skipped(self):
+        filters = {'doctor_id': TEST_DOCTOR_ID}
+        after = (changes_watermark(self.poller), 0)
+
+        insert_change(self.first, 1)
+        insert_change(self.second, 2)
+        self.second.commit()
+
+        # Вторая транзакция зафиксирована раньше первой: её строка ждёт, курсор не обгоняет первую
+        changes, after = fetch_appointment_changes(self.poller, after, filters, 100)
+        self.assertEqual(changes, [])
+
+        self.first.commit()
+        changes, after = fetch_appointment_changes(self.poller, after, filters, 100)
+        self.assertEqual([change['appointment_id'] for change in changes], [1, 2])
+
+        changes, _ = fetch_appointment_changes(self.poller, after, filters, 100)
+        self.assertEqual(changes, [])
+
+    def test_page_limit_resumes_without_gaps(self):
+        filters = {'doctor_id': TEST_DOCTOR_ID}
+        after = (changes_watermark(self.poller), 0)
+        for appointment_id in (1, 2, 3):
+            insert_change(self.first, appointment_id)
+            self.first.commit()
+
+        seen = []
+        for _ in range(3):
+            changes, after = fetch_appointment_changes(self.poller, after, filters, 2)
+            seen.extend(change['appointment_id'] for change in changes)
+        self.assertEqual(seen, [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,25 @@ import os
 import psycopg2
 from datetime import datetime
 
+def resolve_clinic(cur, clinic_id=None, clinic_name=None):
+    '''Возвращает (id, название) поликлиники из справочника по id или названию, None если такой нет; новые поликлиники не создаются'''
+    if clinic_id:
+        cur.execute('SELECT id, name FROM clinics WHERE id = %s', (clinic_id,))
+    elif clinic_name:
+        cur.execute('SELECT id, name FROM clinics WHERE name = %s', (clinic_name,))
+    else:
+        return None
+    return cur.fetchone()
+
 def handler(event: dict, context) -> dict:
-    '''API для управления регистраторами и журналом их действий'''
+    '''
+    API для управления регистраторами и журналом их действий
+    GET ?action=list[&clinic_id=X] - список регистраторов (фильтр по поликлинике)
+    GET ?action=logs - журнал действий
+    POST {action: "create", clinic_id | clinic, ...} - создать регистратора
+    PUT / - обновить регистратора
+    DELETE / - удалить регистратора
+    '''
     
     method = event.get('httpMethod', 'GET')
     
@@ -28,11 +45,17 @@ def handler(event: dict, context) -> dict:
             action = event.get('queryStringParameters', {}).get('action', 'list')
             
             if action == 'list':
-                cur.execute('''
-                    SELECT id, full_name, phone, login, clinic, is_blocked, created_at
-                    FROM registrars
-                    ORDER BY created_at DESC
-                ''')
+                clinic_id = event.get('queryStringParameters', {}).get('clinic_id')
+                
+                query = '''
+                    SELECT r.id, r.full_name, r.phone, r.login, COALESCE(c.name, r.clinic), r.is_blocked, r.created_at, r.clinic_id
+                    FROM registrars r
+                    LEFT JOIN clinics c ON c.id = r.clinic_id
+                '''
+                if clinic_id:
+                    cur.execute(query + ' WHERE r.clinic_id = %s ORDER BY r.created_at DESC', (clinic_id,))
+                else:
+                    cur.execute(query + ' ORDER BY r.created_at DESC')
                 registrars = []
                 for row in cur.fetchall():
                     registrars.append({
@@ -41,6 +64,7 @@ def handler(event: dict, context) -> dict:
                         'phone': row[2],
                         'login': row[3],
                         'clinic': row[4],
+                        'clinic_id': row[7],
                         'is_blocked': row[5],
                         'created_at': row[6].isoformat() if row[6] else None
                     })
@@ -100,16 +124,25 @@ def handler(event: dict, context) -> dict:
             action = data.get('action', 'create')
             
             if action == 'create':
+                clinic = resolve_clinic(cur, data.get('clinic_id'), data.get('clinic'))
+                if not clinic:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'success': False, 'error': 'Clinic not found: clinic_id of an existing clinic is required'})
+                    }
+                
                 cur.execute('''
-                    INSERT INTO registrars (full_name, phone, login, password, clinic)
-                    VALUES (%s, %s, %s, %s, %s)
+                    INSERT INTO registrars (full_name, phone, login, password, clinic_id, clinic)
+                    VALUES (%s, %s, %s, %s, %s, %s)
                     RETURNING id
                 ''', (
                     data['full_name'],
                     data['phone'],
                     data['login'],
                     data['password'],
-                    data['clinic']
+                    clinic[0],
+                    clinic[1]
                 ))
                 registrar_id = cur.fetchone()[0]
                 conn.commit()
@@ -168,9 +201,18 @@ def handler(event: dict, context) -> dict:
             if 'password' in data:
                 update_fields.append('password = %s')
                 update_values.append(data['password'])
-            if 'clinic' in data:
+            if data.get('clinic_id') or data.get('clinic'):
+                clinic = resolve_clinic(cur, data.get('clinic_id'), data.get('clinic'))
+                if not clinic:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'success': False, 'error': 'Clinic not found: clinic_id of an existing clinic is required'})
+                    }
+                update_fields.append('clinic_id = %s')
+                update_values.append(clinic[0])
                 update_fields.append('clinic = %s')
-                update_values.append(data['clinic'])
+                update_values.append(clinic[1])
             if 'is_blocked' in data:
                 update_fields.append('is_blocked = %s')
                 update_values.append(data['is_blocked'])
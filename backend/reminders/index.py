@@ -0,0 +1,328 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+DISPATCH_BATCH_SIZE = 200
+DISPATCH_MAX_BATCHES = 10
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 3
+DEFAULT_RATE_PER_SECOND = 5.0
+CLAIM_LEASE_SECONDS = 600
+
+def verify_admin_token(token: str, conn) -> bool:
+    """Проверка токена администратора через БД"""
+    if not token:
+        return False
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT id FROM t_p30358746_hospital_website_red.admins WHERE password_hash = %s AND is_active = true",
+            (token,)
+        )
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+class RateLimiter:
+    """Ограничение частоты запросов к провайдеру, общее для всех потоков"""
+    
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def send_green_api_message(base_url: str, instance_id: str, token: str, phone: str, message: str) -> Tuple[bool, Optional[str], Optional[str]]:
+    """Отправка сообщения в MAX через GREEN-API (формат как в sms-verify), возвращает (успех, idMessage, ошибка)"""
+    request_data = json.dumps({
+        'chatId': f"{phone}@c.us",
+        'message': message
+    }).encode('utf-8')
+    
+    req = urllib.request.Request(
+        f'{base_url}/v3/waInstance{instance_id}/sendMessage/{token}',
+        data=request_data,
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            result = json.loads(response.read().decode('utf-8') or '{}')
+            return True, result.get('idMessage'), None
+    except urllib.error.HTTPError as e:
+        return False, None, f"HTTP {e.code}: {e.read().decode('utf-8')[:500]}"
+    except Exception as e:
+        return False, None, f"{type(e).__name__}: {str(e)[:500]}"
+
+def enqueue_reminders(conn, target_date: Optional[str]) -> int:
+    """
+    Постановка напоминаний на дату (по умолчанию завтра) в notification_queue одним запросом.
+    patient_phone_digits уже приводит 8XXXXXXXXXX к 7XXXXXXXXXX, десятизначный номер без кода страны
+    дополняется 7, иначе chatId GREEN-API получился бы недействительным.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """INSERT INTO notification_queue (appointment_id, phone_number, message, kind)
+           SELECT a.id,
+                  CASE WHEN length(a.patient_phone_digits) = 10 THEN '7' || a.patient_phone_digits
+                       ELSE a.patient_phone_digits END,
+                  'Напоминаем о записи к врачу ' || d.full_name || ' '
+                      || to_char(a.appointment_date, 'DD.MM.YYYY') || ' в ' || to_char(a.appointment_time, 'HH24:MI')
+                      || COALESCE(', кабинет ' || d.office_number, '') || '. Если не сможете прийти, пожалуйста, отмените запись.',
+                  'reminder'
+           FROM appointments_v2 a
+           JOIN doctors d ON d.id = a.doctor_id
+           WHERE a.appointment_date = COALESCE(%s::date, CURRENT_DATE + 1)
+             AND a.status = 'scheduled'
+             AND length(a.patient_phone_digits) >= 10
+           ON CONFLICT (appointment_id, kind) WHERE kind = 'reminder' DO NOTHING""",
+        (target_date,)
+    )
+    queued = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    return queued
+
+def claim_pending(conn, batch_size: int, attempted_ids: set) -> list:
+    """
+    Захват пачки уведомлений: строки переводятся в 'sending' и фиксируются до отправки,
+    поэтому блокировки не держатся, пока идут сетевые вызовы. Захват, брошенный оборвавшимся
+    запуском, через CLAIM_LEASE_SECONDS забирается снова (такое сообщение может уйти повторно).
+    """
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor.execute(
+        """UPDATE notification_queue AS q
+           SET status = 'sending', claimed_at = CURRENT_TIMESTAMP
+           WHERE q.id IN (
+               SELECT id
+               FROM notification_queue
+               WHERE (status = 'pending'
+                      OR (status = 'sending' AND claimed_at < CURRENT_TIMESTAMP - make_interval(secs => %s)))
+                 AND id <> ALL(%s::integer[])
+               ORDER BY created_at
+               LIMIT %s
+               FOR UPDATE SKIP LOCKED
+           )
+           RETURNING q.id, q.phone_number, q.message, q.attempts""",
+        (CLAIM_LEASE_SECONDS, list(attempted_ids), batch_size)
+    )
+    notifications = cursor.fetchall()
+    conn.commit()
+    cursor.close()
+    return notifications
+
+def send_batch(notifications: list, send, limiter: RateLimiter) -> List[Tuple[bool, Optional[str], Optional[str]]]:
+    """Отправка захваченных уведомлений пулом потоков; исключение провайдера считается неудачной попыткой"""
+    def deliver(notification):
+        limiter.wait()
+        try:
+            return send(notification['phone_number'], notification['message'])
+        except Exception as e:
+            return False, None, f"{type(e).__name__}: {str(e)[:500]}"
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        return list(pool.map(deliver, notifications))
+
+def build_status_updates(notifications: list, results: list, attempted_ids: set) -> Tuple[list, Dict[str, int]]:
+    """Итоговые статусы по результатам отправки: sent, повтор (pending) или failed после MAX_ATTEMPTS"""
+    updates = []
+    stats = {'sent': 0, 'failed': 0, 'retry': 0}
+    for notification, (ok, message_id, error) in zip(notifications, results):
+        attempted_ids.add(notification['id'])
+        attempts = notification['attempts'] + 1
+        if ok:
+            status = 'sent'
+        elif attempts >= MAX_ATTEMPTS:
+            status = 'failed'
+        else:
+            status = 'pending'
+        stats['retry' if status == 'pending' else status] += 1
+        updates.append((notification['id'], status, attempts, error, message_id))
+    return updates, stats
+
+def dispatch_pending(conn, send, limiter: RateLimiter, batch_size: int, attempted_ids: set) -> Dict[str, int]:
+    """
+    Отправка одной пачки ожидающих уведомлений: захват (коммит), отправка без блокировок, отметка результатов.
+    Уже опробованные в этом запуске уведомления (attempted_ids) повторяются только следующим запуском.
+    """
+    notifications = claim_pending(conn, batch_size, attempted_ids)
+    if not notifications:
+        return {'sent': 0, 'failed': 0, 'retry': 0}
+    
+    results = send_batch(notifications, send, limiter)
+    updates, stats = build_status_updates(notifications, results, attempted_ids)
+    
+    cursor = conn.cursor()
+    execute_values(
+        cursor,
+        """UPDATE notification_queue AS q
+           SET status = v.status, attempts = v.attempts, last_error = v.last_error,
+               provider_message_id = v.message_id, claimed_at = NULL,
+               sent_at = CASE WHEN v.status = 'sent' THEN CURRENT_TIMESTAMP ELSE q.sent_at END
+           FROM (VALUES %s) AS v(id, status, attempts, last_error, message_id)
+           WHERE q.id = v.id AND q.status = 'sending'""",
+        updates,
+        template='(%s::integer, %s, %s::integer, %s, %s)',
+        page_size=len(updates)
+    )
+    conn.commit()
+    cursor.close()
+    return stats
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Рассылка напоминаний о записи и уведомлений из notification_queue через GREEN-API (мессенджер MAX)
+    POST {action: "run", date?, max_batches?} - поставить напоминания на дату (по умолчанию завтра) и разослать очередь
+    POST {action: "enqueue", date?} - только поставить напоминания в очередь
+    POST {action: "dispatch", max_batches?} - только разослать ожидающие уведомления
+    GET ?action=status[&date=...] - состояние очереди
+    Все действия требуют X-Admin-Token. GREEN_API_URL позволяет направить отправку на локальный тестовый сервер.
+    """
+    method = event.get('httpMethod', 'POST')
+    
+    if method == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, X-Admin-Token',
+                'Access-Control-Max-Age': '86400'
+            },
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    database_url = os.environ.get('DATABASE_URL')
+    if not database_url:
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Database configuration missing'}),
+            'isBase64Encoded': False
+        }
+    
+    conn = psycopg2.connect(database_url)
+    
+    try:
+        headers = event.get('headers') or {}
+        admin_token = headers.get('X-Admin-Token') or headers.get('x-admin-token')
+        if not verify_admin_token(admin_token, conn):
+            return {
+                'statusCode': 401,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Unauthorized'}),
+                'isBase64Encoded': False
+            }
+        
+        if method == 'GET':
+            query_params = event.get('queryStringParameters') or {}
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(
+                """SELECT q.kind, q.status, COUNT(*) AS count
+                   FROM notification_queue q
+                   LEFT JOIN appointments_v2 a ON a.id = q.appointment_id
+                   WHERE %(date)s::date IS NULL OR a.appointment_date = %(date)s::date
+                   GROUP BY q.kind, q.status
+                   ORDER BY q.kind, q.status""",
+                {'date': query_params.get('date')}
+            )
+            queue = cursor.fetchall()
+            cursor.close()
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'queue': queue}),
+                'isBase64Encoded': False
+            }
+        
+        if method != 'POST':
+            return {
+                'statusCode': 405,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Method not allowed'}),
+                'isBase64Encoded': False
+            }
+        
+        body = json.loads(event.get('body') or '{}')
+        action = body.get('action', 'run')
+        
+        if action not in ('run', 'enqueue', 'dispatch'):
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Unknown action'}),
+                'isBase64Encoded': False
+            }
+        
+        try:
+            max_batches = max(1, min(int(body.get('max_batches', DISPATCH_MAX_BATCHES)), DISPATCH_MAX_BATCHES))
+        except (TypeError, ValueError):
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'max_batches must be an integer'}),
+                'isBase64Encoded': False
+            }
+        
+        queued = 0
+        if action in ('run', 'enqueue'):
+            queued = enqueue_reminders(conn, body.get('date'))
+        
+        totals = {'sent': 0, 'failed': 0, 'retry': 0}
+        has_more = False
+        if action in ('run', 'dispatch'):
+            green_api_instance_id = os.environ.get('GREEN_API_INSTANCE_ID')
+            green_api_token = os.environ.get('GREEN_API_TOKEN')
+            green_api_url = os.environ.get('GREEN_API_URL', 'https://api.green-api.com').rstrip('/')
+            
+            if not green_api_instance_id or not green_api_token:
+                return {
+                    'statusCode': 500,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'GREEN-API credentials not configured', 'queued': queued}),
+                    'isBase64Encoded': False
+                }
+            
+            def send(phone: str, message: str):
+                return send_green_api_message(green_api_url, green_api_instance_id, green_api_token, phone, message)
+            
+            limiter = RateLimiter(float(os.environ.get('GREEN_API_RATE_PER_SECOND', DEFAULT_RATE_PER_SECOND)))
+            attempted_ids = set()
+            
+            # Очередь хранит состояние в БД: при обрыве следующий запуск продолжит с оставшихся pending
+            for _ in range(max_batches):
+                stats = dispatch_pending(conn, send, limiter, DISPATCH_BATCH_SIZE, attempted_ids)
+                for key in totals:
+                    totals[key] += stats[key]
+                processed = sum(stats.values())
+                has_more = processed == DISPATCH_BATCH_SIZE
+                if not has_more:
+                    break
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'success': True, 'queued': queued, 'has_more': has_more, **totals}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        conn.close()
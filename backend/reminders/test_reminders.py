@@ -0,0 +1,116 @@
+import importlib.util
+import os
+import unittest
+
+import psycopg2
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), 'index.py')
+spec = importlib.util.spec_from_file_location('reminders_index', INDEX_PATH)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+MAX_ATTEMPTS = index.MAX_ATTEMPTS
+RateLimiter = index.RateLimiter
+build_status_updates = index.build_status_updates
+enqueue_reminders = index.enqueue_reminders
+send_batch = index.send_batch
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+TEST_DATE = '2099-01-01'
+
+
+class FakeProvider:
+    """Поддельный GREEN-API: успех, ошибка или исключение в зависимости от номера"""
+
+    def __init__(self, failing: set, raising: set):
+        self.failing = failing
+        self.raising = raising
+        self.sent = []
+
+    def __call__(self, phone: str, message: str):
+        if phone in self.raising:
+            raise TimeoutError('provider timeout')
+        if phone in self.failing:
+            return False, None, 'HTTP 500: internal error'
+        self.sent.append((phone, message))
+        return True, f'msg-{phone}', None
+
+
+def notification(notification_id: int, phone: str, attempts: int = 0) -> dict:
+    return {'id': notification_id, 'phone_number': phone, 'message': f'Напоминание {notification_id}', 'attempts': attempts}
+
+
+class DispatchTest(unittest.TestCase):
+    def test_success_and_failure_statuses(self):
+        notifications = [
+            notification(1, '79000000001'),
+            notification(2, '79000000002'),
+            notification(3, '79000000003', attempts=MAX_ATTEMPTS - 1),
+            notification(4, '79000000004'),
+        ]
+        provider = FakeProvider(failing={'79000000002', '79000000003'}, raising={'79000000004'})
+        attempted_ids = set()
+
+        results = send_batch(notifications, provider, RateLimiter(0))
+        updates, stats = build_status_updates(notifications, results, attempted_ids)
+
+        self.assertEqual(provider.sent, [('79000000001', 'Напоминание 1')])
+        self.assertEqual(stats, {'sent': 1, 'failed': 1, 'retry': 2})
+        self.assertEqual(attempted_ids, {1, 2, 3, 4})
+        by_id = {update[0]: update for update in updates}
+        self.assertEqual(by_id[1], (1, 'sent', 1, None, 'msg-79000000001'))
+        self.assertEqual(by_id[2], (2, 'pending', 1, 'HTTP 500: internal error', None))
+        self.assertEqual(by_id[3], (3, 'failed', MAX_ATTEMPTS, 'HTTP 500: internal error', None))
+        self.assertEqual(by_id[4][:3], (4, 'pending', 1))
+        self.assertTrue(by_id[4][3].startswith('TimeoutError'))
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL не задан')
+class EnqueueRemindersTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg2.connect(TEST_DATABASE_URL)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "INSERT INTO doctors (full_name, position, login, password_hash) "
+            "VALUES ('Тестовый врач', 'Терапевт', 'test_reminders_doctor', 'x') RETURNING id"
+        )
+        self.doctor_id = cursor.fetchone()[0]
+        self.appointment_ids = {}
+        for hour, phone in enumerate(['9121234567', '+7 (912) 123-45-68', '8 912 123 45 69', '12345']):
+            cursor.execute(
+                "INSERT INTO appointments_v2 (doctor_id, patient_name, patient_phone, appointment_date, appointment_time) "
+                "VALUES (%s, 'Пациент', %s, %s, %s) RETURNING id",
+                (self.doctor_id, phone, TEST_DATE, f'{9 + hour:02d}:00')
+            )
+            self.appointment_ids[cursor.fetchone()[0]] = phone
+        cursor.close()
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.rollback()
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM notification_queue WHERE appointment_id = ANY(%s)", (list(self.appointment_ids),))
+        for table in ('appointments_v2', 'appointment_changes', 'doctor_daily_stats'):
+            cursor.execute(f"DELETE FROM {table} WHERE doctor_id = %s", (self.doctor_id,))
+        cursor.execute("DELETE FROM doctors WHERE id = %s", (self.doctor_id,))
+        cursor.close()
+        self.conn.commit()
+        self.conn.close()
+
+    def test_phone_numbers_are_queued_as_valid_chat_ids(self):
+        self.assertEqual(enqueue_reminders(self.conn, TEST_DATE), 3)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT appointment_id, phone_number FROM notification_queue WHERE appointment_id = ANY(%s) AND kind = 'reminder'",
+            (list(self.appointment_ids),)
+        )
+        queued = {self.appointment_ids[appointment_id]: phone for appointment_id, phone in cursor.fetchall()}
+        cursor.close()
+        self.assertEqual(queued, {
+            '9121234567': '79121234567',
+            '+7 (912) 123-45-68': '79121234568',
+            '8 912 123 45 69': '79121234569',
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,109 @@
 import json
 import os
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Dict, Any
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import Dict, Any, List
+
+RESCHEDULE_HORIZON_DAYS = 60
+
+def reschedule_closed_day_appointments(cursor, doctor_id: Any, dates: List[str]) -> list:
+    """
+    Перенос записей с закрытых дней на ближайшие свободные слоты врача одним запросом.
+    Слоты строятся по daily_schedules с учётом перерыва, выходных из doctor_calendar и занятых записей.
+    Записи прошедших дней не трогаются, сегодняшние слоты берутся только позже текущего времени.
+    """
+    cursor.execute(
+        """WITH affected AS (
+               SELECT id, appointment_date, appointment_time,
+                      ROW_NUMBER() OVER (ORDER BY appointment_date, appointment_time) AS rn
+               FROM appointments_v2
+               WHERE doctor_id = %(doctor_id)s AND appointment_date = ANY(%(dates)s::date[]) AND status = 'scheduled'
+                 AND appointment_date >= CURRENT_DATE
+           ),
+           free_slots AS (
+               SELECT s.schedule_date AS slot_date, t::time AS slot_time,
+                      ROW_NUMBER() OVER (ORDER BY s.schedule_date, t) AS rn
+               FROM daily_schedules s
+               CROSS JOIN LATERAL generate_series(
+                   s.schedule_date + s.start_time,
+                   s.schedule_date + s.end_time - make_interval(mins => s.slot_duration),
+                   make_interval(mins => s.slot_duration)
+               ) AS t
+               WHERE s.doctor_id = %(doctor_id)s
+                 AND s.is_active = true
+                 AND s.schedule_date > (SELECT MIN(d) FROM unnest(%(dates)s::date[]) AS d)
+                 AND s.schedule_date >= CURRENT_DATE
+                 AND t > LOCALTIMESTAMP
+                 AND s.schedule_date <= CURRENT_DATE + %(horizon)s
+                 AND s.schedule_date <> ALL(%(dates)s::date[])
+                 AND NOT (s.break_start_time IS NOT NULL AND s.break_end_time IS NOT NULL
+                          AND t::time < s.break_end_time
+                          AND (t + make_interval(mins => s.slot_duration))::time > s.break_start_time)
+                 AND NOT EXISTS (
+                     SELECT 1 FROM doctor_calendar c
+                     WHERE c.doctor_id = s.doctor_id AND c.calendar_date = s.schedule_date AND c.is_working = false
+                 )
+                 AND NOT EXISTS (
+                     SELECT 1 FROM appointments_v2 a
+                     WHERE a.doctor_id = s.doctor_id AND a.appointment_date = s.schedule_date AND a.appointment_time = t::time
+                 )
+           ),
+           moved AS (
+               SELECT a.id, a.appointment_date AS old_date, a.appointment_time AS old_time, f.slot_date, f.slot_time
+               FROM affected a
+               JOIN free_slots f ON f.rn = a.rn
+           )
+           UPDATE appointments_v2 ap
+           SET appointment_date = m.slot_date, appointment_time = m.slot_time
+           FROM moved m
+           WHERE ap.id = m.id
+           RETURNING ap.id, ap.patient_name, ap.patient_phone_digits, m.old_date, m.old_time,
+                     ap.appointment_date, ap.appointment_time""",
+        {'doctor_id': doctor_id, 'dates': dates, 'horizon': RESCHEDULE_HORIZON_DAYS}
+    )
+    return cursor.fetchall()
+
+def cancel_closed_day_appointments(cursor, doctor_id: Any, dates: List[str]) -> list:
+    """Отмена всех оставшихся записей врача на закрытые дни (начиная с сегодняшнего) одним запросом"""
+    cursor.execute(
+        """UPDATE appointments_v2
+           SET status = 'cancelled'
+           WHERE doctor_id = %s AND appointment_date = ANY(%s::date[]) AND status = 'scheduled'
+             AND appointment_date >= CURRENT_DATE
+           RETURNING id, patient_name, patient_phone_digits, appointment_date, appointment_time""",
+        (doctor_id, dates)
+    )
+    return cursor.fetchall()
+
+def queue_patient_notifications(cursor, doctor_name: str, rescheduled: list, cancelled: list) -> int:
+    """Постановка уведомлений пациентам в notification_queue одним пакетом; номер берётся из patient_phone_digits (8 -> 7, как в поиске)"""
+    notifications = []
+    for row in rescheduled:
+        notifications.append((
+            row['id'],
+            row['patient_phone_digits'] or '',
+            f"Ваша запись к врачу {doctor_name} перенесена с {row['old_date']:%d.%m.%Y} {row['old_time']:%H:%M} "
+            f"на {row['appointment_date']:%d.%m.%Y} {row['appointment_time']:%H:%M}.",
+            'appointment_rescheduled'
+        ))
+    for row in cancelled:
+        notifications.append((
+            row['id'],
+            row['patient_phone_digits'] or '',
+            f"Ваша запись к врачу {doctor_name} на {row['appointment_date']:%d.%m.%Y} {row['appointment_time']:%H:%M} "
+            f"отменена: врач не принимает в этот день. Пожалуйста, выберите другое время.",
+            'appointment_cancelled'
+        ))
+    
+    notifications = [n for n in notifications if n[1]]
+    if notifications:
+        execute_values(
+            cursor,
+            "INSERT INTO notification_queue (appointment_id, phone_number, message, kind) VALUES %s",
+            notifications,
+            page_size=len(notifications)
+        )
+    return len(notifications)
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -13,7 +114,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     POST / - создать/обновить расписание
     POST {action: "daily", doctor_id, schedule_date, start_time, end_time, ...} - создать/обновить день
     POST {action: "calendar", doctor_id, calendar_date, is_working, note} - сохранить день календаря
-    POST {action: "bulk_calendar", doctor_id, dates, is_working} - массовое сохранение дней
+    POST {action: "bulk_calendar", doctor_id, dates, is_working, appointments_action} - массовое сохранение дней,
+         appointments_action: "keep" (по умолчанию), "cancel" или "reschedule" для записей на закрытые дни
     PUT / - изменить статус активности или время
     PUT {action: "daily", id, ...} - изменить ежедневное расписание
     DELETE /?id=X - удалить расписание
@@ -205,6 +307,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             elif action == 'bulk_calendar':
                 dates = body.get('dates', [])
                 is_working = body.get('is_working', True)
+                appointments_action = body.get('appointments_action', 'keep')
                 
                 if not all([doctor_id, dates]):
                     cursor.close()
@@ -215,14 +318,42 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                         'isBase64Encoded': False
                     }
                 
-                for date in dates:
-                    cursor.execute(
-                        """INSERT INTO doctor_calendar (doctor_id, calendar_date, is_working, updated_at)
-                           VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
-                           ON CONFLICT (doctor_id, calendar_date)
-                           DO UPDATE SET is_working = EXCLUDED.is_working, updated_at = CURRENT_TIMESTAMP""",
-                        (doctor_id, date, is_working)
-                    )
+                if appointments_action not in ('keep', 'cancel', 'reschedule'):
+                    cursor.close()
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'appointments_action must be keep, cancel or reschedule'}),
+                        'isBase64Encoded': False
+                    }
+                
+                dates = sorted(set(dates))
+                execute_values(
+                    cursor,
+                    """INSERT INTO doctor_calendar (doctor_id, calendar_date, is_working, updated_at)
+                       VALUES %s
+                       ON CONFLICT (doctor_id, calendar_date)
+                       DO UPDATE SET is_working = EXCLUDED.is_working, updated_at = CURRENT_TIMESTAMP""",
+                    [(doctor_id, date, is_working) for date in dates],
+                    template='(%s, %s, %s, CURRENT_TIMESTAMP)',
+                    page_size=len(dates)
+                )
+                
+                # Записи на закрытые дни обрабатываются в той же транзакции, уведомления только ставятся в очередь
+                rescheduled = []
+                cancelled = []
+                queued_notifications = 0
+                if not is_working and appointments_action != 'keep':
+                    if appointments_action == 'reschedule':
+                        rescheduled = reschedule_closed_day_appointments(cursor, doctor_id, dates)
+                    cancelled = cancel_closed_day_appointments(cursor, doctor_id, dates)
+                    
+                    if rescheduled or cancelled:
+                        cursor.execute("SELECT full_name FROM doctors WHERE id = %s", (doctor_id,))
+                        doctor = cursor.fetchone()
+                        queued_notifications = queue_patient_notifications(
+                            cursor, doctor['full_name'] if doctor else '', rescheduled, cancelled
+                        )
                 
                 conn.commit()
                 cursor.close()
@@ -230,7 +361,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 return {
                     'statusCode': 201,
                     'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'success': True, 'updated_count': len(dates)}),
+                    'body': json.dumps({
+                        'success': True,
+                        'updated_count': len(dates),
+                        'rescheduled': rescheduled,
+                        'cancelled': cancelled,
+                        'queued_notifications': queued_notifications
+                    }, default=str),
                     'isBase64Encoded': False
                 }
             
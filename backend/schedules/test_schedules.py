@@ -0,0 +1,70 @@
+import importlib.util
+import os
+import unittest
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), 'index.py')
+spec = importlib.util.spec_from_file_location('schedules_index', INDEX_PATH)
+index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(index)
+cancel_closed_day_appointments = index.cancel_closed_day_appointments
+reschedule_closed_day_appointments = index.reschedule_closed_day_appointments
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL не задан')
+class RescheduleClosedDaysTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg2.connect(TEST_DATABASE_URL)
+        self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+        self.cursor.execute(
+            "INSERT INTO doctors (full_name, position, login, password_hash) "
+            "VALUES ('Тестовый врач', 'Терапевт', 'test_reschedule_doctor', 'x') RETURNING id"
+        )
+        self.doctor_id = self.cursor.fetchone()['id']
+        self.cursor.execute("SELECT CURRENT_DATE - 1 AS yesterday, CURRENT_DATE + 1 AS tomorrow, CURRENT_DATE + 2 AS after_tomorrow")
+        self.days = self.cursor.fetchone()
+
+    def tearDown(self):
+        self.cursor.close()
+        self.conn.rollback()
+        self.conn.close()
+
+    def add_schedule(self, day_expression: str, start_time: str, end_time: str) -> None:
+        self.cursor.execute(
+            f"INSERT INTO daily_schedules (doctor_id, schedule_date, start_time, end_time, slot_duration) "
+            f"VALUES (%s, {day_expression}, %s, %s, 15)",
+            (self.doctor_id, start_time, end_time)
+        )
+
+    def add_appointment(self, day, time_value: str) -> int:
+        self.cursor.execute(
+            "INSERT INTO appointments_v2 (doctor_id, patient_name, patient_phone, appointment_date, appointment_time) "
+            "VALUES (%s, 'Пациент', '+79120000000', %s, %s) RETURNING id",
+            (self.doctor_id, day, time_value)
+        )
+        return self.cursor.fetchone()['id']
+
+    def test_passed_slot_today_and_past_dates_are_skipped(self):
+        # Сегодня только слот 00:00 (уже прошёл), следующий свободный - послезавтра в 09:00
+        self.add_schedule('CURRENT_DATE', '00:00', '00:15')
+        self.add_schedule('CURRENT_DATE + 2', '09:00', '09:15')
+        past_id = self.add_appointment(self.days['yesterday'], '10:00')
+        future_id = self.add_appointment(self.days['tomorrow'], '10:00')
+        dates = [str(self.days['yesterday']), str(self.days['tomorrow'])]
+
+        moved = reschedule_closed_day_appointments(self.cursor, self.doctor_id, dates)
+        self.assertEqual([(row['id'], row['appointment_date'], str(row['appointment_time'])) for row in moved],
+                         [(future_id, self.days['after_tomorrow'], '09:00:00')])
+
+        cancelled = cancel_closed_day_appointments(self.cursor, self.doctor_id, dates)
+        self.assertEqual(cancelled, [])
+        self.cursor.execute("SELECT appointment_date, status FROM appointments_v2 WHERE id = %s", (past_id,))
+        self.assertEqual(dict(self.cursor.fetchone()), {'appointment_date': self.days['yesterday'], 'status': 'scheduled'})
+
+
+if __name__ == '__main__':
+    unittest.main()
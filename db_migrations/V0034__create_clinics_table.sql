@@ -0,0 +1,33 @@
+-- Справочник поликлиник вместо свободного текста в doctors.clinic и registrars.clinic
+CREATE TABLE IF NOT EXISTS clinics (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL UNIQUE,
+    is_active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO clinics (name) VALUES
+    ('Центральная городская поликлиника'),
+    ('Детская городская поликлиника')
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO clinics (name)
+SELECT clinic FROM doctors WHERE clinic IS NOT NULL
+UNION
+SELECT clinic FROM registrars WHERE clinic IS NOT NULL
+ON CONFLICT (name) DO NOTHING;
+
+ALTER TABLE doctors ADD COLUMN IF NOT EXISTS clinic_id INTEGER REFERENCES clinics(id);
+ALTER TABLE registrars ADD COLUMN IF NOT EXISTS clinic_id INTEGER REFERENCES clinics(id);
+
+UPDATE doctors d SET clinic_id = c.id FROM clinics c WHERE c.name = d.clinic AND d.clinic_id IS NULL;
+UPDATE registrars r SET clinic_id = c.id FROM clinics c WHERE c.name = r.clinic AND r.clinic_id IS NULL;
+
+-- Индексы для выборок и группировок по поликлинике
+CREATE INDEX IF NOT EXISTS idx_doctors_clinic_id ON doctors(clinic_id, full_name);
+CREATE INDEX IF NOT EXISTS idx_registrars_clinic_id ON registrars(clinic_id);
+
+COMMENT ON TABLE clinics IS 'Справочник поликлиник';
+COMMENT ON COLUMN doctors.clinic_id IS 'Ссылка на поликлинику (clinics.id)';
+COMMENT ON COLUMN registrars.clinic_id IS 'Ссылка на поликлинику (clinics.id)';
+COMMENT ON COLUMN doctors.clinic IS 'Устаревшее: название поликлиники, синхронизируется с clinics.name через API';
@@ -0,0 +1,4 @@
+-- Покрывающий индекс для листа записей регистратуры: все записи на дату по врачам в порядке времени
+CREATE INDEX IF NOT EXISTS idx_appointments_v2_day_sheet
+    ON appointments_v2(appointment_date, doctor_id, appointment_time)
+    INCLUDE (id, status);
@@ -0,0 +1,21 @@
+-- Нормализованные ключи поиска пациента: телефон и СНИЛС только цифрами (8XXXXXXXXXX приводится к 7XXXXXXXXXX)
+ALTER TABLE appointments_v2
+ADD COLUMN IF NOT EXISTS patient_phone_digits VARCHAR(20) GENERATED ALWAYS AS (
+    CASE
+        WHEN regexp_replace(patient_phone, '\D', '', 'g') ~ '^8[0-9]{10}$'
+            THEN '7' || substr(regexp_replace(patient_phone, '\D', '', 'g'), 2)
+        ELSE regexp_replace(patient_phone, '\D', '', 'g')
+    END
+) STORED,
+ADD COLUMN IF NOT EXISTS patient_snils_digits VARCHAR(14) GENERATED ALWAYS AS (
+    NULLIF(regexp_replace(patient_snils, '\D', '', 'g'), '')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_appointments_v2_phone_digits
+    ON appointments_v2(patient_phone_digits, appointment_date DESC);
+CREATE INDEX IF NOT EXISTS idx_appointments_v2_snils_digits
+    ON appointments_v2(patient_snils_digits, appointment_date DESC)
+    WHERE patient_snils_digits IS NOT NULL;
+
+COMMENT ON COLUMN appointments_v2.patient_phone_digits IS 'Телефон пациента только цифрами для поиска';
+COMMENT ON COLUMN appointments_v2.patient_snils_digits IS 'СНИЛС пациента только цифрами для поиска';
@@ -0,0 +1,144 @@
+-- Ежедневная сводка загрузки врача, обновляется триггерами при изменении записей и расписания
+CREATE TABLE IF NOT EXISTS doctor_daily_stats (
+    doctor_id INTEGER NOT NULL REFERENCES doctors(id),
+    stat_date DATE NOT NULL,
+    booked_count INTEGER NOT NULL DEFAULT 0,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    cancelled_count INTEGER NOT NULL DEFAULT 0,
+    available_slots INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (doctor_id, stat_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_doctor_daily_stats_date ON doctor_daily_stats(stat_date, doctor_id);
+
+COMMENT ON TABLE doctor_daily_stats IS 'Сводка по врачу за день: записи, приёмы, отмены и доступные слоты';
+COMMENT ON COLUMN doctor_daily_stats.booked_count IS 'Записи в статусе, отличном от cancelled';
+COMMENT ON COLUMN doctor_daily_stats.completed_count IS 'Завершённые приёмы (status = completed)';
+COMMENT ON COLUMN doctor_daily_stats.available_slots IS 'Количество слотов по daily_schedules с учётом перерыва и doctor_calendar';
+
+-- Изменение счётчиков записей на +1/-1 для одной записи
+CREATE OR REPLACE FUNCTION doctor_daily_stats_apply(p_doctor_id INTEGER, p_date DATE, p_status VARCHAR, p_sign INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO doctor_daily_stats (doctor_id, stat_date, booked_count, completed_count, cancelled_count, updated_at)
+    VALUES (
+        p_doctor_id,
+        p_date,
+        CASE WHEN p_status IS DISTINCT FROM 'cancelled' THEN p_sign ELSE 0 END,
+        CASE WHEN p_status = 'completed' THEN p_sign ELSE 0 END,
+        CASE WHEN p_status = 'cancelled' THEN p_sign ELSE 0 END,
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (doctor_id, stat_date) DO UPDATE SET
+        booked_count = doctor_daily_stats.booked_count + EXCLUDED.booked_count,
+        completed_count = doctor_daily_stats.completed_count + EXCLUDED.completed_count,
+        cancelled_count = doctor_daily_stats.cancelled_count + EXCLUDED.cancelled_count,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION doctor_daily_stats_on_appointment()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.doctor_id = OLD.doctor_id
+       AND NEW.appointment_date = OLD.appointment_date
+       AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM doctor_daily_stats_apply(OLD.doctor_id, OLD.appointment_date, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM doctor_daily_stats_apply(NEW.doctor_id, NEW.appointment_date, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_appointments_v2_daily_stats ON appointments_v2;
+CREATE TRIGGER trg_appointments_v2_daily_stats
+    AFTER INSERT OR UPDATE OR DELETE ON appointments_v2
+    FOR EACH ROW EXECUTE FUNCTION doctor_daily_stats_on_appointment();
+
+-- Пересчёт доступных слотов одного дня по daily_schedules и doctor_calendar
+CREATE OR REPLACE FUNCTION doctor_daily_stats_refresh_slots(p_doctor_id INTEGER, p_date DATE)
+RETURNS VOID AS $$
+DECLARE
+    v_slots INTEGER;
+BEGIN
+    SELECT COALESCE(FLOOR(
+               (EXTRACT(EPOCH FROM (s.end_time - s.start_time))
+                - COALESCE(EXTRACT(EPOCH FROM (s.break_end_time - s.break_start_time)), 0))
+               / 60 / NULLIF(s.slot_duration, 0)
+           ), 0)
+    INTO v_slots
+    FROM daily_schedules s
+    WHERE s.doctor_id = p_doctor_id
+      AND s.schedule_date = p_date
+      AND s.is_active = true
+      AND NOT EXISTS (
+          SELECT 1 FROM doctor_calendar c
+          WHERE c.doctor_id = p_doctor_id AND c.calendar_date = p_date AND c.is_working = false
+      );
+
+    INSERT INTO doctor_daily_stats (doctor_id, stat_date, available_slots, updated_at)
+    VALUES (p_doctor_id, p_date, GREATEST(COALESCE(v_slots, 0), 0), CURRENT_TIMESTAMP)
+    ON CONFLICT (doctor_id, stat_date) DO UPDATE SET
+        available_slots = EXCLUDED.available_slots,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION doctor_daily_stats_on_daily_schedule()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM doctor_daily_stats_refresh_slots(OLD.doctor_id, OLD.schedule_date);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM doctor_daily_stats_refresh_slots(NEW.doctor_id, NEW.schedule_date);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION doctor_daily_stats_on_calendar()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM doctor_daily_stats_refresh_slots(OLD.doctor_id, OLD.calendar_date);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM doctor_daily_stats_refresh_slots(NEW.doctor_id, NEW.calendar_date);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_daily_schedules_daily_stats ON daily_schedules;
+CREATE TRIGGER trg_daily_schedules_daily_stats
+    AFTER INSERT OR UPDATE OR DELETE ON daily_schedules
+    FOR EACH ROW EXECUTE FUNCTION doctor_daily_stats_on_daily_schedule();
+
+DROP TRIGGER IF EXISTS trg_doctor_calendar_daily_stats ON doctor_calendar;
+CREATE TRIGGER trg_doctor_calendar_daily_stats
+    AFTER INSERT OR UPDATE OR DELETE ON doctor_calendar
+    FOR EACH ROW EXECUTE FUNCTION doctor_daily_stats_on_calendar();
+
+-- Первоначальное заполнение по существующим данным
+INSERT INTO doctor_daily_stats (doctor_id, stat_date, booked_count, completed_count, cancelled_count)
+SELECT doctor_id,
+       appointment_date,
+       COUNT(*) FILTER (WHERE status IS DISTINCT FROM 'cancelled'),
+       COUNT(*) FILTER (WHERE status = 'completed'),
+       COUNT(*) FILTER (WHERE status = 'cancelled')
+FROM appointments_v2
+GROUP BY doctor_id, appointment_date
+ON CONFLICT (doctor_id, stat_date) DO UPDATE SET
+    booked_count = EXCLUDED.booked_count,
+    completed_count = EXCLUDED.completed_count,
+    cancelled_count = EXCLUDED.cancelled_count;
+
+SELECT doctor_daily_stats_refresh_slots(doctor_id, schedule_date) FROM daily_schedules;
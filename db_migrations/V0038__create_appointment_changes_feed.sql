@@ -0,0 +1,64 @@
+-- Журнал изменений записей для инкрементальной доставки экранам регистратуры и врачей
+CREATE TABLE IF NOT EXISTS appointment_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    appointment_id INTEGER NOT NULL,
+    doctor_id INTEGER NOT NULL,
+    appointment_date DATE NOT NULL,
+    operation VARCHAR(10) NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_appointment_changes_doctor_seq ON appointment_changes(doctor_id, seq);
+CREATE INDEX IF NOT EXISTS idx_appointment_changes_date_seq ON appointment_changes(appointment_date, seq);
+CREATE INDEX IF NOT EXISTS idx_appointment_changes_changed_at ON appointment_changes(changed_at);
+
+COMMENT ON TABLE appointment_changes IS 'Лента изменений appointments_v2, seq используется как курсор long-poll';
+
+-- Запись в журнал и NOTIFY appointment_changes с {seq, id, doctor_id, date, op}
+CREATE OR REPLACE FUNCTION appointment_changes_notify()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row appointments_v2%ROWTYPE;
+    v_seq BIGINT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        v_row := OLD;
+    ELSE
+        v_row := NEW;
+    END IF;
+
+    INSERT INTO appointment_changes (appointment_id, doctor_id, appointment_date, operation)
+    VALUES (v_row.id, v_row.doctor_id, v_row.appointment_date, TG_OP)
+    RETURNING seq INTO v_seq;
+
+    PERFORM pg_notify('appointment_changes', json_build_object(
+        'seq', v_seq,
+        'id', v_row.id,
+        'doctor_id', v_row.doctor_id,
+        'date', v_row.appointment_date,
+        'op', TG_OP
+    )::text);
+
+    -- Перенос записи на другой день/к другому врачу должен быть виден и на старом листе
+    IF TG_OP = 'UPDATE' AND (OLD.doctor_id <> NEW.doctor_id OR OLD.appointment_date <> NEW.appointment_date) THEN
+        INSERT INTO appointment_changes (appointment_id, doctor_id, appointment_date, operation)
+        VALUES (OLD.id, OLD.doctor_id, OLD.appointment_date, 'MOVE')
+        RETURNING seq INTO v_seq;
+
+        PERFORM pg_notify('appointment_changes', json_build_object(
+            'seq', v_seq,
+            'id', OLD.id,
+            'doctor_id', OLD.doctor_id,
+            'date', OLD.appointment_date,
+            'op', 'MOVE'
+        )::text);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_appointments_v2_changes ON appointments_v2;
+CREATE TRIGGER trg_appointments_v2_changes
+    AFTER INSERT OR UPDATE OR DELETE ON appointments_v2
+    FOR EACH ROW EXECUTE FUNCTION appointment_changes_notify();
@@ -0,0 +1,20 @@
+-- Очередь исходящих уведомлений пациентам (отправляется пакетно, а не внутри запроса)
+CREATE TABLE IF NOT EXISTS notification_queue (
+    id SERIAL PRIMARY KEY,
+    appointment_id INTEGER,
+    phone_number VARCHAR(20) NOT NULL,
+    message TEXT NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP,
+    CONSTRAINT chk_notification_status CHECK (status IN ('pending', 'sent', 'failed'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_queue_pending ON notification_queue(created_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_notification_queue_appointment ON notification_queue(appointment_id);
+
+COMMENT ON TABLE notification_queue IS 'Очередь уведомлений пациентам (отмена/перенос записи, напоминания)';
+COMMENT ON COLUMN notification_queue.kind IS 'Тип уведомления: appointment_cancelled, appointment_rescheduled, reminder';
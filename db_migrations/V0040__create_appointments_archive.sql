@@ -0,0 +1,90 @@
+-- Холодное хранилище записей: старые строки переносятся из appointments_v2 пакетами
+CREATE TABLE IF NOT EXISTS appointments_archive (
+    LIKE appointments_v2 INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING INDEXES,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE appointments_archive ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE appointments_archive
+    ADD CONSTRAINT fk_appointments_archive_doctor FOREIGN KEY (doctor_id) REFERENCES doctors(id);
+
+COMMENT ON TABLE appointments_archive IS 'Архив appointments_v2 (старше N месяцев), уникальность (doctor_id, appointment_date, appointment_time) сохраняется';
+
+-- Единая точка чтения горячих и архивных записей
+CREATE OR REPLACE VIEW appointments_all AS
+SELECT id, doctor_id, patient_name, patient_phone, appointment_date, appointment_time, description, status,
+       created_at, patient_snils, completed_at, patient_phone_digits, patient_snils_digits, false AS is_archived
+FROM appointments_v2
+UNION ALL
+SELECT id, doctor_id, patient_name, patient_phone, appointment_date, appointment_time, description, status,
+       created_at, patient_snils, completed_at, patient_phone_digits, patient_snils_digits, true AS is_archived
+FROM appointments_archive;
+
+-- Перенос в архив не является изменением записи: сводки и лента изменений его пропускают
+CREATE OR REPLACE FUNCTION doctor_daily_stats_on_appointment()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('app.archiving', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE'
+       AND NEW.doctor_id = OLD.doctor_id
+       AND NEW.appointment_date = OLD.appointment_date
+       AND NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM doctor_daily_stats_apply(OLD.doctor_id, OLD.appointment_date, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM doctor_daily_stats_apply(NEW.doctor_id, NEW.appointment_date, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION appointment_changes_notify()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_row appointments_v2%ROWTYPE;
+    v_seq BIGINT;
+BEGIN
+    IF current_setting('app.archiving', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        v_row := OLD;
+    ELSE
+        v_row := NEW;
+    END IF;
+
+    INSERT INTO appointment_changes (appointment_id, doctor_id, appointment_date, operation)
+    VALUES (v_row.id, v_row.doctor_id, v_row.appointment_date, TG_OP)
+    RETURNING seq INTO v_seq;
+
+    PERFORM pg_notify('appointment_changes', json_build_object(
+        'seq', v_seq,
+        'id', v_row.id,
+        'doctor_id', v_row.doctor_id,
+        'date', v_row.appointment_date,
+        'op', TG_OP
+    )::text);
+
+    IF TG_OP = 'UPDATE' AND (OLD.doctor_id <> NEW.doctor_id OR OLD.appointment_date <> NEW.appointment_date) THEN
+        INSERT INTO appointment_changes (appointment_id, doctor_id, appointment_date, operation)
+        VALUES (OLD.id, OLD.doctor_id, OLD.appointment_date, 'MOVE')
+        RETURNING seq INTO v_seq;
+
+        PERFORM pg_notify('appointment_changes', json_build_object(
+            'seq', v_seq,
+            'id', OLD.id,
+            'doctor_id', OLD.doctor_id,
+            'date', OLD.appointment_date,
+            'op', 'MOVE'
+        )::text);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,8 @@
+-- Не более одного напоминания на запись: повторный запуск рассыльщика не дублирует сообщения
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_queue_reminder_unique
+    ON notification_queue(appointment_id, kind)
+    WHERE kind = 'reminder';
+
+ALTER TABLE notification_queue ADD COLUMN IF NOT EXISTS provider_message_id VARCHAR(100);
+
+COMMENT ON COLUMN notification_queue.provider_message_id IS 'idMessage из ответа GREEN-API';
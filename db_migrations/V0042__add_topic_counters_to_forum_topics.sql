@@ -0,0 +1,17 @@
+-- Денормализованные счётчики темы вместо подзапросов COUNT/MAX по forum_posts в списке тем
+ALTER TABLE forum_topics
+ADD COLUMN IF NOT EXISTS posts_count INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS last_post_at TIMESTAMP;
+
+UPDATE forum_topics t
+SET posts_count = s.posts_count, last_post_at = s.last_post_at
+FROM (
+    SELECT topic_id, COUNT(*) AS posts_count, MAX(created_at) AS last_post_at
+    FROM forum_posts
+    WHERE is_hidden = FALSE
+    GROUP BY topic_id
+) s
+WHERE s.topic_id = t.id;
+
+COMMENT ON COLUMN forum_topics.posts_count IS 'Количество видимых сообщений, обновляется forum_posts и forum_moderation';
+COMMENT ON COLUMN forum_topics.last_post_at IS 'Время последнего видимого сообщения';
@@ -0,0 +1,14 @@
+-- Ключи пагинации списка тем не должны быть NULL, иначе сравнение кортежей теряет строки
+UPDATE forum_topics SET is_pinned = FALSE WHERE is_pinned IS NULL;
+UPDATE forum_topics SET is_hidden = FALSE WHERE is_hidden IS NULL;
+UPDATE forum_topics SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL;
+
+ALTER TABLE forum_topics
+    ALTER COLUMN is_pinned SET NOT NULL,
+    ALTER COLUMN is_hidden SET NOT NULL,
+    ALTER COLUMN updated_at SET NOT NULL;
+
+-- Порядок главной страницы форума: закреплённые, затем по updated_at; только видимые темы
+CREATE INDEX IF NOT EXISTS idx_forum_topics_front_page
+    ON forum_topics(is_pinned DESC, updated_at DESC, id DESC)
+    WHERE is_hidden = FALSE;
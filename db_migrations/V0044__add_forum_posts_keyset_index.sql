@@ -0,0 +1,4 @@
+-- Постраничная и инкрементальная выдача видимых сообщений темы в порядке (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_forum_posts_topic_created
+    ON forum_posts(topic_id, created_at, id)
+    WHERE is_hidden = FALSE;
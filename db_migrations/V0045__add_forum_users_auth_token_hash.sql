@@ -0,0 +1,12 @@
+-- Токены сессий форума храним только в виде SHA-256 и ищем по индексу
+ALTER TABLE forum_users ADD COLUMN IF NOT EXISTS auth_token_hash VARCHAR(64);
+
+UPDATE forum_users
+SET auth_token_hash = encode(sha256(convert_to(auth_token, 'UTF8')), 'hex')
+WHERE auth_token IS NOT NULL AND auth_token_hash IS NULL;
+
+UPDATE forum_users SET auth_token = NULL WHERE auth_token_hash IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_forum_users_auth_token_hash
+    ON forum_users(auth_token_hash)
+    WHERE auth_token_hash IS NOT NULL;
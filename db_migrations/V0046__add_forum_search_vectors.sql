@@ -0,0 +1,50 @@
+-- Полнотекстовый поиск по форуму: русские tsvector-колонки, поддерживаемые триггерами
+ALTER TABLE forum_topics ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+ALTER TABLE forum_posts ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+CREATE OR REPLACE FUNCTION forum_topics_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.description, '')), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_forum_topics_search_vector ON forum_topics;
+CREATE TRIGGER trg_forum_topics_search_vector
+    BEFORE INSERT OR UPDATE OF title, description ON forum_topics
+    FOR EACH ROW EXECUTE FUNCTION forum_topics_search_vector_update();
+
+CREATE OR REPLACE FUNCTION forum_posts_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('russian', COALESCE(NEW.content, ''));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_forum_posts_search_vector ON forum_posts;
+CREATE TRIGGER trg_forum_posts_search_vector
+    BEFORE INSERT OR UPDATE OF content ON forum_posts
+    FOR EACH ROW EXECUTE FUNCTION forum_posts_search_vector_update();
+
+UPDATE forum_topics
+SET search_vector =
+    setweight(to_tsvector('russian', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('russian', COALESCE(description, '')), 'B')
+WHERE search_vector IS NULL;
+
+UPDATE forum_posts
+SET search_vector = to_tsvector('russian', COALESCE(content, ''))
+WHERE search_vector IS NULL;
+
+-- Скрытое содержимое в поиск не попадает, поэтому индексы частичные
+CREATE INDEX IF NOT EXISTS idx_forum_topics_search
+    ON forum_topics USING GIN(search_vector)
+    WHERE is_hidden = FALSE;
+
+CREATE INDEX IF NOT EXISTS idx_forum_posts_search
+    ON forum_posts USING GIN(search_vector)
+    WHERE is_hidden = FALSE;
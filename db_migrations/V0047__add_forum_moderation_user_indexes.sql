@@ -0,0 +1,12 @@
+-- Счётчики сообщений пользователя в консоли модератора считаются по индексу
+CREATE INDEX IF NOT EXISTS idx_forum_posts_author ON forum_posts(author_id);
+
+-- Поиск пользователей по началу имени или email
+CREATE INDEX IF NOT EXISTS idx_forum_users_username_prefix
+    ON forum_users(lower(username) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_forum_users_email_prefix
+    ON forum_users(email text_pattern_ops);
+
+-- Фильтры "заблокированные" и "неподтверждённые" с постраничной выдачей по id
+CREATE INDEX IF NOT EXISTS idx_forum_users_blocked ON forum_users(id) WHERE is_blocked = TRUE;
+CREATE INDEX IF NOT EXISTS idx_forum_users_unverified ON forum_users(id) WHERE is_verified = FALSE;
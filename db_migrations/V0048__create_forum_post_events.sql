@@ -0,0 +1,61 @@
+-- Лента событий сообщений форума для long-poll подписчиков открытых тем
+CREATE TABLE IF NOT EXISTS forum_post_events (
+    id BIGSERIAL PRIMARY KEY,
+    topic_id INTEGER NOT NULL,
+    post_id INTEGER NOT NULL,
+    operation VARCHAR(10) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_forum_post_events_topic ON forum_post_events(topic_id, id);
+
+COMMENT ON TABLE forum_post_events IS 'События forum_posts (created/edited/hidden/shown/deleted), id используется как Last-Event-ID';
+
+-- Запись события и NOTIFY forum_post_events с {id, topic_id}; прочие изменения строки событий не дают
+CREATE OR REPLACE FUNCTION forum_post_events_notify()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_operation VARCHAR(10);
+    v_topic_id INTEGER;
+    v_post_id INTEGER;
+    v_event_id BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_operation := CASE WHEN NEW.is_hidden THEN NULL ELSE 'created' END;
+    ELSIF TG_OP = 'DELETE' THEN
+        v_operation := 'deleted';
+    ELSIF OLD.is_hidden IS DISTINCT FROM NEW.is_hidden THEN
+        v_operation := CASE WHEN NEW.is_hidden THEN 'hidden' ELSE 'shown' END;
+    ELSIF OLD.content IS DISTINCT FROM NEW.content OR OLD.images IS DISTINCT FROM NEW.images THEN
+        v_operation := 'edited';
+    END IF;
+
+    IF v_operation IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        v_topic_id := OLD.topic_id;
+        v_post_id := OLD.id;
+    ELSE
+        v_topic_id := NEW.topic_id;
+        v_post_id := NEW.id;
+    END IF;
+
+    INSERT INTO forum_post_events (topic_id, post_id, operation)
+    VALUES (v_topic_id, v_post_id, v_operation)
+    RETURNING id INTO v_event_id;
+
+    PERFORM pg_notify('forum_post_events', json_build_object(
+        'id', v_event_id,
+        'topic_id', v_topic_id
+    )::text);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_forum_posts_events ON forum_posts;
+CREATE TRIGGER trg_forum_posts_events
+    AFTER INSERT OR UPDATE OR DELETE ON forum_posts
+    FOR EACH ROW EXECUTE FUNCTION forum_post_events_notify();
@@ -0,0 +1,55 @@
+-- Рейтинг "горячих" тем: экспоненциально затухающая сумма активности в логарифмической шкале.
+-- Вклад события весом w в момент t равен w * e^((t - 2024-01-01) / 12 ч), поэтому сравнение
+-- сохранённых сумм даёт тот же порядок, что и затухание на текущий момент: счёт пересчитывается
+-- только при новых событиях, без периодического обхода таблицы
+CREATE OR REPLACE FUNCTION forum_hot_add(p_score DOUBLE PRECISION, p_weight DOUBLE PRECISION, p_at TIMESTAMP)
+RETURNS DOUBLE PRECISION AS $$
+    SELECT CASE
+        WHEN p_weight IS NULL OR p_weight <= 0 THEN p_score
+        WHEN p_score IS NULL THEN v.x
+        WHEN abs(p_score - v.x) > 30 THEN GREATEST(p_score, v.x)
+        ELSE GREATEST(p_score, v.x) + ln(1 + exp(-abs(p_score - v.x)))
+    END
+    FROM (
+        SELECT ln(p_weight) + EXTRACT(EPOCH FROM (p_at - TIMESTAMP '2024-01-01'))::DOUBLE PRECISION / 43200.0 AS x
+    ) v
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE forum_topics ADD COLUMN IF NOT EXISTS hot_score DOUBLE PRECISION;
+
+-- Начальный счёт: создание темы (вес 1), видимые сообщения (вес 1), просмотры (вес 0.1)
+WITH contributions AS (
+    SELECT id AS topic_id,
+           EXTRACT(EPOCH FROM (COALESCE(created_at, LOCALTIMESTAMP) - TIMESTAMP '2024-01-01'))::DOUBLE PRECISION / 43200.0 AS x
+    FROM forum_topics
+    UNION ALL
+    SELECT topic_id,
+           EXTRACT(EPOCH FROM (COALESCE(created_at, LOCALTIMESTAMP) - TIMESTAMP '2024-01-01'))::DOUBLE PRECISION / 43200.0
+    FROM forum_posts
+    WHERE is_hidden = FALSE AND topic_id IS NOT NULL
+    UNION ALL
+    SELECT id,
+           ln(0.1 * views_count) + EXTRACT(EPOCH FROM (COALESCE(updated_at, created_at, LOCALTIMESTAMP) - TIMESTAMP '2024-01-01'))::DOUBLE PRECISION / 43200.0
+    FROM forum_topics
+    WHERE views_count > 0
+),
+peaks AS (
+    SELECT topic_id, MAX(x) AS max_x FROM contributions GROUP BY topic_id
+)
+UPDATE forum_topics t
+SET hot_score = s.score
+FROM (
+    SELECT c.topic_id, p.max_x + ln(SUM(exp(GREATEST(c.x - p.max_x, -700)))) AS score
+    FROM contributions c
+    JOIN peaks p ON p.topic_id = c.topic_id
+    GROUP BY c.topic_id, p.max_x
+) s
+WHERE t.id = s.topic_id AND t.hot_score IS NULL;
+
+ALTER TABLE forum_topics ALTER COLUMN hot_score SET DEFAULT forum_hot_add(NULL, 1.0, LOCALTIMESTAMP);
+UPDATE forum_topics SET hot_score = forum_hot_add(NULL, 1.0, LOCALTIMESTAMP) WHERE hot_score IS NULL;
+ALTER TABLE forum_topics ALTER COLUMN hot_score SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_forum_topics_hot
+    ON forum_topics(hot_score DESC, id DESC)
+    WHERE is_hidden = FALSE;
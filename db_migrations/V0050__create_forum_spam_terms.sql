@@ -0,0 +1,37 @@
+-- Веса признаков модели предварительной проверки на спам и оскорбления.
+-- term: основа слова (первые 5 букв), пара основ через пробел или служебный признак __...__;
+-- оценка = сигмоида(__bias__ + сумма весов признаков текста)
+CREATE TABLE IF NOT EXISTS forum_spam_terms (
+    term VARCHAR(100) PRIMARY KEY,
+    weight REAL NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO forum_spam_terms (term, weight) VALUES
+    ('__bias__', -3.0),
+    ('__link__', 2.0),
+    ('__phone__', 1.5),
+    ('__caps__', 1.0),
+    ('__repeat__', 0.8),
+    -- Реклама, заработок, азартные игры
+    ('казин', 2.5), ('casin', 2.5), ('ставк', 1.2), ('букме', 2.0), ('бонус', 1.2),
+    ('зараб', 1.5), ('доход', 1.0), ('инвес', 1.0), ('крипт', 1.5), ('crypt', 1.5),
+    ('битко', 1.5), ('выигр', 1.2), ('креди', 1.0), ('займ', 1.5), ('микро', 0.8),
+    ('скидк', 1.0), ('акция', 0.8), ('промо', 1.2), ('дешев', 1.0), ('купит', 0.8),
+    ('прода', 0.8), ('закаж', 0.8), ('рекла', 1.0), ('подпи', 0.6), ('телег', 1.0),
+    ('whats', 1.0), ('viagr', 3.0), ('виагр', 3.0), ('порно', 3.0), ('эроти', 2.0),
+    ('знако', 1.0), ('бады', 1.2), ('похуд', 1.2), ('гаран', 0.6),
+    ('без вложе', 2.5), ('по ссылк', 1.5), ('перех по', 1.5), ('перей по', 1.5),
+    ('пишит в', 1.0), ('в телег', 1.0), ('в лс', 1.0), ('в личк', 1.0),
+    -- Оскорбления
+    ('идиот', 1.5), ('дебил', 2.0), ('тупой', 1.2), ('дурак', 1.0), ('урод', 1.5),
+    ('своло', 1.5), ('мразь', 2.5), ('твари', 2.0),
+    -- Обычная лексика медицинского форума снижает оценку
+    ('врач', -1.0), ('врачу', -1.0), ('лечен', -1.0), ('боль', -0.8), ('болит', -0.8),
+    ('анали', -0.8), ('прием', -0.8), ('приём', -0.8), ('симпт', -1.0), ('диагн', -1.0),
+    ('полик', -1.0), ('запис', -0.6), ('спаси', -0.6), ('здрав', -0.4),
+    ('подск', -0.6), ('давле', -0.6), ('темпе', -0.6), ('табле', -0.4)
+ON CONFLICT (term) DO NOTHING;
+
+-- Причина скрытия темы (у сообщений колонка hidden_reason уже есть)
+ALTER TABLE forum_topics ADD COLUMN IF NOT EXISTS hidden_reason TEXT;
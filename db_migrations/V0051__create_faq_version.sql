@@ -0,0 +1,22 @@
+-- Версия содержимого FAQ: ключ кеша готового ответа и ETag во всех экземплярах функции
+CREATE TABLE IF NOT EXISTS faq_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO faq_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
+
+-- Любая запись в faq (создание, изменение, удаление) увеличивает версию один раз на оператор
+CREATE OR REPLACE FUNCTION faq_version_bump()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE faq_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_faq_version ON faq;
+CREATE TRIGGER trg_faq_version
+    AFTER INSERT OR UPDATE OR DELETE ON faq
+    FOR EACH STATEMENT EXECUTE FUNCTION faq_version_bump();
@@ -0,0 +1,28 @@
+-- Поиск по FAQ с русской морфологией: вопрос весит больше ответа
+ALTER TABLE faq ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+CREATE OR REPLACE FUNCTION faq_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', COALESCE(NEW.question, '')), 'A') ||
+        setweight(to_tsvector('russian', COALESCE(NEW.answer, '')), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_faq_search_vector ON faq;
+CREATE TRIGGER trg_faq_search_vector
+    BEFORE INSERT OR UPDATE OF question, answer ON faq
+    FOR EACH ROW EXECUTE FUNCTION faq_search_vector_update();
+
+UPDATE faq
+SET search_vector =
+    setweight(to_tsvector('russian', COALESCE(question, '')), 'A') ||
+    setweight(to_tsvector('russian', COALESCE(answer, '')), 'B')
+WHERE search_vector IS NULL;
+
+-- GIN по tsvector обслуживает и полный поиск, и префиксные запросы автодополнения (слово:*)
+CREATE INDEX IF NOT EXISTS idx_faq_search
+    ON faq USING GIN(search_vector)
+    WHERE is_active = true;
@@ -0,0 +1,11 @@
+-- Захват уведомлений перед отправкой: строка переводится в sending и коммитится, сетевые вызовы идут без блокировок
+ALTER TABLE notification_queue DROP CONSTRAINT IF EXISTS chk_notification_status;
+ALTER TABLE notification_queue
+    ADD CONSTRAINT chk_notification_status CHECK (status IN ('pending', 'sending', 'sent', 'failed'));
+
+ALTER TABLE notification_queue ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+
+-- Поиск захватов, брошенных оборвавшимся запуском
+CREATE INDEX IF NOT EXISTS idx_notification_queue_sending ON notification_queue(claimed_at) WHERE status = 'sending';
+
+COMMENT ON COLUMN notification_queue.claimed_at IS 'Когда рассыльщик захватил уведомление (status = sending); просроченный захват забирается повторно';
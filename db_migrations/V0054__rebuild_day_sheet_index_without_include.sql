@@ -0,0 +1,7 @@
+-- Лист записей читает ФИО, телефон, СНИЛС и описание из строки таблицы, так что INCLUDE (id, status)
+-- не делал индекс покрывающим и только увеличивал его размер. Индекс нужен ради порядка (дата, врач, время)
+DROP INDEX IF EXISTS idx_appointments_v2_day_sheet;
+CREATE INDEX IF NOT EXISTS idx_appointments_v2_day_sheet
+    ON appointments_v2(appointment_date, doctor_id, appointment_time);
+
+COMMENT ON INDEX idx_appointments_v2_day_sheet IS 'Лист записей регистратуры: записи на дату по врачам в порядке времени (не покрывающий)';
@@ -0,0 +1,13 @@
+-- seq выдаётся в порядке вставки, а не фиксации: строка поздно зафиксированной транзакции могла оказаться
+-- за курсором и пропасть. Курсор ленты теперь (xact_id, seq), строки отдаются только ниже
+-- pg_snapshot_xmin(pg_current_snapshot()) - все транзакции с меньшим xact_id уже завершены
+ALTER TABLE appointment_changes ADD COLUMN IF NOT EXISTS xact_id XID8 NOT NULL DEFAULT pg_current_xact_id();
+
+DROP INDEX IF EXISTS idx_appointment_changes_doctor_seq;
+DROP INDEX IF EXISTS idx_appointment_changes_date_seq;
+CREATE INDEX IF NOT EXISTS idx_appointment_changes_xact_seq ON appointment_changes(xact_id, seq);
+CREATE INDEX IF NOT EXISTS idx_appointment_changes_doctor_xact_seq ON appointment_changes(doctor_id, xact_id, seq);
+CREATE INDEX IF NOT EXISTS idx_appointment_changes_date_xact_seq ON appointment_changes(appointment_date, xact_id, seq);
+
+COMMENT ON COLUMN appointment_changes.xact_id IS 'Транзакция изменения; курсор long-poll (xact_id, seq) не обгоняет незавершённые транзакции';
+COMMENT ON TABLE appointment_changes IS 'Лента изменений appointments_v2, курсор long-poll - (xact_id, seq)';
@@ -0,0 +1,12 @@
+-- Как и в appointment_changes (V0055): id выдаётся в порядке вставки, а не фиксации, поэтому курсор
+-- Last-Event-ID теперь (xact_id, id) и события отдаются только ниже pg_snapshot_xmin(pg_current_snapshot())
+ALTER TABLE forum_post_events ADD COLUMN IF NOT EXISTS xact_id XID8 NOT NULL DEFAULT pg_current_xact_id();
+
+DROP INDEX IF EXISTS idx_forum_post_events_topic;
+CREATE INDEX IF NOT EXISTS idx_forum_post_events_topic_xact ON forum_post_events(topic_id, xact_id, id);
+
+-- Удаление событий старше срока хранения (forum_posts, EVENTS_RETENTION_HOURS)
+CREATE INDEX IF NOT EXISTS idx_forum_post_events_created_at ON forum_post_events(created_at);
+
+COMMENT ON COLUMN forum_post_events.xact_id IS 'Транзакция события; курсор (xact_id, id) не обгоняет незавершённые транзакции';
+COMMENT ON TABLE forum_post_events IS 'События forum_posts (created/edited/hidden/shown/deleted), курсор Last-Event-ID - "xact_id:id", хранятся EVENTS_RETENTION_HOURS';
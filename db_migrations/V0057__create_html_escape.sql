@@ -0,0 +1,8 @@
+-- Экранирование пользовательского текста перед ts_headline: в сниппет попадают только теги подсветки <mark>
+CREATE OR REPLACE FUNCTION html_escape(p_text TEXT)
+RETURNS TEXT AS $$
+    SELECT replace(replace(replace(replace(replace(p_text,
+        '&', '&amp;'), '<', '&lt;'), '>', '&gt;'), '"', '&quot;'), '''', '&#39;');
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+COMMENT ON FUNCTION html_escape(TEXT) IS 'HTML-экранирование текста для сниппетов поиска форума и FAQ';
@@ -0,0 +1,7 @@
+-- Поиск модератора сравнивает lower(email) с приведённым к нижнему регистру запросом: старые адреса
+-- могли сохраниться с заглавными буквами, поэтому индекс префикса строится по lower(email)
+DROP INDEX IF EXISTS idx_forum_users_email_prefix;
+CREATE INDEX IF NOT EXISTS idx_forum_users_email_lower_prefix
+    ON forum_users(lower(email) text_pattern_ops);
+
+COMMENT ON INDEX idx_forum_users_email_lower_prefix IS 'Поиск пользователей консоли модератора по началу email без учёта регистра';
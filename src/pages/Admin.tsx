@@ -54,7 +54,10 @@ const Admin = () => {
   const [editingFaq, setEditingFaq] = useState<any>(null);
   const [isFaqOpen, setIsFaqOpen] = useState(false);
   const [isFaqEditOpen, setIsFaqEditOpen] = useState(false);
-  const [forumUsers, setForumUsers] = useState([]);
+  const [forumUsers, setForumUsers] = useState<any[]>([]);
+  const [forumUsersCursor, setForumUsersCursor] = useState<string | null>(null);
+  const [forumUsersSearch, setForumUsersSearch] = useState('');
+  const [forumUsersStatus, setForumUsersStatus] = useState('all');
   const [forumTopics, setForumTopics] = useState([]);
   const [blockReason, setBlockReason] = useState('');
   const [hideReason, setHideReason] = useState('');
@@ -839,13 +842,18 @@ const Admin = () => {
     }
   };
 
-  const loadForumUsers = async () => {
+  const loadForumUsers = async (cursor: string | null = null, search = forumUsersSearch, status = forumUsersStatus) => {
     try {
-      const response = await fetch(`${API_URLS.forumModeration}?action=getUsers`, {
+      const params = new URLSearchParams({ action: 'getUsers' });
+      if (cursor) params.set('cursor', cursor);
+      if (search.trim()) params.set('q', search.trim());
+      if (status !== 'all') params.set('status', status);
+      const response = await fetch(`${API_URLS.forumModeration}?${params.toString()}`, {
         headers: { 'X-Admin-Token': 'admin123' },
       });
       const data = await response.json();
-      setForumUsers(data.users || []);
+      setForumUsers(cursor ? (prev) => [...prev, ...(data.users || [])] : (data.users || []));
+      setForumUsersCursor(data.next_cursor || null);
     } catch (error) {
       console.error('Failed to load forum users:', error);
     }
@@ -2830,6 +2838,34 @@ const Admin = () => {
           <div className="space-y-8">
             <div>
               <h2 className="text-3xl font-bold mb-6">Пользователи форума</h2>
+              <div className="flex gap-2 mb-4">
+                <Input
+                  placeholder="Поиск по имени или email"
+                  value={forumUsersSearch}
+                  onChange={(e) => setForumUsersSearch(e.target.value)}
+                  onKeyDown={(e) => e.key === 'Enter' && loadForumUsers(null)}
+                />
+                <Select
+                  value={forumUsersStatus}
+                  onValueChange={(value) => {
+                    setForumUsersStatus(value);
+                    loadForumUsers(null, forumUsersSearch, value);
+                  }}
+                >
+                  <SelectTrigger className="w-56">
+                    <SelectValue />
+                  </SelectTrigger>
+                  <SelectContent>
+                    <SelectItem value="all">Все</SelectItem>
+                    <SelectItem value="blocked">Заблокированные</SelectItem>
+                    <SelectItem value="unverified">Неподтверждённые</SelectItem>
+                  </SelectContent>
+                </Select>
+                <Button variant="outline" onClick={() => loadForumUsers(null)}>
+                  <Icon name="Search" size={14} className="mr-1" />
+                  Найти
+                </Button>
+              </div>
               {forumUsers.length === 0 ? (
                 <Card>
                   <CardContent className="py-8 text-center text-muted-foreground">
@@ -2907,6 +2943,13 @@ const Admin = () => {
                       </CardHeader>
                     </Card>
                   ))}
+                  {forumUsersCursor && (
+                    <div className="text-center">
+                      <Button variant="outline" onClick={() => loadForumUsers(forumUsersCursor)}>
+                        Показать ещё
+                      </Button>
+                    </div>
+                  )}
                 </div>
               )}
             </div>
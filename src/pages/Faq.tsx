@@ -19,6 +19,13 @@ const Faq = () => {
   const { toast } = useToast();
   const [faqs, setFaqs] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [searchQuery, setSearchQuery] = useState('');
+  const [suggestions, setSuggestions] = useState<any[]>([]);
+  const [searchResults, setSearchResults] = useState<any[] | null>(null);
+  const [isAskOpen, setIsAskOpen] = useState(false);
+  const [askForm, setAskForm] = useState({ name: '', question: '' });
+  const [askMatches, setAskMatches] = useState<any[]>([]);
+  const [askSubmitting, setAskSubmitting] = useState(false);
   const [maxTextIndex, setMaxTextIndex] = useState(0);
   const [isMaxBannerVisible, setIsMaxBannerVisible] = useState(false);
 
@@ -47,6 +54,78 @@ const Faq = () => {
     return () => clearInterval(interval);
   }, []);
 
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (query.length < 2) {
+      setSuggestions([]);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const response = await fetch(
+          `${FAQ_URL}?action=suggest&q=${encodeURIComponent(query)}`,
+          { signal: controller.signal }
+        );
+        const data = await response.json();
+        setSuggestions(data.suggestions || []);
+      } catch (error) {
+        if (!controller.signal.aborted) console.error('Failed to load suggestions:', error);
+      }
+    }, 150);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchQuery]);
+
+  const searchFaqs = async (query: string) => {
+    setSuggestions([]);
+    if (!query.trim()) {
+      setSearchResults(null);
+      return;
+    }
+    try {
+      const response = await fetch(`${FAQ_URL}?action=search&q=${encodeURIComponent(query.trim())}`);
+      const data = await response.json();
+      setSearchResults(data.results || []);
+    } catch (error) {
+      console.error('Failed to search FAQs:', error);
+    }
+  };
+
+  const displayedFaqs = searchResults ?? faqs;
+
+  const submitQuestion = async (force: boolean) => {
+    if (!askForm.name.trim() || !askForm.question.trim()) {
+      toast({ title: 'Ошибка', description: 'Укажите имя и вопрос', variant: 'destructive' });
+      return;
+    }
+    setAskSubmitting(true);
+    try {
+      const response = await fetch(FAQ_URL, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ action: 'ask', ...askForm, force }),
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        toast({ title: 'Ошибка', description: data.error || 'Не удалось отправить вопрос', variant: 'destructive' });
+      } else if (data.submitted) {
+        toast({ title: 'Вопрос отправлен', description: 'Мы ответим на него в ближайшее время' });
+        setAskForm({ name: '', question: '' });
+        setAskMatches([]);
+        setIsAskOpen(false);
+      } else {
+        setAskMatches(data.matches || []);
+      }
+    } catch (error) {
+      toast({ title: 'Ошибка', description: 'Проблема с подключением к серверу', variant: 'destructive' });
+    } finally {
+      setAskSubmitting(false);
+    }
+  };
+
   const loadFaqs = async () => {
     try {
       const response = await fetch(FAQ_URL);
@@ -134,6 +213,48 @@ const Faq = () => {
             </p>
           </div>
 
+          <div className="relative mb-8">
+            <form
+              className="flex gap-2"
+              onSubmit={(e) => {
+                e.preventDefault();
+                searchFaqs(searchQuery);
+              }}
+            >
+              <Input
+                placeholder="Поиск по вопросам и ответам"
+                value={searchQuery}
+                onChange={(e) => {
+                  setSearchQuery(e.target.value);
+                  if (!e.target.value.trim()) setSearchResults(null);
+                }}
+              />
+              <Button type="submit">
+                <Icon name="Search" size={18} className="mr-2" />
+                Найти
+              </Button>
+            </form>
+            {suggestions.length > 0 && (
+              <Card className="absolute z-10 mt-1 w-full">
+                <CardContent className="p-2">
+                  {suggestions.map((suggestion) => (
+                    <button
+                      key={suggestion.id}
+                      type="button"
+                      className="block w-full text-left px-3 py-2 rounded hover:bg-muted/50"
+                      onClick={() => {
+                        setSearchQuery(suggestion.question);
+                        searchFaqs(suggestion.question);
+                      }}
+                    >
+                      {suggestion.question}
+                    </button>
+                  ))}
+                </CardContent>
+              </Card>
+            )}
+          </div>
+
           {loading ? (
             <Card>
               <CardContent className="py-12 text-center">
@@ -141,18 +262,18 @@ const Faq = () => {
                 <p className="text-muted-foreground">Загрузка...</p>
               </CardContent>
             </Card>
-          ) : faqs.length === 0 ? (
+          ) : displayedFaqs.length === 0 ? (
             <Card>
               <CardContent className="py-12 text-center">
                 <Icon name="FileQuestion" size={48} className="mx-auto mb-4 text-muted-foreground" />
                 <p className="text-muted-foreground text-lg">
-                  Пока нет вопросов и ответов
+                  {searchResults ? 'По вашему запросу ничего не найдено' : 'Пока нет вопросов и ответов'}
                 </p>
               </CardContent>
             </Card>
           ) : (
             <Accordion type="single" collapsible className="space-y-4">
-              {faqs.map((faq, index) => (
+              {displayedFaqs.map((faq, index) => (
                 <AccordionItem 
                   key={faq.id} 
                   value={`item-${faq.id}`}
@@ -214,6 +335,64 @@ const Faq = () => {
                     <p className="text-base font-bold break-all">antrasit_1gorbolnica@mail.ru</p>
                   </div>
                 </div>
+                <Dialog
+                  open={isAskOpen}
+                  onOpenChange={(open) => {
+                    setIsAskOpen(open);
+                    if (!open) setAskMatches([]);
+                  }}
+                >
+                  <DialogTrigger asChild>
+                    <Button className="w-full">
+                      <Icon name="MessageSquare" size={18} className="mr-2" />
+                      Задать вопрос
+                    </Button>
+                  </DialogTrigger>
+                  <DialogContent>
+                    <DialogHeader>
+                      <DialogTitle>Задать вопрос</DialogTitle>
+                    </DialogHeader>
+                    <div className="space-y-4">
+                      <Input
+                        placeholder="Ваше имя"
+                        value={askForm.name}
+                        onChange={(e) => setAskForm({ ...askForm, name: e.target.value })}
+                      />
+                      <Textarea
+                        placeholder="Ваш вопрос"
+                        maxLength={200}
+                        value={askForm.question}
+                        onChange={(e) => {
+                          setAskForm({ ...askForm, question: e.target.value });
+                          setAskMatches([]);
+                        }}
+                      />
+                      {askMatches.length > 0 ? (
+                        <div className="space-y-3">
+                          <p className="text-sm font-medium">Возможно, ответ уже есть:</p>
+                          {askMatches.map((match) => (
+                            <div key={match.id} className="p-3 bg-muted/30 rounded-lg">
+                              <p className="font-semibold text-sm">{match.question}</p>
+                              <p className="text-sm text-muted-foreground whitespace-pre-wrap mt-1">{match.answer}</p>
+                            </div>
+                          ))}
+                          <div className="flex gap-2">
+                            <Button variant="outline" className="flex-1" onClick={() => setIsAskOpen(false)}>
+                              Ответ найден
+                            </Button>
+                            <Button className="flex-1" onClick={() => submitQuestion(true)} disabled={askSubmitting}>
+                              Всё равно отправить
+                            </Button>
+                          </div>
+                        </div>
+                      ) : (
+                        <Button className="w-full" onClick={() => submitQuestion(false)} disabled={askSubmitting}>
+                          {askSubmitting ? 'Отправка...' : 'Отправить'}
+                        </Button>
+                      )}
+                    </div>
+                  </DialogContent>
+                </Dialog>
                 <Button variant="outline" className="w-full" asChild>
                   <a href="/#contacts">
                     <Icon name="MapPin" size={18} className="mr-2" />
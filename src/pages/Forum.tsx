@@ -16,6 +16,15 @@ const API_URLS = {
   smsVerify: 'https://functions.poehali.dev/7ea5c6f5-d200-4cc0-b34b-10144a995d69',
 };
 
+// Объединение сообщений без дублей в порядке выдачи сервера (created_at, id)
+const mergePosts = (current: any[], incoming: any[]) => {
+  const byId = new Map(current.map((post) => [post.id, post]));
+  incoming.forEach((post) => byId.set(post.id, post));
+  return Array.from(byId.values()).sort((a, b) =>
+    a.created_at === b.created_at ? a.id - b.id : a.created_at < b.created_at ? -1 : 1
+  );
+};
+
 const Forum = () => {
   const { toast } = useToast();
   const navigate = useNavigate();
@@ -25,8 +34,13 @@ const Forum = () => {
   const { checkRateLimit: checkTopicLimit } = useRateLimiter({ endpoint: 'forum-topic', maxRequestsPerMinute: 5 });
   
   const [topics, setTopics] = useState<any[]>([]);
+  const [topicsCursor, setTopicsCursor] = useState<string | null>(null);
+  const [topicsSort, setTopicsSort] = useState<'recent' | 'hot'>('recent');
+  const [loadingMoreTopics, setLoadingMoreTopics] = useState(false);
   const [currentTopic, setCurrentTopic] = useState<any>(null);
   const [posts, setPosts] = useState<any[]>([]);
+  const [postsCursor, setPostsCursor] = useState<string | null>(null);
+  const [loadingMorePosts, setLoadingMorePosts] = useState(false);
   const [loading, setLoading] = useState(true);
   const [user, setUser] = useState<any>(null);
   
@@ -60,6 +74,49 @@ const Forum = () => {
     }
   }, [topicId]);
 
+  useEffect(() => {
+    if (!topicId) return;
+    let active = true;
+    const controller = new AbortController();
+
+    // Long-poll событий открытой темы: новые, изменённые и скрытые сообщения без перезагрузки
+    const pollEvents = async () => {
+      let lastEventId = '0';
+      while (active) {
+        try {
+          const response = await fetch(
+            `${API_URLS.posts}?topic_id=${topicId}&action=events&last_event_id=${encodeURIComponent(lastEventId)}`,
+            { signal: controller.signal }
+          );
+          if (!response.ok) throw new Error(`HTTP ${response.status}`);
+          const data = await response.json();
+          const events = data.events || [];
+          lastEventId = data.last_event_id ?? lastEventId;
+          if (events.length === 0) {
+            // Пустой ответ (таймаут ожидания) - короткая пауза, чтобы не долбить сервер при сбоях long-poll
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+            continue;
+          }
+
+          const removedIds = new Set(
+            events.filter((e: any) => !e.post).map((e: any) => e.post_id)
+          );
+          const updated = events.filter((e: any) => e.post).map((e: any) => e.post);
+          setPosts((prev) => mergePosts(prev.filter((post) => !removedIds.has(post.id)), updated));
+        } catch (error) {
+          if (!active) return;
+          await new Promise((resolve) => setTimeout(resolve, 5000));
+        }
+      }
+    };
+
+    pollEvents();
+    return () => {
+      active = false;
+      controller.abort();
+    };
+  }, [topicId]);
+
   const checkAuth = () => {
     const token = localStorage.getItem('forum_token');
     const userData = localStorage.getItem('forum_user');
@@ -69,12 +126,13 @@ const Forum = () => {
     }
   };
 
-  const loadTopics = async () => {
+  const loadTopics = async (sort = topicsSort) => {
     setLoading(true);
     try {
-      const response = await fetch(API_URLS.topics);
+      const response = await fetch(sort === 'hot' ? `${API_URLS.topics}?sort=hot` : API_URLS.topics);
       const data = await response.json();
       setTopics(data.topics || []);
+      setTopicsCursor(data.next_cursor || null);
     } catch (error) {
       console.error('Failed to load topics:', error);
     } finally {
@@ -82,6 +140,22 @@ const Forum = () => {
     }
   };
 
+  const loadMoreTopics = async () => {
+    if (!topicsCursor) return;
+    setLoadingMoreTopics(true);
+    try {
+      const sortParam = topicsSort === 'hot' ? '&sort=hot' : '';
+      const response = await fetch(`${API_URLS.topics}?cursor=${encodeURIComponent(topicsCursor)}${sortParam}`);
+      const data = await response.json();
+      setTopics((prev) => [...prev, ...(data.topics || [])]);
+      setTopicsCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Failed to load topics:', error);
+    } finally {
+      setLoadingMoreTopics(false);
+    }
+  };
+
   const loadTopic = async (id: string) => {
     try {
       const response = await fetch(`${API_URLS.topics}?id=${id}`);
@@ -98,6 +172,7 @@ const Forum = () => {
       const response = await fetch(`${API_URLS.posts}?topic_id=${id}`);
       const data = await response.json();
       setPosts(data.posts || []);
+      setPostsCursor(data.next_cursor || null);
     } catch (error) {
       console.error('Failed to load posts:', error);
     } finally {
@@ -105,6 +180,43 @@ const Forum = () => {
     }
   };
 
+  const loadMorePosts = async (id: string) => {
+    if (!postsCursor) return;
+    setLoadingMorePosts(true);
+    try {
+      const response = await fetch(`${API_URLS.posts}?topic_id=${id}&cursor=${encodeURIComponent(postsCursor)}`);
+      const data = await response.json();
+      setPosts((prev) => mergePosts(prev, data.posts || []));
+      setPostsCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Failed to load posts:', error);
+    } finally {
+      setLoadingMorePosts(false);
+    }
+  };
+
+  const loadNewPosts = async (id: string) => {
+    if (posts.length === 0) {
+      loadPosts(id);
+      return;
+    }
+    try {
+      // Догружаем с последней загруженной позиции, а не перечитываем первую страницу
+      const after = postsCursor
+        ? `cursor=${encodeURIComponent(postsCursor)}`
+        : `since_id=${posts[posts.length - 1].id}`;
+      const response = await fetch(`${API_URLS.posts}?topic_id=${id}&${after}`);
+      const data = await response.json();
+      setPosts((prev) => mergePosts(prev, data.posts || []));
+      setPostsCursor(data.next_cursor || null);
+      if (typeof data.posts_count === 'number') {
+        setCurrentTopic((prev: any) => (prev ? { ...prev, posts_count: data.posts_count } : prev));
+      }
+    } catch (error) {
+      console.error('Failed to load posts:', error);
+    }
+  };
+
   const handleSendPhoneCode = async (e: React.FormEvent) => {
     e.preventDefault();
     
@@ -458,8 +570,10 @@ const Forum = () => {
 
       if (response.ok && data.success) {
         toast({
-          title: "Тема создана!",
-          description: "Ваша тема появилась на форуме",
+          title: data.pending_moderation ? "Тема на проверке" : "Тема создана!",
+          description: data.pending_moderation
+            ? "Тема будет опубликована после проверки модератором"
+            : "Ваша тема появилась на форуме",
         });
         setNewTopicForm({ title: '', description: '' });
         setIsNewTopicOpen(false);
@@ -525,12 +639,14 @@ const Forum = () => {
 
       if (response.ok && data.success) {
         toast({
-          title: "Сообщение отправлено!",
-          description: "Ваш ответ опубликован",
+          title: data.pending_moderation ? "Сообщение на проверке" : "Сообщение отправлено!",
+          description: data.pending_moderation
+            ? "Ответ будет опубликован после проверки модератором"
+            : "Ваш ответ опубликован",
         });
         setNewPostContent('');
         setPostImages([]);
-        loadPosts(topicId!);
+        loadNewPosts(topicId!);
       } else {
         toast({
           title: "Ошибка",
@@ -623,8 +739,10 @@ const Forum = () => {
 
       if (response.ok && data.success) {
         toast({
-          title: "Сообщение обновлено!",
-          description: "Изменения сохранены",
+          title: data.pending_moderation ? "Сообщение на проверке" : "Сообщение обновлено!",
+          description: data.pending_moderation
+            ? "Изменения будут опубликованы после проверки модератором"
+            : "Изменения сохранены",
         });
         setEditingPostId(null);
         setEditPostContent('');
@@ -975,6 +1093,23 @@ const Forum = () => {
               )}
             </div>
 
+            <div className="flex gap-2 mb-4">
+              {(['recent', 'hot'] as const).map((sort) => (
+                <Button
+                  key={sort}
+                  variant={topicsSort === sort ? 'default' : 'outline'}
+                  size="sm"
+                  onClick={() => {
+                    setTopicsSort(sort);
+                    loadTopics(sort);
+                  }}
+                >
+                  <Icon name={sort === 'hot' ? 'Flame' : 'Clock'} size={16} className="mr-1" />
+                  {sort === 'hot' ? 'Популярные' : 'Новые'}
+                </Button>
+              ))}
+            </div>
+
             {loading ? (
               <div className="text-center py-12">
                 <p className="text-muted-foreground">Загрузка тем...</p>
@@ -1034,6 +1169,13 @@ const Forum = () => {
                     </CardContent>
                   </Card>
                 ))}
+                {topicsCursor && (
+                  <div className="text-center">
+                    <Button variant="outline" onClick={loadMoreTopics} disabled={loadingMoreTopics}>
+                      {loadingMoreTopics ? 'Загрузка...' : 'Показать ещё'}
+                    </Button>
+                  </div>
+                )}
               </div>
             )}
           </>
@@ -1070,7 +1212,7 @@ const Forum = () => {
               </Card>
             )}
 
-            <h3 className="text-xl font-bold mb-4">Сообщения ({posts.length})</h3>
+            <h3 className="text-xl font-bold mb-4">Сообщения ({currentTopic?.posts_count ?? posts.length})</h3>
 
             {loading ? (
               <div className="text-center py-12">
@@ -1211,6 +1353,13 @@ const Forum = () => {
                     </Card>
                   ))
                 )}
+                {postsCursor && (
+                  <div className="text-center">
+                    <Button variant="outline" onClick={() => loadMorePosts(topicId!)} disabled={loadingMorePosts}>
+                      {loadingMorePosts ? 'Загрузка...' : 'Показать ещё'}
+                    </Button>
+                  </div>
+                )}
               </div>
             )}
 